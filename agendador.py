@@ -0,0 +1,86 @@
+import argparse
+import os
+import time
+from datetime import date, datetime
+
+import pandas as pd
+
+import armazenamento
+
+# Intervalo padrão entre sincronizações completas de todas as contas
+INTERVALO_PADRAO = 6 * 3600
+
+
+def contas_para_sincronizar() -> dict:
+    """
+    {conta: gmail_token} de todas as sessões salvas pelo login (uma por e-mail)
+    mais a conta "local" quando existe token.json.
+    """
+    from estado_compartilhado import sessoes
+    contas = {}
+    for sessao in sessoes().values():
+        if sessao.get("gmail_token"):
+            email = sessao.get("user_info", {}).get("email")
+            if email:
+                contas[email] = sessao["gmail_token"]
+    if os.path.exists("token.json"):
+        contas["local"] = None
+    return contas
+
+
+def sincronizar_conta(conta: str, gmail_token: str = None) -> dict:
+    """
+    Sincronização incremental: busca só a partir do último mês já gravado
+    (que é refeito, para pegar boletos que chegaram atrasados) e recalcula
+    anomalias, parcelas, cubo e a versão dos dados. Os relatórios (totais,
+    comparação entre meses) não são gravados: saem do cubo na leitura.
+    """
+    from extrair_dados import buscar_e_extrair
+    from ingestao import mesclar_periodo, processar_ingestao
+
+    meses = armazenamento.meses_disponiveis(conta)
+    if not meses:
+        return processar_ingestao(conta, buscar_e_extrair(gmail_token, conta=conta))
+
+    ultimo = meses[-1]
+    inicio = date(int(ultimo[:4]), int(ultimo[5:7]), 1)
+    novos = buscar_e_extrair(gmail_token, inicio=inicio, conta=conta)
+    meses_janela = pd.period_range(inicio, date.today(), freq="M").strftime("%Y_%m").tolist()
+    existentes = armazenamento.carregar_tabela(conta, "itens", ["mes", "unidade", "item", "valor", "documento"])
+    return processar_ingestao(conta, mesclar_periodo(existentes, novos, meses_janela))
+
+
+def rodar_ciclo():
+    contas = contas_para_sincronizar()
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Sincronizando {len(contas)} conta(s)")
+    for conta, gmail_token in contas.items():
+        inicio = time.perf_counter()
+        try:
+            resultado = sincronizar_conta(conta, gmail_token)
+        except Exception as e:
+            # Uma conta com problema (token revogado, cota) não impede as demais
+            print(f"  ❌ {conta}: {e}")
+            continue
+        versao, _ = armazenamento.versao_atual(conta)
+        print(
+            f"  ✅ {conta}: {len(resultado['dados'])} registros, "
+            f"{len(resultado['anomalias'])} anomalias, versão {versao} "
+            f"({time.perf_counter() - inicio:.1f}s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincronização periódica dos boletos de todas as contas")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO_PADRAO, help="Segundos entre ciclos")
+    parser.add_argument("--uma-vez", action="store_true", help="Roda um único ciclo e sai (para cron)")
+    args = parser.parse_args()
+
+    while True:
+        rodar_ciclo()
+        if args.uma_vez:
+            break
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+COLUNAS_CUBO = ["mes", "unidade", "item_id", "item_canonico", "fixo", "valor", "linhas"]
+COLUNAS_COMPARACAO = ["item_id", "item", "valor_anterior", "valor_atual", "diferenca", "percentual", "situacao"]
+
+
+def com_unidade(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Garante a coluna unidade como categoria ("" quando o boleto não informa).
+    Dados gravados antes da dimensão de unidade ganham a coluna vazia.
+    """
+    df = df.copy()
+    unidades = df["unidade"] if "unidade" in df.columns else pd.Series("", index=df.index)
+    df["unidade"] = unidades.fillna("").astype(str).astype("category")
+    return df
+
+
+def filtrar_unidade(df: pd.DataFrame, unidade: str = None) -> pd.DataFrame:
+    """Linhas de uma unidade; None devolve o prédio inteiro."""
+    if unidade is None:
+        return df
+    return df[df["unidade"] == unidade]
+
+
+def totais_por_unidade(cubo: pd.DataFrame, meses: list = None) -> pd.DataFrame:
+    """Tabela unidade × mês com o total cobrado, a partir do cubo (um groupby só)."""
+    if meses:
+        cubo = cubo[cubo["mes"].isin(meses)]
+    return (
+        cubo.groupby(["unidade", "mes"], observed=True)["valor"].sum()
+        .unstack("mes", fill_value=0.0)
+        .sort_index(axis=1)
+    )
+
+
+def meses_comparados(meses: list, atual: str = None, anterior: str = None):
+    """
+    (mes_atual, mes_anterior) entre os meses disponíveis; por padrão o último
+    e o imediatamente anterior a ele. ValueError se um mês pedido não existe
+    ou se o atual é o primeiro e não há com o que comparar.
+    """
+    for mes in (atual, anterior):
+        if mes is not None and mes not in meses:
+            raise ValueError(f"Mês {mes} sem dados (disponíveis: {', '.join(meses) or 'nenhum'}).")
+    atual = atual or (meses[-1] if meses else None)
+    if anterior is None:
+        if atual is None or meses.index(atual) == 0:
+            raise ValueError(f"Nenhum mês anterior a {atual} para comparar." if atual else "Nenhum mês com dados.")
+        anterior = meses[meses.index(atual) - 1]
+    return atual, anterior
+
+
+def comparar_meses(df: pd.DataFrame, mes_atual: str, mes_anterior: str) -> pd.DataFrame:
+    """
+    Compara dois meses por item canônico com junção externa, para que itens
+    novos ou removidos apareçam (percentual fica NaN quando não havia valor antes).
+    """
+    def por_item(mes):
+        return (
+            df[df["mes"] == mes]
+            .groupby(["item_id", "item_canonico"], as_index=False)["valor"]
+            .sum()
+        )
+
+    comparacao = por_item(mes_atual).merge(
+        por_item(mes_anterior),
+        on=["item_id", "item_canonico"],
+        suffixes=("_atual", "_anterior"),
+        how="outer",
+        indicator=True,
+    ).rename(columns={"item_canonico": "item"})
+    comparacao[["valor_atual", "valor_anterior"]] = comparacao[["valor_atual", "valor_anterior"]].fillna(0.0)
+    comparacao["diferenca"] = comparacao["valor_atual"] - comparacao["valor_anterior"]
+    anterior = comparacao["valor_anterior"].where(comparacao["valor_anterior"] != 0)
+    comparacao["percentual"] = comparacao["diferenca"] / anterior * 100
+    comparacao["situacao"] = np.select(
+        [comparacao["_merge"] == "left_only", comparacao["_merge"] == "right_only"],
+        ["novo", "removido"],
+        default="mantido",
+    )
+    return comparacao[COLUNAS_COMPARACAO].sort_values("diferenca", ascending=False, ignore_index=True)
+
+
+def totais_mensais(df: pd.DataFrame) -> pd.DataFrame:
+    totais = df.groupby("mes", as_index=False)["valor"].sum().sort_values("mes", ignore_index=True)
+    totais["variacao_pct"] = totais["valor"].pct_change() * 100
+    return totais
+
+
+def tendencia(df: pd.DataFrame, item_ids: list = None) -> pd.DataFrame:
+    """Tabela item × mês com o valor somado de cada item canônico."""
+    if item_ids:
+        df = df[df["item_id"].isin(item_ids)]
+    return (
+        df.pivot_table(index="item_canonico", columns="mes", values="valor", aggfunc="sum")
+        .sort_index(axis=1)
+    )
+
+
+def calcular_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """Agregado mês × unidade × item canônico, gravado na ingestão e lido por CLI e API."""
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_CUBO)
+    return (
+        com_unidade(df)
+        .groupby(["mes", "unidade", "item_id", "item_canonico", "fixo"], as_index=False, observed=True)
+        .agg(valor=("valor", "sum"), linhas=("valor", "size"))
+        .sort_values(["mes", "unidade", "item_id"], ignore_index=True)
+    )[COLUNAS_CUBO]
@@ -1,36 +1,124 @@
+import argparse
+import sys
+
 import pandas as pd
 
-df = pd.read_csv("dados_condominio.csv")
+import armazenamento
+from agregados import comparar_meses, meses_comparados, tendencia, totais_mensais
+
+# Só as colunas que as análises usam são lidas do banco
+COLUNAS_ANALISE = ["mes", "item", "item_id", "item_canonico", "fixo", "valor"]
+
+
+def _carregar(conta: str, meses: list = None) -> pd.DataFrame:
+    df = armazenamento.carregar_tabela(conta, "itens", COLUNAS_ANALISE, meses)
+    df["fixo"] = df["fixo"].astype(bool)
+    return df
+
+
+def _meses_comparados(args, meses: list):
+    try:
+        return meses_comparados(meses, args.atual, args.anterior)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+def _imprimir(df: pd.DataFrame):
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.float_format", "{:,.2f}".format):
+        print(df.to_string(index=False) if df.index.name is None else df.to_string())
+
+
+# ==========================
+# SUBCOMANDOS
+# ==========================
+def cmd_comparar(args):
+    mes_atual, mes_anterior = _meses_comparados(args, armazenamento.meses_disponiveis(args.conta))
+    print(f"\nComparando {mes_atual} vs {mes_anterior}\n")
+    df = _carregar(args.conta, [mes_atual, mes_anterior])
+    if args.fixos:
+        df = df[df["fixo"]]
+    _imprimir(comparar_meses(df, mes_atual, mes_anterior))
+
+
+def cmd_top(args):
+    mes_atual, mes_anterior = _meses_comparados(args, armazenamento.meses_disponiveis(args.conta))
+    comparacao = comparar_meses(_carregar(args.conta, [mes_atual, mes_anterior]), mes_atual, mes_anterior)
+    print(f"\n📈 Top {args.n} aumentos ({mes_anterior} → {mes_atual})\n")
+    _imprimir(comparacao.head(args.n))
+    print(f"\n📉 Top {args.n} reduções ({mes_anterior} → {mes_atual})\n")
+    _imprimir(comparacao.sort_values("diferenca").head(args.n))
+
+
+def cmd_tendencia(args):
+    meses = armazenamento.meses_disponiveis(args.conta)
+    if args.ultimos:
+        meses = meses[-args.ultimos:]
+    df = _carregar(args.conta, meses)
+    if args.item:
+        df = df[df["item_canonico"].str.contains(args.item, case=False, regex=False)]
+    if args.total:
+        _imprimir(totais_mensais(df))
+    else:
+        _imprimir(tendencia(df))
+
+
+def cmd_exportar(args):
+    df = _carregar(args.conta, args.meses)
+    if args.formato == "csv":
+        df.to_csv(args.saida, index=False)
+    elif args.formato == "json":
+        df.to_json(args.saida, orient="records", force_ascii=False)
+    else:
+        try:
+            df.to_parquet(args.saida, index=False)
+        except ImportError:
+            print("Exportar Parquet requer o pacote pyarrow (pip install pyarrow).")
+            sys.exit(1)
+    print(f"✅ {len(df)} registros exportados para {args.saida}")
+
 
-# Ordena meses
-df = df.sort_values("mes")
+def cmd_sync(args):
+    from extrair_dados import buscar_e_extrair
+    from ingestao import processar_ingestao
+    resultado = processar_ingestao(args.conta, buscar_e_extrair(conta=args.conta))
+    print(f"\n✅ {len(resultado['dados'])} registros sincronizados para a conta {args.conta}")
 
-# Últimos dois meses
-meses = sorted(df["mes"].unique())
 
-if len(meses) < 2:
-    print("Precisa de pelo menos 2 meses.")
-    exit()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análises do BI Condomínio pela linha de comando")
+    parser.add_argument("--conta", default="local", help="Conta (e-mail) cujos dados serão lidos")
+    sub = parser.add_subparsers(dest="comando", required=True)
 
-mes_atual = meses[-1]
-mes_anterior = meses[-2]
+    for nome, ajuda in [("comparar", "Compara dois meses item a item"), ("top", "Maiores aumentos e reduções")]:
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument("--atual", help="Mês atual (YYYY_MM); padrão: último")
+        p.add_argument("--anterior", help="Mês de comparação (YYYY_MM); padrão: o anterior ao atual")
+        if nome == "comparar":
+            p.add_argument("--fixos", action="store_true", help="Apenas itens fixos")
+            p.set_defaults(func=cmd_comparar)
+        else:
+            p.add_argument("-n", type=int, default=5)
+            p.set_defaults(func=cmd_top)
 
-print(f"\nComparando {mes_atual} vs {mes_anterior}\n")
+    p = sub.add_parser("tendencia", help="Evolução mensal por item ou do total")
+    p.add_argument("--item", help="Filtra itens cujo nome contém este texto")
+    p.add_argument("--ultimos", type=int, help="Apenas os últimos N meses")
+    p.add_argument("--total", action="store_true", help="Mostra só o total mensal")
+    p.set_defaults(func=cmd_tendencia)
 
-df_atual = df[df["mes"] == mes_atual]
-df_ant = df[df["mes"] == mes_anterior]
+    p = sub.add_parser("exportar", help="Exporta os itens em JSON, CSV ou Parquet")
+    p.add_argument("--formato", choices=["json", "csv", "parquet"], default="csv")
+    p.add_argument("--saida", required=True)
+    p.add_argument("--meses", nargs="*", help="Exporta só estes meses (YYYY_MM)")
+    p.set_defaults(func=cmd_exportar)
 
-comparacao = df_atual.merge(
-    df_ant,
-    on="item",
-    suffixes=("_atual", "_anterior")
-)
+    p = sub.add_parser("sync", help="Busca os boletos no Gmail (token.json) e atualiza o banco")
+    p.set_defaults(func=cmd_sync)
 
-comparacao["diferenca"] = comparacao["valor_atual"] - comparacao["valor_anterior"]
-comparacao["percentual"] = (
-    comparacao["diferenca"] / comparacao["valor_anterior"]
-) * 100
+    args = parser.parse_args(argv)
+    args.func(args)
 
-comparacao = comparacao.sort_values("diferenca", ascending=False)
 
-print(comparacao[["item", "valor_anterior", "valor_atual", "diferenca", "percentual"]])
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+from agregados import com_unidade
+
+# Score robusto (mediana/MAD) acima do qual o valor do mês é considerado fora do padrão
+LIMIAR_SCORE = 3.5
+# Meses de histórico necessários antes de avaliar desvios de um item
+MIN_HISTORICO = 3
+# Quando o histórico é constante (MAD e desvio zero), usa 10% da mediana como escala
+TOLERANCIA_RELATIVA = 0.10
+
+COLUNAS_ANOMALIAS = ["mes", "unidade", "item", "tipo", "valor", "referencia", "score", "descricao"]
+# Cada unidade tem seu boleto: histórico, estreias e ausências são por unidade
+SERIE = ["unidade", "item_base"]
+
+
+# ==========================
+# DESVIO EM RELAÇÃO AO HISTÓRICO
+# ==========================
+def _desvios(serie: pd.DataFrame) -> list:
+    flags = []
+    for (unidade, item), grupo in serie.groupby(SERIE, sort=False, observed=True):
+        valores = grupo["valor"].to_numpy()
+        meses = grupo["mes"].to_numpy()
+        for i in range(MIN_HISTORICO, len(valores)):
+            historico = valores[:i]
+            mediana = np.median(historico)
+            escala = 1.4826 * np.median(np.abs(historico - mediana))
+            if escala == 0:
+                escala = historico.std()
+            if escala == 0:
+                escala = abs(mediana) * TOLERANCIA_RELATIVA or 1.0
+            score = (valores[i] - mediana) / escala
+            if abs(score) > LIMIAR_SCORE:
+                flags.append({
+                    "mes": meses[i],
+                    "unidade": unidade,
+                    "item": item,
+                    "tipo": "desvio",
+                    "valor": valores[i],
+                    "referencia": mediana,
+                    "score": round(float(score), 2),
+                    "descricao": "Acima do histórico" if score > 0 else "Abaixo do histórico",
+                })
+    return flags
+
+
+# ==========================
+# ITENS NOVOS
+# ==========================
+def _novos(serie: pd.DataFrame) -> list:
+    # No primeiro mês de cada unidade todos os itens seriam "novos"; não há o que comparar
+    estreias = serie.groupby(SERIE, sort=False, observed=True).head(1)
+    primeiro_mes = serie.groupby("unidade", observed=True)["mes"].min()
+    estreias = estreias[estreias["mes"] != estreias["unidade"].map(primeiro_mes).astype(str)]
+    return [
+        {
+            "mes": linha.mes,
+            "unidade": linha.unidade,
+            "item": linha.item_base,
+            "tipo": "novo",
+            "valor": linha.valor,
+            "referencia": 0.0,
+            "score": None,
+            "descricao": "Primeira ocorrência",
+        }
+        for linha in estreias.itertuples()
+    ]
+
+
+# ==========================
+# ITENS FIXOS AUSENTES
+# ==========================
+def _fixos_ausentes(serie: pd.DataFrame) -> list:
+    flags = []
+    for unidade, da_unidade in serie.groupby("unidade", sort=False, observed=True):
+        # Compara meses seguidos com boleto da unidade: mês sem boleto não é item ausente
+        meses = sorted(da_unidade["mes"].unique())
+        fixos = da_unidade[da_unidade["fixo"]]
+        presentes = fixos.groupby("mes")["item_base"].apply(set).to_dict()
+        valores = fixos.set_index(["mes", "item_base"])["valor"]
+        for anterior, atual in zip(meses, meses[1:]):
+            for item in sorted(presentes.get(anterior, set()) - presentes.get(atual, set())):
+                flags.append({
+                    "mes": atual,
+                    "unidade": unidade,
+                    "item": item,
+                    "tipo": "fixo_ausente",
+                    "valor": 0.0,
+                    "referencia": valores[(anterior, item)],
+                    "score": None,
+                    "descricao": "Item fixo não cobrado neste mês",
+                })
+    return flags
+
+
+# ==========================
+# COBRANÇAS DUPLICADAS
+# ==========================
+def _duplicados(df: pd.DataFrame) -> list:
+    # Unidades diferentes pagam as mesmas taxas: só é duplicado dentro do boleto da mesma unidade
+    repetidos = df[df.duplicated(["mes", "unidade", "item", "valor"], keep="first")]
+    return [
+        {
+            "mes": linha.mes,
+            "unidade": linha.unidade,
+            "item": linha.item,
+            "tipo": "duplicado",
+            "valor": linha.valor,
+            "referencia": linha.valor,
+            "score": None,
+            "descricao": "Mesmo item e valor cobrados mais de uma vez no mês",
+        }
+        for linha in repetidos.itertuples()
+    ]
+
+
+def detectar_anomalias(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Roda uma vez por ingestão sobre todo o histórico já canonizado e devolve
+    um DataFrame com uma linha por alerta (desvio, novo, fixo_ausente,
+    duplicado) de cada unidade. Somar as unidades esconderia o desvio de
+    uma delas e acusaria "ausente" o item de uma unidade sem boleto no mês.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS_ANOMALIAS)
+
+    base = com_unidade(df).assign(item_base=df["item_canonico"])
+
+    serie = (
+        base.groupby(SERIE + ["mes"], as_index=False, observed=True)
+        .agg(valor=("valor", "sum"), fixo=("fixo", "any"))
+        .sort_values(SERIE + ["mes"])
+    )
+
+    flags = (
+        _desvios(serie)
+        + _novos(serie)
+        + _fixos_ausentes(serie)
+        + _duplicados(base)
+    )
+    if not flags:
+        return pd.DataFrame(columns=COLUNAS_ANOMALIAS)
+    anomalias = pd.DataFrame(flags, columns=COLUNAS_ANOMALIAS)
+    anomalias["unidade"] = anomalias["unidade"].astype(str)
+    return anomalias.sort_values(["mes", "unidade", "tipo", "item"], ignore_index=True)
@@ -0,0 +1,256 @@
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import secrets
+import tempfile
+import threading
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import armazenamento
+from agregados import com_unidade, comparar_meses, filtrar_unidade, meses_comparados, totais_mensais, totais_por_unidade
+
+# Cada token dá acesso a uma conta: {sha256 do token: conta}. Criado com --criar-token
+ARQUIVO_TOKENS = "tokens_api.json"
+# Respostas menores que isso não compensam o gzip
+MIN_GZIP = 512
+# Respostas prontas por (conta, versão, caminho); descartadas quando a versão muda
+MAX_CACHE = 512
+
+_cache: dict = {}
+_cache_lock = threading.Lock()
+_tokens = (None, {})
+
+
+# ==========================
+# TOKENS POR CONTA
+# ==========================
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def carregar_tokens() -> dict:
+    """{hash do token: conta}, relido só quando o arquivo muda."""
+    global _tokens
+    try:
+        modificado = (os.path.abspath(ARQUIVO_TOKENS), os.stat(ARQUIVO_TOKENS).st_mtime_ns)
+    except FileNotFoundError:
+        return {}
+    if _tokens[0] != modificado:
+        with open(ARQUIVO_TOKENS) as f:
+            _tokens = (modificado, json.load(f))
+    return _tokens[1]
+
+
+def criar_token(conta: str) -> str:
+    """Gera um token para a conta; só o hash fica gravado, então ele é mostrado uma vez."""
+    token = secrets.token_urlsafe(32)
+    tokens = dict(carregar_tokens())
+    tokens[_hash_token(token)] = conta
+    diretorio = os.path.dirname(os.path.abspath(ARQUIVO_TOKENS))
+    with tempfile.NamedTemporaryFile("w", dir=diretorio, delete=False, suffix=".tmp") as f:
+        json.dump(tokens, f, indent=1)
+    os.chmod(f.name, 0o600)
+    os.replace(f.name, ARQUIVO_TOKENS)
+    return token
+
+
+def conta_do_token(autorizacao: str):
+    """Conta do token em "Authorization: Bearer <token>", ou None se não houver um válido."""
+    if not autorizacao or not autorizacao.startswith("Bearer "):
+        return None
+    return carregar_tokens().get(_hash_token(autorizacao[len("Bearer "):].strip()))
+
+
+# ==========================
+# ENDPOINTS (LEEM O CUBO MÊS × UNIDADE × ITEM)
+# ==========================
+def _cubo(conta: str, meses: list = None, params: dict = None):
+    """Cubo da conta; ?unidade=... restringe a uma unidade, sem ele é o prédio inteiro."""
+    cubo = com_unidade(armazenamento.carregar_tabela(
+        conta, "cubo", ["mes", "unidade", "item_id", "item_canonico", "fixo", "valor"], meses
+    ))
+    unidade = (params or {}).get("unidade", [None])[0]
+    return filtrar_unidade(cubo, unidade)
+
+
+def _registros(df) -> list:
+    registros = df.to_dict("records")
+    # NaN não é JSON válido
+    return [
+        {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in r.items()}
+        for r in registros
+    ]
+
+
+def ep_meses(conta: str, params: dict):
+    return armazenamento.meses_disponiveis(conta, "cubo")
+
+
+def ep_itens(conta: str, params: dict):
+    cubo = _cubo(conta, params.get("mes"), params)
+    itens = (
+        cubo.groupby(["mes", "item_id", "item_canonico"], as_index=False)
+        .agg(fixo=("fixo", "max"), valor=("valor", "sum"))
+    )
+    itens["fixo"] = itens["fixo"].astype(bool)
+    return _registros(itens.rename(columns={"item_canonico": "item"}))
+
+
+def ep_totais(conta: str, params: dict):
+    return _registros(totais_mensais(_cubo(conta, params=params)))
+
+
+def ep_unidades(conta: str, params: dict):
+    tabela = totais_por_unidade(_cubo(conta, params.get("mes")))
+    return [
+        {"unidade": unidade, "totais": {mes: float(valor) for mes, valor in linha.items()}}
+        for unidade, linha in tabela.iterrows()
+    ]
+
+
+def ep_comparacao(conta: str, params: dict):
+    # Mês desconhecido ou sem anterior vira 400 (ValueError)
+    atual, anterior = meses_comparados(
+        armazenamento.meses_disponiveis(conta, "cubo"),
+        params.get("atual", [None])[0],
+        params.get("anterior", [None])[0],
+    )
+    return _registros(comparar_meses(_cubo(conta, [atual, anterior], params), atual, anterior))
+
+
+ENDPOINTS = {
+    "/api/meses": ep_meses,
+    "/api/itens": ep_itens,
+    "/api/totais": ep_totais,
+    "/api/comparacao": ep_comparacao,
+    "/api/unidades": ep_unidades,
+}
+
+
+# ==========================
+# SERVIDOR HTTP
+# ==========================
+class Handler(BaseHTTPRequestHandler):
+    server_version = "BICondominio/1.0"
+    # Só para uso local: sem token, a conta vem de ?conta= (padrão: local)
+    exigir_token = True
+
+    def _enviar(self, status: int, corpo: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(corpo)
+
+    def _erro(self, status: int, mensagem: str):
+        corpo = json.dumps({"erro": mensagem}, ensure_ascii=False).encode()
+        self._enviar(status, corpo, {"Content-Type": "application/json; charset=utf-8"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = ENDPOINTS.get(url.path)
+        if endpoint is None:
+            return self._erro(404, "Endpoint não encontrado")
+
+        params = parse_qs(url.query)
+        conta = params.pop("conta", [None])[0]
+        if self.exigir_token:
+            conta_token = conta_do_token(self.headers.get("Authorization"))
+            if conta_token is None:
+                return self._erro(401, "Não autorizado")
+            if conta is not None and conta != conta_token:
+                return self._erro(403, "Token sem acesso a esta conta")
+            conta = conta_token
+        conta = conta or "local"
+        versao, atualizado_em = armazenamento.versao_atual(conta)
+        if versao is None:
+            return self._erro(404, "Conta sem dados")
+
+        # ETag fraco: o mesmo conteúdo vale com ou sem gzip
+        etag = f'W/"{versao}"'
+        modificado = datetime.fromisoformat(atualizado_em)
+        cabecalhos = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(modificado, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self._nao_modificado(etag, modificado):
+            return self._enviar(304, headers=cabecalhos)
+
+        try:
+            corpo, corpo_gzip = self._resposta(conta, versao, url, endpoint, params)
+        except ValueError as e:
+            return self._erro(400, str(e))
+
+        cabecalhos["Content-Type"] = "application/json; charset=utf-8"
+        if corpo_gzip is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            cabecalhos["Content-Encoding"] = "gzip"
+            corpo = corpo_gzip
+        self._enviar(200, corpo, cabecalhos)
+
+    do_HEAD = do_GET
+
+    def _nao_modificado(self, etag: str, modificado: datetime) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            etags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            return etag.removeprefix("W/") in etags or "*" in etags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return modificado.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _resposta(self, conta, versao, url, endpoint, params):
+        # A versão na chave invalida o cache sozinha quando há nova ingestão
+        chave = (conta, versao, url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        with _cache_lock:
+            if chave in _cache:
+                return _cache[chave]
+        corpo = json.dumps(endpoint(conta, params), ensure_ascii=False, default=str).encode()
+        corpo_gzip = gzip.compress(corpo, compresslevel=6) if len(corpo) >= MIN_GZIP else None
+        with _cache_lock:
+            if len(_cache) >= MAX_CACHE:
+                _cache.clear()
+            _cache[chave] = (corpo, corpo_gzip)
+        return corpo, corpo_gzip
+
+    def log_message(self, formato, *args):
+        print(f"{self.address_string()} - {formato % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON do BI Condomínio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8600)
+    parser.add_argument("--criar-token", metavar="CONTA", help="Gera um token de acesso à conta e sai")
+    parser.add_argument("--sem-autenticacao", action="store_true",
+                        help="Aceita requisições sem token (qualquer conta via ?conta=); só para uso local")
+    args = parser.parse_args()
+    if args.criar_token:
+        print(f"🔑 Token da conta {args.criar_token} (guarde agora, ele não é mostrado de novo):")
+        print(criar_token(args.criar_token))
+        return
+    if args.sem_autenticacao:
+        print("⚠️  API sem autenticação: qualquer cliente lê qualquer conta")
+        Handler.exigir_token = False
+    elif not carregar_tokens():
+        print(f"⚠️  Nenhum token em {ARQUIVO_TOKENS}: todas as requisições serão recusadas (use --criar-token)")
+    servidor = ThreadingHTTPServer((args.host, args.porta), Handler)
+    print(f"🚀 API em http://{args.host}:{args.porta}/api/meses")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
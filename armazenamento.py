@@ -0,0 +1,216 @@
+import hashlib
+import sqlite3
+from datetime import datetime, timezone
+import pandas as pd
+
+ARQUIVO_BANCO = "condominio.db"
+# Tabelas compartilhadas entre contas (ex: aliases de itens) usam esta conta
+CONTA_COMPARTILHADA = "*"
+
+
+# ==========================
+# CONEXÃO
+# ==========================
+def _conectar():
+    # Ingestões de várias contas (dashboard, agendador, importação) disputam o arquivo
+    return sqlite3.connect(ARQUIVO_BANCO, timeout=30)
+
+
+def _citar(nome: str) -> str:
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _colunas_existentes(con, tabela: str) -> list:
+    return [linha[1] for linha in con.execute(f'PRAGMA table_info("{tabela}")')]
+
+
+def _garantir_colunas(con, tabela: str, df: pd.DataFrame):
+    # Tabelas criadas por versões anteriores ganham as colunas novas sem migração manual
+    existentes = _colunas_existentes(con, tabela)
+    if not existentes:
+        return
+    for coluna in df.columns:
+        if coluna not in existentes:
+            con.execute(f'ALTER TABLE "{tabela}" ADD COLUMN "{coluna}"')
+
+
+# ==========================
+# LEITURA E ESCRITA POR CONTA
+# ==========================
+def _travar_escrita(con):
+    # Contas diferentes gravando ao mesmo tempo num banco novo: sem a trava,
+    # duas conexões viam a tabela ausente e ambas tentavam criá-la
+    con.execute("BEGIN IMMEDIATE")
+
+
+def salvar_tabela(conta: str, tabela: str, df: pd.DataFrame):
+    """Substitui as linhas da conta na tabela pelo conteúdo de df."""
+    df = df.copy()
+    df.insert(0, "conta", conta)
+    with _conectar() as con:
+        _travar_escrita(con)
+        _garantir_colunas(con, tabela, df)
+        if _colunas_existentes(con, tabela):
+            con.execute(f'DELETE FROM "{tabela}" WHERE conta = ?', (conta,))
+        df.to_sql(tabela, con, if_exists="append", index=False)
+        if "mes" in df.columns:
+            con.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{tabela}_conta_mes" ON "{tabela}" (conta, mes)'
+            )
+        if "unidade" in df.columns:
+            con.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{tabela}_conta_unidade" ON "{tabela}" (conta, unidade)'
+            )
+
+
+def substituir_linhas(conta: str, tabela: str, df: pd.DataFrame, chave: str):
+    """Troca só as linhas da conta cujo valor em `chave` aparece em df (upsert por chave)."""
+    df = df.copy()
+    df.insert(0, "conta", conta)
+    valores = df[chave].tolist()
+    with _conectar() as con:
+        _travar_escrita(con)
+        _garantir_colunas(con, tabela, df)
+        if _colunas_existentes(con, tabela):
+            con.execute(
+                f'DELETE FROM "{tabela}" WHERE conta = ? AND {_citar(chave)} IN ({", ".join("?" for _ in valores)})',
+                [conta] + valores,
+            )
+        df.to_sql(tabela, con, if_exists="append", index=False)
+        con.execute(
+            f'CREATE INDEX IF NOT EXISTS "idx_{tabela}_conta_{chave}" ON "{tabela}" (conta, {_citar(chave)})'
+        )
+
+
+def carregar_tabela(conta: str, tabela: str, colunas: list = None, meses: list = None) -> pd.DataFrame:
+    """
+    Lê as linhas da conta, buscando só as colunas pedidas e, se informado,
+    só os meses pedidos (o filtro é feito pelo SQLite, não em memória).
+    """
+    with _conectar() as con:
+        existentes = _colunas_existentes(con, tabela)
+        if not existentes:
+            return pd.DataFrame(columns=colunas or [])
+        selecionadas = [c for c in (colunas or existentes) if c in existentes and c != "conta"]
+        sql = f'SELECT {", ".join(_citar(c) for c in selecionadas)} FROM "{tabela}" WHERE conta = ?'
+        parametros = [conta]
+        if meses:
+            sql += f' AND mes IN ({", ".join("?" for _ in meses)})'
+            parametros.extend(meses)
+        return pd.read_sql_query(sql, con, params=parametros)
+
+
+def meses_disponiveis(conta: str, tabela: str = "itens") -> list:
+    with _conectar() as con:
+        if "mes" not in _colunas_existentes(con, tabela):
+            return []
+        linhas = con.execute(f'SELECT DISTINCT mes FROM "{tabela}" WHERE conta = ? ORDER BY mes', (conta,))
+        return [linha[0] for linha in linhas]
+
+
+def versao_dados(df: pd.DataFrame) -> str:
+    """Identificador do conteúdo de df, usado como chave dos caches derivados."""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:16]
+
+
+# ==========================
+# VERSÃO DOS DADOS POR CONTA
+# ==========================
+def registrar_versao(conta: str, versao: str):
+    with _conectar() as con:
+        con.execute(
+            'CREATE TABLE IF NOT EXISTS versoes (conta TEXT PRIMARY KEY, versao TEXT, atualizado_em TEXT)'
+        )
+        con.execute(
+            'INSERT OR REPLACE INTO versoes VALUES (?, ?, ?)',
+            (conta, versao, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        )
+
+
+def versao_atual(conta: str):
+    """(versao, atualizado_em) da última ingestão da conta, ou (None, None)."""
+    with _conectar() as con:
+        if not _colunas_existentes(con, "versoes"):
+            return None, None
+        linha = con.execute('SELECT versao, atualizado_em FROM versoes WHERE conta = ?', (conta,)).fetchone()
+        return linha if linha else (None, None)
+
+
+# ==========================
+# ÍNDICE DE ITENS CANÔNICOS (COMPARTILHADO ENTRE PROCESSOS)
+# ==========================
+# Dashboard, API e agendador criam IDs ao mesmo tempo: o ID sai do
+# INTEGER PRIMARY KEY do SQLite e cada alias é gravado com INSERT OR IGNORE,
+# então o primeiro processo a gravar vence e os demais relêem o valor dele.
+def _garantir_canonicos(con):
+    con.execute('CREATE TABLE IF NOT EXISTS canonicos (item_id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE)')
+    con.execute('CREATE TABLE IF NOT EXISTS apelidos (chave TEXT PRIMARY KEY, item_id INTEGER NOT NULL)')
+
+
+def carregar_canonicos(apos_id: int = 0):
+    """({item_id: nome}, {chave: item_id}); só os itens com ID maior que apos_id."""
+    with _conectar() as con:
+        _garantir_canonicos(con)
+        nomes = dict(con.execute('SELECT item_id, nome FROM canonicos WHERE item_id > ?', (apos_id,)))
+        aliases = dict(con.execute('SELECT chave, item_id FROM apelidos')) if apos_id == 0 else {}
+        return nomes, aliases
+
+
+def criar_canonico(nome: str) -> int:
+    """ID do item com esse nome, criando-o se nenhum processo criou ainda."""
+    with _conectar() as con:
+        _garantir_canonicos(con)
+        con.execute('INSERT OR IGNORE INTO canonicos (nome) VALUES (?)', (nome,))
+        return con.execute('SELECT item_id FROM canonicos WHERE nome = ?', (nome,)).fetchone()[0]
+
+
+def buscar_apelido(chave: str):
+    with _conectar() as con:
+        _garantir_canonicos(con)
+        linha = con.execute('SELECT item_id FROM apelidos WHERE chave = ?', (chave,)).fetchone()
+        return linha[0] if linha else None
+
+
+def gravar_apelido(chave: str, item_id: int) -> int:
+    """Grava o alias se a chave ainda não tem um e devolve o ID que ficou valendo."""
+    with _conectar() as con:
+        _garantir_canonicos(con)
+        con.execute('INSERT OR IGNORE INTO apelidos VALUES (?, ?)', (chave, item_id))
+        return con.execute('SELECT item_id FROM apelidos WHERE chave = ?', (chave,)).fetchone()[0]
+
+
+# ==========================
+# MANIFESTO DO ARQUIVO DE PDFs
+# ==========================
+# Uma linha por (conta, mensagem, anexo) arquivado. Gravar uma entrada é um
+# INSERT, sem reler nem regravar as demais, e o SQLite serializa as gravações
+# da sincronização, da importação e do agendador, mesmo em processos distintos.
+COLUNAS_MANIFESTO = ["conta", "mensagem_id", "arquivo", "data", "ano_mes", "remetente", "hash", "tamanho"]
+
+
+def _garantir_manifesto(con):
+    con.execute(
+        'CREATE TABLE IF NOT EXISTS manifesto (conta TEXT NOT NULL, mensagem_id TEXT NOT NULL, '
+        'arquivo TEXT NOT NULL, data TEXT, ano_mes TEXT, remetente TEXT, hash TEXT NOT NULL, '
+        'tamanho INTEGER, PRIMARY KEY (conta, mensagem_id, arquivo))'
+    )
+
+
+def gravar_entradas_manifesto(entradas: list):
+    """Grava as entradas ({coluna: valor}); a mesma mensagem e anexo da conta é substituída."""
+    with _conectar() as con:
+        _garantir_manifesto(con)
+        con.executemany(
+            f'INSERT OR REPLACE INTO manifesto VALUES ({", ".join("?" for _ in COLUNAS_MANIFESTO)})',
+            [[entrada.get(coluna) for coluna in COLUNAS_MANIFESTO] for entrada in entradas],
+        )
+
+
+def carregar_manifesto(conta: str = None) -> list:
+    """Entradas do manifesto, de uma conta ou de todas."""
+    with _conectar() as con:
+        _garantir_manifesto(con)
+        sql = f'SELECT {", ".join(COLUNAS_MANIFESTO)} FROM manifesto'
+        linhas = con.execute(sql + ' WHERE conta = ?', (conta,)) if conta else con.execute(sql)
+        return [dict(zip(COLUNAS_MANIFESTO, linha)) for linha in linhas]
@@ -0,0 +1,279 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+DIRETORIO_ARQUIVO = "pdfs"
+# Manifesto das versões anteriores: importado para o banco (armazenamento) no primeiro uso
+ARQUIVO_MANIFESTO = os.path.join(DIRETORIO_ARQUIVO, "manifesto.json")
+# Entradas gravadas antes de o manifesto guardar a conta vieram do token.json local
+CONTA_LEGADA = "local"
+
+
+# ==========================
+# ARMAZENAMENTO ENDEREÇADO POR CONTEÚDO
+# ==========================
+def caminho_objeto(hash_pdf: str) -> str:
+    return os.path.join(DIRETORIO_ARQUIVO, "objetos", hash_pdf[:2], f"{hash_pdf}.pdf")
+
+
+def gravar_atomico(caminho: str, escrever):
+    """Grava via arquivo temporário + rename: quem lê nunca vê o arquivo pela metade."""
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=diretorio, delete=False, suffix=".tmp") as f:
+        escrever(f)
+    os.replace(f.name, caminho)
+
+
+def _importar_manifesto_json():
+    """Passa o manifesto.json antigo para o banco e o renomeia para .importado."""
+    if not os.path.exists(ARQUIVO_MANIFESTO):
+        return
+    import armazenamento
+    try:
+        with open(ARQUIVO_MANIFESTO) as f:
+            antigo = json.load(f)
+    except Exception:
+        return
+    armazenamento.gravar_entradas_manifesto(
+        [{"conta": CONTA_LEGADA, **entrada} for entrada in antigo.values()]
+    )
+    try:
+        os.replace(ARQUIVO_MANIFESTO, ARQUIVO_MANIFESTO + ".importado")
+    except FileNotFoundError:
+        # Outro processo importou ao mesmo tempo (INSERT OR REPLACE: mesmas linhas)
+        pass
+
+
+def _entradas(conta: str = None) -> list:
+    import armazenamento
+    _importar_manifesto_json()
+    return armazenamento.carregar_manifesto(conta)
+
+
+def carregar_manifesto() -> dict:
+    """{conta/mensagem/arquivo: entrada} de todas as contas."""
+    return {f"{e['conta']}/{e['mensagem_id']}/{e['arquivo']}": e for e in _entradas()}
+
+
+def guardar_objeto(pdf, hash_pdf: str = None) -> str:
+    """
+    Grava o PDF (bytes ou mmap) pelo SHA-256 do conteúdo, se ainda não
+    existe, e devolve o hash. Quem já calculou o hash o passa adiante.
+    """
+    hash_pdf = hash_pdf or hashlib.sha256(pdf).hexdigest()
+    caminho = caminho_objeto(hash_pdf)
+    if not os.path.exists(caminho):
+        gravar_atomico(caminho, lambda f: f.write(pdf))
+    return hash_pdf
+
+
+def arquivar(pdf, mensagem_id: str, filename: str, data: str, ano_mes: str, remetente: str,
+             conta: str = CONTA_LEGADA, hash_pdf: str = None) -> str:
+    """
+    Guarda o PDF (bytes ou mmap) pelo SHA-256 do conteúdo e registra a origem
+    e a conta no manifesto. O mesmo PDF recebido duas vezes ocupa um único
+    arquivo, mas cada conta que o recebeu tem sua própria entrada.
+    """
+    hash_pdf = guardar_objeto(pdf, hash_pdf)
+    registrar_entrada(hash_pdf, mensagem_id, filename, data, ano_mes, remetente, conta)
+    return hash_pdf
+
+
+def registrar_entrada(hash_pdf: str, mensagem_id: str, filename: str, data: str, ano_mes: str, remetente: str,
+                      conta: str = CONTA_LEGADA):
+    """Entrada do manifesto para um objeto já guardado (ver guardar_objeto)."""
+    import armazenamento
+    _importar_manifesto_json()
+    armazenamento.gravar_entradas_manifesto([{
+        "conta": conta,
+        "mensagem_id": mensagem_id,
+        "arquivo": filename,
+        "data": data,
+        "ano_mes": ano_mes,
+        "remetente": remetente,
+        "hash": hash_pdf,
+        "tamanho": os.path.getsize(caminho_objeto(hash_pdf)),
+    }])
+
+
+def meses_arquivados() -> dict:
+    """{hash: ano_mes} de todo PDF já arquivado, em qualquer conta."""
+    return {e["hash"]: e["ano_mes"] for e in _entradas() if e.get("ano_mes")}
+
+
+def mes_do_documento(hash_pdf: str, mes_recebido: str, arquivados: dict) -> str:
+    """
+    Regra única do mês de um PDF, na sincronização do Gmail e na importação
+    local: o mês com que o mesmo PDF já foi arquivado; senão o mês em que foi
+    recebido (data do e-mail, ou YYYY_MM no nome do arquivo importado). None
+    deixa o parse usar o vencimento impresso. Assim o boleto que chega pelos
+    dois caminhos cai no mesmo mês. O mês escolhido fica em `arquivados`,
+    para o mesmo PDF repetido no lote.
+    """
+    if not arquivados.get(hash_pdf) and mes_recebido:
+        arquivados[hash_pdf] = mes_recebido
+    return arquivados.get(hash_pdf)
+
+
+def entradas_da_conta(conta: str) -> list:
+    return _entradas(conta)
+
+
+@contextmanager
+def abrir_mmap(hash_pdf: str):
+    with open(caminho_objeto(hash_pdf), "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            yield mapa
+
+
+# ==========================
+# REPROCESSAMENTO OFFLINE
+# ==========================
+def _reprocessar_documento(hash_pdf: str, ano_mes: str, modelo: str, preciso: bool = False):
+    # Roda nos processos do pool: só parseia; quem grava a conciliação é o processo principal
+    from extrair_dados import processar_documento
+    with abrir_mmap(hash_pdf) as mapa:
+        return processar_documento(mapa, ano_mes, modelo, preciso, documento=hash_pdf)
+
+
+def _modelo(entrada: dict) -> str:
+    from modelos_boleto import MODELO_PADRAO, modelo_do_remetente
+    modelo = modelo_do_remetente(entrada.get("remetente", ""))
+    return modelo.nome if modelo else MODELO_PADRAO
+
+
+def reprocessar(conta: str, max_processos: int = None) -> list:
+    """
+    Re-extrai os itens dos PDFs arquivados da conta em paralelo, sem acessar
+    o Gmail. Cada PDF distinto é parseado uma vez; o resultado vale para
+    todas as mensagens que o trouxeram, como na sincronização. Documentos
+    que a conta já conciliou no modo preciso continuam no modo preciso.
+    """
+    from conciliacao import MODO_PRECISO, MODO_RAPIDO, carregar_documentos, registrar_documento
+
+    entradas = sorted(entradas_da_conta(conta), key=lambda e: (e["ano_mes"], e["mensagem_id"]))
+    unicos = sorted({(e["hash"], e["ano_mes"], _modelo(e)) for e in entradas})
+    if not unicos:
+        return []
+    documentos = carregar_documentos(conta)
+    precisos = set(documentos.loc[documentos["modo"] == MODO_PRECISO, "documento"]) if not documentos.empty else set()
+    hashes, meses, modelos = zip(*unicos)
+    with ProcessPoolExecutor(max_workers=max_processos) as pool:
+        resultados = dict(zip(unicos, pool.map(
+            _reprocessar_documento, hashes, meses, modelos, [h in precisos for h in hashes]
+        )))
+    for (hash_pdf, ano_mes, modelo), (_, _, conciliacao) in resultados.items():
+        modo = MODO_PRECISO if hash_pdf in precisos else MODO_RAPIDO
+        registrar_documento(conta, hash_pdf, ano_mes, modelo, modo, conciliacao)
+    return [item for e in entradas for item in resultados[(e["hash"], e["ano_mes"], _modelo(e))][1]]
+
+
+def _formatar_diferenca(diferenca) -> str:
+    return "—" if diferenca is None or diferenca != diferenca else f"{diferenca:+.2f}"
+
+
+def reprocessar_divergentes(conta: str, max_processos: int = None) -> dict:
+    """
+    Re-extrai no modo preciso só os documentos cuja soma dos itens não bate
+    com o total declarado. Onde o resultado novo chega mais perto do total,
+    os itens daquele documento são trocados no banco da conta e a
+    conciliação é atualizada; os demais documentos não são tocados.
+    Devolve {hash: status final} dos documentos reprocessados.
+    """
+    import armazenamento
+    from conciliacao import DIVERGENTE, MODO_PRECISO, carregar_documentos, melhorou, registrar_documento
+    from ingestao import processar_ingestao
+
+    divergentes = carregar_documentos(conta, [DIVERGENTE])
+    divergentes = divergentes[divergentes["documento"].map(lambda h: os.path.exists(caminho_objeto(h)))]
+    if divergentes.empty:
+        print("Nenhum documento divergente no arquivo local.")
+        return {}
+
+    existentes = armazenamento.carregar_tabela(conta, "itens", ["mes", "unidade", "item", "valor", "documento"])
+    if "documento" not in existentes.columns:
+        existentes["documento"] = None
+    # Itens gravados antes da conciliação não sabem de que documento vieram
+    da_conta = divergentes[divergentes["documento"].isin(existentes["documento"])]
+    if len(da_conta) < len(divergentes):
+        print(f"⚠️  {len(divergentes) - len(da_conta)} documento(s) divergente(s) sem itens identificados na conta {conta}")
+    if da_conta.empty:
+        return {}
+
+    print(f"Reprocessando {len(da_conta)} documento(s) no modo preciso...")
+    registros = da_conta.to_dict("records")
+    with ProcessPoolExecutor(max_workers=max_processos) as pool:
+        resultados = list(pool.map(
+            _reprocessar_documento,
+            [r["documento"] for r in registros],
+            [r["ano_mes"] for r in registros],
+            [r["modelo"] for r in registros],
+            [True] * len(registros),
+        ))
+
+    trocados, novos, status = set(), [], {}
+    for registro, (_, itens, conciliacao) in zip(registros, resultados):
+        documento = registro["documento"]
+        if melhorou(registro, conciliacao):
+            registrar_documento(conta, documento, registro["ano_mes"], registro["modelo"], MODO_PRECISO, conciliacao)
+            trocados.add(documento)
+            novos.extend(itens)
+            status[documento] = conciliacao["status"]
+        else:
+            status[documento] = registro["status"]
+        print(f"  {registro['ano_mes']}  {documento[:12]}  diferença {registro['diferenca']:+.2f} → "
+              f"{_formatar_diferenca(conciliacao['diferenca'])}  ({status[documento]})")
+
+    if trocados:
+        mantidos = existentes[~existentes["documento"].isin(trocados)]
+        processar_ingestao(conta, mantidos.to_dict("records") + novos)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquivo local dos boletos em PDF")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_lis = sub.add_parser("listar", help="Mostra os PDFs registrados no manifesto")
+    p_lis.add_argument("--conta", default=None, help="Só os PDFs desta conta")
+    p_rep = sub.add_parser("reprocessar", help="Re-extrai todo o histórico a partir do arquivo local")
+    p_rep.add_argument("--conta", default="local")
+    p_rep.add_argument("--processos", type=int, default=None)
+    p_rep.add_argument("--divergentes", action="store_true",
+                       help="Só os documentos que não batem com o total, no modo preciso (mais lento)")
+    p_con = sub.add_parser("conciliacao", help="Mostra a conciliação do total declarado de cada documento")
+    p_con.add_argument("--conta", default="local")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        entradas = entradas_da_conta(args.conta) if args.conta else list(carregar_manifesto().values())
+        for entrada in sorted(entradas, key=lambda e: e["ano_mes"]):
+            print(f"{entrada['ano_mes']}  {entrada['hash'][:12]}  {entrada['tamanho']//1024:>6}KB  "
+                  f"{entrada['conta']}  {entrada['mensagem_id']}/{entrada['arquivo']}")
+    elif args.comando == "conciliacao":
+        from conciliacao import carregar_documentos, resumo
+        documentos = carregar_documentos(args.conta)
+        for _, doc in (documentos.sort_values("ano_mes") if not documentos.empty else documentos).iterrows():
+            print(f"{doc['ano_mes']}  {doc['documento'][:12]}  {doc['status']:<11}"
+                  f"{_formatar_diferenca(doc['diferenca']):>10}  ({doc['modo']})")
+        print(", ".join(f"{status}: {n}" for status, n in resumo(args.conta).items()) or "Nenhum documento conciliado.")
+    elif args.comando == "reprocessar" and args.divergentes:
+        status = reprocessar_divergentes(args.conta, args.processos)
+        if status:
+            from conciliacao import CONFERE
+            conferem = sum(1 for s in status.values() if s == CONFERE)
+            print(f"\n✅ {conferem} de {len(status)} documento(s) passaram a conferir com o total")
+    elif args.comando == "reprocessar":
+        from ingestao import processar_ingestao
+        dados = reprocessar(args.conta, args.processos)
+        resultado = processar_ingestao(args.conta, dados)
+        print(f"\n✅ {len(resultado['dados'])} registros reprocessados para a conta {args.conta}")
+
+
+if __name__ == "__main__":
+    main()
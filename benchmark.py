@@ -0,0 +1,355 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+# ==========================
+# PERFIL DE IMPORTAÇÃO
+# ==========================
+# Módulos do caminho de inicialização do dashboard e as dependências pesadas
+MODULOS_IMPORTACAO = [
+    "streamlit",
+    "pandas",
+    "google_login",
+    "armazenamento",
+    "corretor_credenciais",
+    "estado_compartilhado",
+    "gmail_cliente",
+    "executor_gmail",
+    "extrair_dados",
+    "gmail_async",
+    "ingestao",
+    "previsao",
+    "plotly.express",
+    "reportlab.platypus",
+    "pdfplumber",
+    "googleapiclient.discovery",
+    "google_auth_oauthlib.flow",
+]
+
+# Dependências que não podem ser carregadas só por importar os módulos leves. O que
+# o próprio streamlit importa (ex: plotly, via streamlit.elements.plotly_chart) não
+# conta: o dashboard paga isso de qualquer jeito e o login precisa do streamlit
+PESADOS = ["pdfplumber", "googleapiclient", "reportlab", "google_auth_oauthlib", "plotly", "httpx", "redis", "pytesseract"]
+LEVES = ["google_login", "corretor_credenciais", "estado_compartilhado", "gmail_cliente", "executor_gmail", "extrair_dados", "gmail_async"]
+
+
+def perfil_importacao(modulo: str, repeticoes: int = 3):
+    """
+    Importa o módulo em um interpretador novo com -X importtime e devolve
+    (tempo cumulativo em ms, lista de (self_us, pacote) importados), usando a
+    execução mais rápida entre as repetições. Retorna None se a importação falhar.
+    """
+    melhor = None
+    for _ in range(repeticoes):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            return None
+        importados = []
+        total_us = 0
+        for linha in proc.stderr.splitlines():
+            if not linha.startswith("import time:") or "self [us]" in linha:
+                continue
+            self_us, cumulativo_us, nome = linha[len("import time:"):].split("|", 2)
+            importados.append((int(self_us), nome.strip()))
+            if nome.strip() == modulo:
+                total_us = int(cumulativo_us)
+        if melhor is None or total_us < melhor[0]:
+            melhor = (total_us, importados)
+    return melhor[0] / 1000, melhor[1]
+
+
+def _pacotes(importados: list) -> set:
+    return {nome.split(".")[0] for _, nome in importados}
+
+
+def pesados_indevidos(importados: list, base: set) -> list:
+    """Pacotes de PESADOS carregados pelo módulo, fora os que a base (o streamlit) já carrega."""
+    return sorted(_pacotes(importados).intersection(PESADOS) - base)
+
+
+def rodar_importacao(repeticoes: int, top: int) -> int:
+    falhas = 0
+    base = set()
+    print(f"{'Módulo':<28}{'Tempo (ms)':>12}  Mais lentos")
+    for modulo in MODULOS_IMPORTACAO:
+        resultado = perfil_importacao(modulo, repeticoes)
+        if resultado is None:
+            print(f"{modulo:<28}{'—':>12}  não instalado")
+            continue
+        tempo_ms, importados = resultado
+        if modulo == "streamlit":
+            base = _pacotes(importados)
+        lentos = ", ".join(
+            f"{nome} {self_us / 1000:.1f}"
+            for self_us, nome in sorted(importados, reverse=True)[:top]
+        )
+        print(f"{modulo:<28}{tempo_ms:>12.1f}  {lentos}")
+
+        if modulo in LEVES:
+            indevidos = pesados_indevidos(importados, base)
+            if indevidos:
+                falhas += 1
+                print(f"  ❌ {modulo} carrega {', '.join(indevidos)} na importação")
+    return 1 if falhas else 0
+
+
+# ==========================
+# CORPUS DE REGRESSÃO DO PARSER
+# ==========================
+DIRETORIO_CORPUS = "corpus"
+ARQUIVO_BASELINE = os.path.join(DIRETORIO_CORPUS, "baseline.json")
+# Falha se a vazão cair mais que isso em relação à baseline registrada
+TOLERANCIA_LENTIDAO = 0.30
+# Piso absoluto quando não há baseline registrada na máquina (o corpus roda a
+# ~60-90 docs/s num núcleo; abaixo disso algo ficou ordens de grandeza mais lento)
+MINIMO_DOCS_POR_SEGUNDO = 15.0
+SUFIXO_ESPERADO = ".esperado.json"
+
+
+def carregar_corpus() -> list:
+    """
+    Cada documento do corpus é um .pdf (ou .txt com o texto já extraído) com
+    um <nome>.esperado.json ao lado: {"mes": "YYYY_MM", "itens": [{"unidade", "item", "valor"}]}
+    e, opcionalmente, "modelo" (nome do modelo de boleto; padrão: o da Metta)
+    e "itens_ocr" (itens das páginas digitalizadas, cobrados só com OCR).
+    """
+    documentos = []
+    for caminho in sorted(glob.glob(os.path.join(DIRETORIO_CORPUS, "*.pdf")) +
+                          glob.glob(os.path.join(DIRETORIO_CORPUS, "*.txt"))):
+        base = os.path.splitext(caminho)[0]
+        esperado_path = base + SUFIXO_ESPERADO
+        esperado = None
+        if os.path.exists(esperado_path):
+            with open(esperado_path) as f:
+                esperado = json.load(f)
+        documentos.append({"nome": os.path.basename(base), "caminho": caminho, "esperado": esperado})
+    return documentos
+
+
+def _mes_padrao(nome: str) -> str:
+    # Documentos novos sem .esperado.json usam o YYYY_MM do fim do nome do arquivo
+    return nome[-7:]
+
+
+def _modelo_documento(documento: dict) -> str:
+    from modelos_boleto import MODELO_PADRAO
+    return (documento["esperado"] or {}).get("modelo", MODELO_PADRAO)
+
+
+def _extrair_documento(documento: dict, conteudo) -> list:
+    from extrair_dados import extrair_itens, extrair_texto_pdf
+    mes = documento["esperado"]["mes"] if documento["esperado"] else _mes_padrao(documento["nome"])
+    texto = extrair_texto_pdf(conteudo) if documento["caminho"].endswith(".pdf") else conteudo
+    return extrair_itens(texto, mes, _modelo_documento(documento))
+
+
+def _conciliar_documento(documento: dict, conteudo, obtido: list) -> dict:
+    from conciliacao import conciliar
+    from extrair_dados import extrair_texto_pdf
+    from modelos_boleto import MODELOS
+    texto = extrair_texto_pdf(conteudo) if documento["caminho"].endswith(".pdf") else conteudo
+    return conciliar(obtido, MODELOS[_modelo_documento(documento)].total_declarado(texto))
+
+
+def _ler_conteudo(documento: dict):
+    modo = "rb" if documento["caminho"].endswith(".pdf") else "r"
+    with open(documento["caminho"], modo) as f:
+        return f.read()
+
+
+def _itens_esperados(esperado: dict) -> list:
+    # Itens de páginas digitalizadas só saem com o Tesseract instalado
+    itens = list(esperado["itens"])
+    if esperado.get("itens_ocr"):
+        from ocr import disponivel
+        if disponivel():
+            itens += esperado["itens_ocr"]
+    return itens
+
+
+def _chave_item(d: dict):
+    return d.get("unidade", ""), d["item"], round(float(d["valor"]), 2)
+
+
+def _diferencas(esperado: list, obtido: list):
+    esperado_c = Counter(map(_chave_item, esperado))
+    obtido_c = Counter(map(_chave_item, obtido))
+    return sorted((esperado_c - obtido_c).elements()), sorted((obtido_c - esperado_c).elements())
+
+
+def rodar_corpus(atualizar: bool, registrar_baseline: bool, tempo_minimo: float, minimo_absoluto: float = None) -> int:
+    if minimo_absoluto is None:
+        minimo_absoluto = MINIMO_DOCS_POR_SEGUNDO
+    documentos = carregar_corpus()
+    if not documentos:
+        print(f"Nenhum documento em {DIRETORIO_CORPUS}/")
+        return 1
+    conteudos = {d["nome"]: _ler_conteudo(d) for d in documentos}
+
+    # 1. Regressão: compara a saída do parser com o esperado
+    falhas = 0
+    for documento in documentos:
+        obtido = _extrair_documento(documento, conteudos[documento["nome"]])
+        if atualizar or documento["esperado"] is None:
+            esperado = {
+                "mes": obtido[0]["mes"] if obtido else _mes_padrao(documento["nome"]),
+                "modelo": _modelo_documento(documento),
+                "itens": [{"unidade": d["unidade"], "item": d["item"], "valor": d["valor"]} for d in obtido],
+            }
+            itens_ocr = (documento["esperado"] or {}).get("itens_ocr")
+            if itens_ocr:
+                # Com o OCR instalado, os itens da página digitalizada continuam à parte
+                restantes = Counter(map(_chave_item, itens_ocr))
+                itens = []
+                for item in esperado["itens"]:
+                    if restantes[_chave_item(item)] > 0:
+                        restantes[_chave_item(item)] -= 1
+                    else:
+                        itens.append(item)
+                esperado["itens"], esperado["itens_ocr"] = itens, itens_ocr
+            with open(os.path.splitext(documento["caminho"])[0] + SUFIXO_ESPERADO, "w") as f:
+                json.dump(esperado, f, ensure_ascii=False, indent=1)
+            print(f"📝 {documento['nome']}: {len(obtido)} itens gravados como esperado")
+            continue
+        faltando, sobrando = _diferencas(_itens_esperados(documento["esperado"]), obtido)
+        if faltando or sobrando:
+            falhas += 1
+            print(f"❌ {documento['nome']}")
+            for unidade, item, valor in faltando:
+                print(f"    - faltando: [{unidade}] {item} = {valor:.2f}")
+            for unidade, item, valor in sobrando:
+                print(f"    + a mais:   [{unidade}] {item} = {valor:.2f}")
+        else:
+            print(f"✅ {documento['nome']}: {len(obtido)} itens")
+
+        # Documento com total impresso precisa fechar com a soma dos itens extraídos
+        from conciliacao import DIVERGENTE
+        conciliacao = _conciliar_documento(documento, conteudos[documento["nome"]], obtido)
+        if conciliacao["status"] == DIVERGENTE:
+            falhas += 1
+            print(f"❌ {documento['nome']}: soma {conciliacao['soma_itens']:.2f} ≠ total declarado "
+                  f"{conciliacao['total_declarado']:.2f} ({conciliacao['diferenca']:+.2f})")
+
+    # Todo modelo registrado precisa de pelo menos um documento no corpus
+    from modelos_boleto import MODELOS
+    cobertos = {_modelo_documento(d) for d in documentos}
+    for modelo in sorted(set(MODELOS) - cobertos):
+        falhas += 1
+        print(f"❌ Modelo {modelo} sem documento no corpus")
+
+    # 2. Vazão: repete o corpus inteiro até acumular tempo_minimo segundos
+    rodadas = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < tempo_minimo:
+        for documento in documentos:
+            _extrair_documento(documento, conteudos[documento["nome"]])
+        rodadas += 1
+    decorrido = time.perf_counter() - inicio
+    docs_por_segundo = rodadas * len(documentos) / decorrido
+    print(f"\n⏱️  {docs_por_segundo:,.1f} documentos/s ({rodadas} rodadas em {decorrido:.2f}s)")
+
+    if registrar_baseline:
+        with open(ARQUIVO_BASELINE, "w") as f:
+            json.dump({"docs_por_segundo": docs_por_segundo}, f, indent=1)
+        print(f"📝 Baseline gravada em {ARQUIVO_BASELINE}")
+    elif os.path.exists(ARQUIVO_BASELINE):
+        with open(ARQUIVO_BASELINE) as f:
+            baseline = json.load(f)["docs_por_segundo"]
+        minimo = baseline * (1 - TOLERANCIA_LENTIDAO)
+        if docs_por_segundo < minimo:
+            falhas += 1
+            print(f"❌ Vazão abaixo do mínimo ({minimo:,.1f} docs/s; baseline {baseline:,.1f})")
+    if docs_por_segundo < minimo_absoluto:
+        falhas += 1
+        print(f"❌ Vazão abaixo de {minimo_absoluto:,.1f} docs/s")
+
+    return 1 if falhas else 0
+
+
+# ==========================
+# PDFS SINTÉTICOS DO CORPUS
+# ==========================
+# Cada corpus/fontes/<nome>.txt vira corpus/<nome>.pdf, uma página por bloco
+# separado por form feed. As páginas listadas aqui são gravadas só como
+# imagem, como um boleto que passou pelo scanner, e dependem do OCR.
+DIRETORIO_FONTES = os.path.join(DIRETORIO_CORPUS, "fontes")
+PAGINAS_IMAGEM = {"digitalizado_2025_05": {1}}
+RESOLUCAO_IMAGEM = 200
+
+
+def _desenhar_imagem(canvas, linhas: list, largura: float, altura: float):
+    from PIL import Image, ImageDraw, ImageFont
+    from reportlab.lib.utils import ImageReader
+    escala = RESOLUCAO_IMAGEM / 72
+    imagem = Image.new("L", (int(largura * escala), int(altura * escala)), 255)
+    desenho = ImageDraw.Draw(imagem)
+    fonte = ImageFont.load_default(size=int(10 * escala))
+    for i, linha in enumerate(linhas):
+        desenho.text((50 * escala, (50 + 14 * i) * escala), linha, fill=0, font=fonte)
+    canvas.drawImage(ImageReader(imagem), 0, 0, largura, altura)
+
+
+def gerar_pdfs() -> list:
+    """Renderiza os PDFs do corpus com o reportlab; devolve os caminhos gerados."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen.canvas import Canvas
+    largura, altura = A4
+    gerados = []
+    for fonte in sorted(glob.glob(os.path.join(DIRETORIO_FONTES, "*.txt"))):
+        nome = os.path.splitext(os.path.basename(fonte))[0]
+        with open(fonte, encoding="utf-8") as f:
+            paginas = f.read().split("\f")
+        caminho = os.path.join(DIRETORIO_CORPUS, f"{nome}.pdf")
+        # invariant: sem data de criação, o mesmo texto gera sempre os mesmos bytes
+        canvas = Canvas(caminho, pagesize=A4, invariant=1)
+        for indice, pagina in enumerate(paginas):
+            linhas = pagina.strip("\n").splitlines()
+            if indice in PAGINAS_IMAGEM.get(nome, ()):
+                _desenhar_imagem(canvas, linhas, largura, altura)
+            else:
+                canvas.setFont("Helvetica", 10)
+                for i, linha in enumerate(linhas):
+                    canvas.drawString(50, altura - 50 - 14 * i, linha)
+            canvas.showPage()
+        canvas.save()
+        gerados.append(caminho)
+    return gerados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do BI Condomínio")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_imp = sub.add_parser("importacao", help="Perfil de tempo de importação (partida a frio)")
+    p_imp.add_argument("--repeticoes", type=int, default=3)
+    p_imp.add_argument("--top", type=int, default=3, help="Quantos imports mais lentos mostrar por módulo")
+
+    p_corpus = sub.add_parser("corpus", help="Regressão e vazão do parser sobre o corpus de boletos")
+    p_corpus.add_argument("--atualizar", action="store_true", help="Regrava os .esperado.json com a saída atual")
+    p_corpus.add_argument("--registrar-baseline", action="store_true", help="Grava a vazão atual como referência")
+    p_corpus.add_argument("--tempo", type=float, default=1.0, help="Segundos mínimos de medição de vazão")
+    p_corpus.add_argument("--minimo", type=float, default=None, help=f"Vazão mínima absoluta (docs/s; padrão {MINIMO_DOCS_POR_SEGUNDO:g})")
+
+    sub.add_parser("gerar-pdfs", help=f"Regrava os PDFs do corpus a partir de {DIRETORIO_FONTES}/")
+
+    args = parser.parse_args()
+    if args.comando == "gerar-pdfs":
+        for caminho in gerar_pdfs():
+            print(f"📝 {caminho}")
+    elif args.comando == "importacao":
+        sys.exit(rodar_importacao(args.repeticoes, args.top))
+    elif args.comando == "corpus":
+        sys.exit(rodar_corpus(args.atualizar, args.registrar_baseline, args.tempo, args.minimo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+import pandas as pd
+import armazenamento
+from itens import ITENS_FIXOS, normalizar_parcela
+
+# Similaridade mínima (Jaccard de trigramas) para tratar dois nomes como o mesmo item
+LIMIAR_SIMILARIDADE = 0.8
+
+# Variações conhecidas que a similaridade sozinha não aproxima
+SEMENTES = {
+    "Limpeza Jardim": ["Limpeza Jardim /Calçada"],
+    "Consumo Água": ["Consumo Agua"],
+}
+
+# Itens que vêm com informações adicionais depois do nome (ex: leitura do hidrômetro)
+PREFIXOS = ["Consumo Água"]
+
+
+# ==========================
+# NORMALIZAÇÃO E TRIGRAMAS
+# ==========================
+@lru_cache(maxsize=4096)
+def chave_item(item: str) -> str:
+    """Forma comparável do nome: sem acentos, parcela, pontuação ou caixa."""
+    texto = unicodedata.normalize("NFKD", normalizar_parcela(item))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", texto).split())
+
+
+@lru_cache(maxsize=4096)
+def marcadores(chave: str) -> frozenset:
+    """
+    Tokens que distinguem itens de nome quase igual: números e letras soltas
+    ("bloco a" × "bloco b", "apto 101" × "apto 102"). Precisam bater exatamente.
+    """
+    return frozenset(token for token in chave.split() if len(token) == 1 or any(c.isdigit() for c in token))
+
+
+@lru_cache(maxsize=4096)
+def trigramas(chave: str) -> frozenset:
+    resultado = set()
+    for token in chave.split():
+        token = f"  {token} "
+        resultado.update(token[i:i + 3] for i in range(len(token) - 2))
+    return frozenset(resultado)
+
+
+# ==========================
+# ÍNDICE
+# ==========================
+class IndiceCanonico:
+    """
+    Mapeia nomes brutos de itens para IDs inteiros estáveis. Cada nome é
+    resolvido uma única vez: o resultado vira alias e as próximas consultas
+    são uma busca em dicionário. Persistente, cada ID e alias novo vai na
+    hora para o banco, que decide o valor quando dois processos disputam.
+    """
+
+    def __init__(self, nomes: dict = None, aliases: dict = None, persistente: bool = False):
+        self.nomes = {}
+        self.aliases = {}
+        self._por_trigrama = defaultdict(set)
+        self.persistente = persistente
+        self._fixos = None
+        for item_id, nome in (nomes or {}).items():
+            self._registrar(int(item_id), nome)
+        self.aliases.update(aliases or {})
+
+    def _registrar(self, item_id: int, nome: str):
+        self.nomes[item_id] = nome
+        chave = chave_item(nome)
+        self.aliases.setdefault(chave, item_id)
+        for trigrama in trigramas(chave):
+            self._por_trigrama[trigrama].add(item_id)
+
+    def _criar(self, nome: str) -> int:
+        if self.persistente:
+            item_id = armazenamento.criar_canonico(nome)
+            # IDs criados por outros processos enquanto isso também entram no índice
+            self.atualizar()
+        else:
+            item_id = max(self.nomes, default=0) + 1
+        if item_id not in self.nomes:
+            self._registrar(item_id, nome)
+        return item_id
+
+    def atualizar(self):
+        """Traz do banco os itens criados por outros processos desde a última leitura."""
+        if not self.persistente:
+            return
+        nomes, _ = armazenamento.carregar_canonicos(max(self.nomes, default=0))
+        for item_id, nome in nomes.items():
+            self._registrar(item_id, nome)
+
+    def _mais_similar(self, chave: str):
+        alvo = trigramas(chave)
+        if not alvo:
+            return None
+        contagem = defaultdict(int)
+        for trigrama in alvo:
+            for item_id in self._por_trigrama.get(trigrama, ()):
+                contagem[item_id] += 1
+        melhor, melhor_sim = None, LIMIAR_SIMILARIDADE
+        for item_id, comuns in contagem.items():
+            candidato = chave_item(self.nomes[item_id])
+            if marcadores(candidato) != marcadores(chave):
+                continue
+            total = len(alvo) + len(trigramas(candidato)) - comuns
+            similaridade = comuns / total
+            if similaridade >= melhor_sim:
+                melhor, melhor_sim = item_id, similaridade
+        return melhor
+
+    def resolver(self, item: str) -> int:
+        chave = chave_item(item)
+        if chave in self.aliases:
+            return self.aliases[chave]
+        if self.persistente:
+            gravado = armazenamento.buscar_apelido(chave)
+            if gravado is not None:
+                if gravado not in self.nomes:
+                    self.atualizar()
+                self.aliases[chave] = gravado
+                return gravado
+
+        item_id = None
+        for prefixo in PREFIXOS:
+            if chave.startswith(chave_item(prefixo) + " "):
+                item_id = self.resolver(prefixo)
+                break
+        if item_id is None:
+            item_id = self._mais_similar(chave)
+        if item_id is None:
+            item_id = self._criar(normalizar_parcela(item))
+
+        return self.apelidar(chave, item_id)
+
+    def apelidar(self, chave: str, item_id: int) -> int:
+        """Associa a chave ao item; se outro processo já associou, vale o dele."""
+        if self.persistente:
+            item_id = armazenamento.gravar_apelido(chave, item_id)
+            if item_id not in self.nomes:
+                self.atualizar()
+        self.aliases[chave] = item_id
+        return item_id
+
+    def ids_fixos(self) -> set:
+        # Um alias nunca muda de ID: resolvidos uma vez, valem para o resto do processo
+        if self._fixos is None:
+            self._fixos = frozenset(self.resolver(nome) for nome in ITENS_FIXOS + PREFIXOS)
+        return self._fixos
+
+
+# ==========================
+# ÍNDICE PERSISTIDO (UM POR PROCESSO)
+# ==========================
+_indice = None
+_lock = threading.Lock()
+
+
+def _carregar_indice() -> IndiceCanonico:
+    nomes, aliases = armazenamento.carregar_canonicos()
+    indice = IndiceCanonico(nomes, aliases, persistente=True)
+    for canonico, variacoes in SEMENTES.items():
+        item_id = indice.resolver(canonico)
+        for variacao in variacoes:
+            if chave_item(variacao) not in indice.aliases:
+                indice.apelidar(chave_item(variacao), item_id)
+    return indice
+
+
+def canonizar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Acrescenta item_id, item_canonico e fixo ao DataFrame. Cada nome distinto
+    passa pelo índice uma vez; o restante é um map sobre inteiros.
+    """
+    global _indice
+    with _lock:
+        if _indice is None:
+            _indice = _carregar_indice()
+        else:
+            _indice.atualizar()
+        ids = {item: _indice.resolver(item) for item in df["item"].unique()}
+        fixos = _indice.ids_fixos()
+        nomes = dict(_indice.nomes)
+
+    df = df.copy()
+    df["item_id"] = df["item"].map(ids).astype("int64")
+    df["item_canonico"] = df["item_id"].map(nomes)
+    df["fixo"] = df["item_id"].isin(fixos)
+    return df
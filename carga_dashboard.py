@@ -0,0 +1,247 @@
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+# Roda o dashboard.py de verdade, sem navegador, com várias sessões simultâneas
+# (streamlit.testing AppTest). O login do Google e a busca no Gmail são trocados
+# por substitutos locais, então mede só o custo do próprio app no servidor.
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(DIRETORIO, "dashboard.py")
+
+ITENS_VARIAVEIS = ["Manutenção Portão", "Material de Limpeza", "Dedetização", "Reparo Hidráulico", "Pintura Fachada"]
+TIMEOUT_EXECUCAO = 120
+
+
+# ==========================
+# SUBSTITUTOS DE LOGIN E GMAIL
+# ==========================
+def _gerar_boletos(meses: int, semente: int = 0) -> list:
+    from itens import ITENS_FIXOS
+    aleatorio = random.Random(semente)
+    dados = []
+    for i in range(meses):
+        ano, mes = 2023 + i // 12, i % 12 + 1
+        ano_mes = f"{ano}_{mes:02d}"
+        for j, item in enumerate(ITENS_FIXOS):
+            dados.append({"mes": ano_mes, "item": item, "valor": round((j + 1) * 100 * (1 + 0.004 * i) * aleatorio.uniform(0.95, 1.05), 2)})
+        dados.append({"mes": ano_mes, "item": "Consumo Água", "valor": round(aleatorio.uniform(600, 900), 2)})
+        for item in aleatorio.sample(ITENS_VARIAVEIS, 2):
+            dados.append({"mes": ano_mes, "item": item, "valor": round(aleatorio.uniform(50, 800), 2)})
+        if i % 6 < 3:
+            dados.append({"mes": ano_mes, "item": f"Obra Telhado {i % 6 + 1}/3", "valor": 1500.0})
+    return dados
+
+
+def instalar_substitutos(meses: int, latencia_gmail: float):
+    """Registra google_login e extrair_dados falsos em sys.modules antes de o app importá-los."""
+    login = types.ModuleType("google_login")
+
+    def is_authenticated():
+        import streamlit as st
+        return bool(st.session_state.get("authenticated"))
+
+    def logout():
+        import streamlit as st
+        st.session_state.clear()
+        st.rerun()
+
+    def show_login_page():
+        import streamlit as st
+        st.stop()
+
+    login.is_authenticated = is_authenticated
+    login.handle_callback = lambda: False
+    login.show_login_page = show_login_page
+    login.logout = logout
+    login.inject_cookie_reader = lambda: None
+    login._set_cookie_js = lambda token: None
+    sys.modules["google_login"] = login
+
+    boletos = _gerar_boletos(meses)
+    extracao = types.ModuleType("extrair_dados")
+
+    def buscar_e_extrair(gmail_token=None, inicio=None, fim=None, conta="local"):
+        # Simula o tempo de rede e parsing de uma sincronização real
+        time.sleep(latencia_gmail)
+        return [dict(linha) for linha in boletos]
+
+    extracao.buscar_e_extrair = buscar_e_extrair
+    sys.modules["extrair_dados"] = extracao
+
+
+# ==========================
+# SESSÕES SIMULADAS
+# ==========================
+def preparar_apptest():
+    """
+    AppTest não foi feito para sessões em paralelo no mesmo processo:
+    - cada run() instala um Runtime falso e o zera ao terminar, então uma
+      execução zerava o de outra ainda em andamento ("Runtime hasn't been
+      created!"); aqui fica valendo o último instalado;
+    - cada run() recompila o dashboard, e o ast.parse do Python 3.11 em
+      várias threads ao mesmo tempo quebra ("AST constructor recursion depth
+      mismatch"); a compilação passa a ser uma por vez.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    ultimo = []
+
+    def atual(cls):
+        if cls._instance is not None:
+            ultimo[:] = [cls._instance]
+        return cls._instance or (ultimo[0] if ultimo else None)
+
+    def instance(cls):
+        runtime = atual(cls)
+        if runtime is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return runtime
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: atual(cls) is not None)
+
+    compilar = ScriptCache.get_bytecode
+    lock_compilacao = threading.Lock()
+
+    def get_bytecode(self, script_path):
+        with lock_compilacao:
+            return compilar(self, script_path)
+
+    ScriptCache.get_bytecode = get_bytecode
+
+
+def _cpu_segundos() -> float:
+    uso = resource.getrusage(resource.RUSAGE_SELF)
+    return uso.ru_utime + uso.ru_stime
+
+
+def _botao(app, rotulo: str):
+    return next(botao for botao in app.button if botao.label == rotulo)
+
+
+def simular_sessao(indice: int, interacoes: int, exportar: bool, latencias: list, erros: list, lock):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(SCRIPT, default_timeout=TIMEOUT_EXECUCAO)
+    # Cada sessão é um usuário diferente, com sua própria conta no banco
+    app.session_state["authenticated"] = True
+    app.session_state["user"] = {"name": f"Usuário {indice}", "email": f"carga{indice}@exemplo.com"}
+    app.session_state["gmail_token"] = None
+
+    aleatorio = random.Random(indice)
+
+    def executar(acao: str, passo):
+        inicio = time.perf_counter()
+        try:
+            passo()
+        except Exception as e:
+            with lock:
+                erros.append(f"sessão {indice} ({acao}): {e}")
+            return
+        duracao = (time.perf_counter() - inicio) * 1000
+        with lock:
+            latencias.append((acao, duracao))
+            if app.exception:
+                erros.append(f"sessão {indice} ({acao}): {app.exception[0].value}")
+
+    executar("primeira carga", app.run)
+    for _ in range(interacoes):
+        if not app.selectbox:
+            break
+        acao = aleatorio.choice(["mes_atual", "mes_comparacao", "previsao", "atualizar"] + (["exportar"] if exportar else []))
+        if acao in ("mes_atual", "mes_comparacao"):
+            seletor = app.selectbox[0 if acao == "mes_atual" else 1]
+            executar(acao, lambda: seletor.select_index(aleatorio.randrange(len(seletor.options))).run())
+        elif acao == "previsao":
+            executar(acao, lambda: app.slider[0].set_value(aleatorio.randint(0, 12)).run())
+        elif acao == "atualizar":
+            executar(acao, lambda: _botao(app, "🔄 Atualizar dados").click().run())
+        else:
+            executar(acao, lambda: _botao(app, "📥 Exportar Relatório PDF").click().run())
+    return app
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return float("nan")
+    posicao = (len(ordenados) - 1) * p / 100
+    base = int(posicao)
+    proximo = min(base + 1, len(ordenados) - 1)
+    return ordenados[base] + (ordenados[proximo] - ordenados[base]) * (posicao - base)
+
+
+def rodar_carga(sessoes: int, interacoes: int, meses: int, latencia_gmail: float,
+                exportar: bool, p95_maximo: float = None) -> int:
+    sys.path.insert(0, DIRETORIO)
+    # Banco, estado e PDFs exportados ficam num diretório temporário
+    os.chdir(tempfile.mkdtemp(prefix="carga_dashboard_"))
+    instalar_substitutos(meses, latencia_gmail)
+    preparar_apptest()
+    from estado_compartilhado import BackendMemoria, configurar_backend
+    from memoria import rss_atual_mb
+    configurar_backend(BackendMemoria())
+
+    latencias, erros, lock = [], [], threading.Lock()
+    rss_inicial = rss_atual_mb()
+    cpu_inicial, inicio = _cpu_segundos(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessoes) as pool:
+        # As sessões são mantidas vivas até o fim, como usuários com a aba aberta
+        apps = list(pool.map(
+            lambda i: simular_sessao(i, interacoes, exportar, latencias, erros, lock),
+            range(sessoes),
+        ))
+    duracao = time.perf_counter() - inicio
+    cpu = _cpu_segundos() - cpu_inicial
+    rss_final = rss_atual_mb()
+
+    print(f"\n{sessoes} sessões × {interacoes} interações ({len(latencias)} execuções em {duracao:.1f}s)")
+    print(f"{'ação':<16}{'n':>6}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'máx':>10}  (ms)")
+    acoes = sorted({acao for acao, _ in latencias})
+    for acao in acoes + ["total"]:
+        valores = [d for a, d in latencias if acao in ("total", a)]
+        if not valores:
+            continue
+        print(
+            f"{acao:<16}{len(valores):>6}{percentil(valores, 50):>10.0f}{percentil(valores, 90):>10.0f}"
+            f"{percentil(valores, 95):>10.0f}{percentil(valores, 99):>10.0f}{max(valores):>10.0f}"
+        )
+    print(f"\nCPU do servidor: {cpu:.1f}s ({cpu / duracao * 100:.0f}% de um núcleo em média)")
+    print(f"Memória: {rss_inicial:.0f} → {rss_final:.0f} MB ({(rss_final - rss_inicial) / sessoes:.1f} MB por sessão)")
+    del apps
+
+    falhas = [f"❌ {erro}" for erro in erros[:10]]
+    p95 = percentil([d for _, d in latencias], 95)
+    if p95_maximo is not None and p95 > p95_maximo:
+        falhas.append(f"❌ p95 de {p95:.0f} ms acima do limite de {p95_maximo:.0f} ms")
+    for falha in falhas:
+        print(falha)
+    if erros:
+        print(f"{len(erros)} erro(s) no total")
+    if not falhas:
+        print("✅ Carga dentro do limite")
+    return 1 if falhas else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard com sessões simultâneas")
+    parser.add_argument("--sessoes", type=int, default=20)
+    parser.add_argument("--interacoes", type=int, default=10, help="Interações por sessão após a primeira carga")
+    parser.add_argument("--meses", type=int, default=24, help="Meses de boletos sintéticos por conta")
+    parser.add_argument("--latencia-gmail", type=float, default=0.0, help="Segundos simulados por sincronização")
+    parser.add_argument("--sem-exportar", action="store_true", help="Não clica em Exportar Relatório PDF")
+    parser.add_argument("--p95-maximo", type=float, default=None, help="Falha se o p95 passar deste valor (ms)")
+    args = parser.parse_args()
+    sys.exit(rodar_carga(args.sessoes, args.interacoes, args.meses, args.latencia_gmail,
+                         not args.sem_exportar, args.p95_maximo))
+
+
+if __name__ == "__main__":
+    main()
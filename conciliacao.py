@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import armazenamento
+
+# ==========================
+# CONCILIAÇÃO DO TOTAL DECLARADO
+# ==========================
+# Cada documento parseado guarda o total impresso no boleto e a soma dos itens
+# extraídos, endereçado por (conta, hash do PDF). É por conta porque os itens
+# também são: o mesmo PDF pode estar reprocessado numa conta e não na outra.
+TABELA = "documentos"
+# Diferença aceita por arredondamento (R$)
+TOLERANCIA = 0.01
+
+CONFERE = "confere"
+DIVERGENTE = "divergente"
+SEM_TOTAL = "sem_total"
+
+MODO_RAPIDO = "rapido"
+MODO_PRECISO = "preciso"
+
+
+def conciliar(itens: list, total_declarado) -> dict:
+    soma = round(sum(item["valor"] for item in itens), 2)
+    if total_declarado is None:
+        return {"total_declarado": None, "soma_itens": soma, "diferenca": None, "status": SEM_TOTAL}
+    diferenca = round(soma - total_declarado, 2)
+    return {
+        "total_declarado": total_declarado,
+        "soma_itens": soma,
+        "diferenca": diferenca,
+        "status": CONFERE if abs(diferenca) <= TOLERANCIA else DIVERGENTE,
+    }
+
+
+def melhorou(anterior: dict, novo: dict) -> bool:
+    """O novo resultado fica mais perto do total declarado que o anterior."""
+    if novo["diferenca"] is None:
+        return False
+    return anterior.get("diferenca") is None or abs(novo["diferenca"]) < abs(anterior["diferenca"])
+
+
+def registrar_documento(conta: str, documento: str, ano_mes: str, modelo: str, modo: str, conciliacao: dict):
+    registro = pd.DataFrame([{
+        "documento": documento,
+        "ano_mes": ano_mes,
+        "modelo": modelo,
+        "modo": modo,
+        **conciliacao,
+        "atualizado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }])
+    armazenamento.substituir_linhas(conta, TABELA, registro, "documento")
+
+
+def carregar_documentos(conta: str, status: list = None) -> pd.DataFrame:
+    documentos = armazenamento.carregar_tabela(conta, TABELA)
+    if status and not documentos.empty:
+        documentos = documentos[documentos["status"].isin(status)]
+    return documentos.reset_index(drop=True)
+
+
+def resumo(conta: str) -> dict:
+    """{status: quantidade de documentos da conta}."""
+    documentos = carregar_documentos(conta)
+    if documentos.empty:
+        return {}
+    return documentos["status"].value_counts().to_dict()
+
+
+def itens_precisos(conta: str) -> dict:
+    """
+    {documento: itens gravados} dos documentos que a conta já conciliou no
+    modo preciso. A sincronização reaproveita esses itens: refazer o parse
+    rápido desfaria a correção a cada execução do agendador.
+    """
+    documentos = carregar_documentos(conta)
+    if documentos.empty:
+        return {}
+    precisos = set(documentos.loc[documentos["modo"] == MODO_PRECISO, "documento"])
+    if not precisos:
+        return {}
+    itens = armazenamento.carregar_tabela(conta, "itens", ["mes", "unidade", "item", "valor", "documento"])
+    if "documento" not in itens.columns:
+        return {}
+    itens = itens[itens["documento"].isin(precisos)]
+    return {documento: grupo.to_dict("records") for documento, grupo in itens.groupby("documento")}
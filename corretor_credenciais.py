@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+ARQUIVO_TOKEN = "token.json"
+# O segredo GOOGLE_TOKEN do Streamlit é somente leitura; o token renovado fica neste cache local
+ARQUIVO_CACHE_SEGREDO = "token_cache.json"
+# Renova o access token um pouco antes de expirar, para não pagar o 401 + refresh no meio da sync
+MARGEM_RENOVACAO = timedelta(minutes=5)
+# Um arquivo de lock por conta: dashboard, agendador e API renovam o mesmo token
+DIRETORIO_TRAVAS = "travas_credenciais"
+
+
+# ==========================
+# UMA CREDENCIAL POR CONTA
+# ==========================
+class _Entrada:
+    def __init__(self, creds, origem: str):
+        self.creds = creds
+        # "sessao" (sessões do login), "arquivo" (token.json) ou "segredo" (st.secrets)
+        self.origem = origem
+        self.lock = threading.Lock()
+
+
+_entradas: dict = {}
+_entradas_lock = threading.Lock()
+
+
+def chave_conta(gmail_token: str = None) -> str:
+    """
+    Identifica a conta pelo refresh token, que não muda quando o access token
+    é renovado: o JSON antigo guardado na sessão e o renovado caem na mesma chave.
+    """
+    if not gmail_token:
+        return "local"
+    try:
+        base = json.loads(gmail_token).get("refresh_token") or gmail_token
+    except ValueError:
+        base = gmail_token
+    return hashlib.sha256(base.encode()).hexdigest()
+
+
+def gravar_json_atomico(caminho: str, conteudo):
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    with tempfile.NamedTemporaryFile("w", dir=diretorio, delete=False, suffix=".tmp") as f:
+        json.dump(conteudo, f)
+    os.replace(f.name, caminho)
+
+
+def _ler_json(caminho: str):
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho) as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+# ==========================
+# LEITURA E GRAVAÇÃO DO TOKEN
+# ==========================
+def _token_persistido(gmail_token: str = None) -> tuple:
+    """(info do token mais recente gravado para a conta, origem)."""
+    if gmail_token:
+        from estado_compartilhado import sessoes
+        chave = chave_conta(gmail_token)
+        for sessao in sessoes().values():
+            if sessao.get("gmail_token") and chave_conta(sessao["gmail_token"]) == chave:
+                return json.loads(sessao["gmail_token"]), "sessao"
+        return json.loads(gmail_token), "sessao"
+
+    info = _ler_json(ARQUIVO_TOKEN)
+    if info:
+        return info, "arquivo"
+    import streamlit as st
+    info = json.loads(st.secrets["GOOGLE_TOKEN"])
+    cache = _ler_json(ARQUIVO_CACHE_SEGREDO)
+    # O cache só vale enquanto pertencer ao mesmo refresh token do segredo
+    if cache and cache.get("refresh_token") == info.get("refresh_token"):
+        return cache, "segredo"
+    return info, "segredo"
+
+
+def _persistir(entrada: _Entrada, chave: str):
+    token_json = entrada.creds.to_json()
+    if entrada.origem == "arquivo":
+        gravar_json_atomico(ARQUIVO_TOKEN, json.loads(token_json))
+    elif entrada.origem == "segredo":
+        gravar_json_atomico(ARQUIVO_CACHE_SEGREDO, json.loads(token_json))
+    else:
+        from estado_compartilhado import salvar_sessao, sessoes
+        for sid, sessao in sessoes().items():
+            if sessao.get("gmail_token") and chave_conta(sessao["gmail_token"]) == chave:
+                sessao["gmail_token"] = token_json
+                salvar_sessao(sid, sessao)
+
+
+def _expira_em_breve(creds) -> bool:
+    if not creds.valid:
+        return True
+    return creds.expiry is not None and creds.expiry - datetime.utcnow() < MARGEM_RENOVACAO
+
+
+@contextmanager
+def _trava_entre_processos(chave: str):
+    """Lock exclusivo no arquivo da conta, visto por todos os processos da máquina."""
+    try:
+        import fcntl
+    except ImportError:
+        # Sem fcntl (Windows) vale só o lock entre threads
+        yield
+        return
+    os.makedirs(DIRETORIO_TRAVAS, exist_ok=True)
+    with open(os.path.join(DIRETORIO_TRAVAS, f"{chave[:32]}.lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _renovar(entrada: _Entrada, chave: str, gmail_token: str = None):
+    from google.auth.transport.requests import Request as GRequest
+    from google.oauth2.credentials import Credentials
+    if not entrada.creds.refresh_token or not _expira_em_breve(entrada.creds):
+        return
+    with _trava_entre_processos(chave):
+        # Outro processo (o agendador, outra réplica) pode ter renovado e gravado enquanto esperávamos
+        info, _ = _token_persistido(gmail_token)
+        gravada = Credentials.from_authorized_user_info(info, SCOPES)
+        if gravada.token != entrada.creds.token and not _expira_em_breve(gravada):
+            # Atualiza o objeto existente: quem já tem referência a ele vê o token novo
+            entrada.creds.token = gravada.token
+            entrada.creds.expiry = gravada.expiry
+            return
+        entrada.creds.refresh(GRequest())
+        _persistir(entrada, chave)
+
+
+def _obter_entrada(gmail_token: str = None) -> _Entrada:
+    from google.oauth2.credentials import Credentials
+    chave = chave_conta(gmail_token)
+    with _entradas_lock:
+        entrada = _entradas.get(chave)
+        if entrada is None:
+            info, origem = _token_persistido(gmail_token)
+            entrada = _Entrada(Credentials.from_authorized_user_info(info, SCOPES), origem)
+            _entradas[chave] = entrada
+    return entrada
+
+
+def obter_credenciais(gmail_token: str = None):
+    """
+    Credenciais da conta, sempre o mesmo objeto por processo, renovadas antes
+    de expirar. A renovação acontece sob lock e é gravada de volta na origem,
+    então cada access token é renovado uma vez, não uma vez por sincronização.
+    """
+    entrada = _obter_entrada(gmail_token)
+    with entrada.lock:
+        _renovar(entrada, chave_conta(gmail_token), gmail_token)
+    return entrada.creds
+
+
+def renovar_rejeitadas(gmail_token: str, token_rejeitado: str):
+    """
+    O servidor recusou o access token (401) antes da hora: força a renovação,
+    a menos que outra chamada já tenha trocado esse token. Devolve as credenciais.
+    """
+    entrada = _obter_entrada(gmail_token)
+    with entrada.lock:
+        if entrada.creds.token == token_rejeitado:
+            entrada.creds.expiry = datetime.utcnow()
+            _renovar(entrada, chave_conta(gmail_token), gmail_token)
+    return entrada.creds
+
+
+def registrar_credenciais(creds) -> str:
+    """Entrega ao corretor as credenciais recém-obtidas no login; devolve o JSON para a sessão."""
+    token_json = creds.to_json()
+    with _entradas_lock:
+        _entradas[chave_conta(token_json)] = _Entrada(creds, "sessao")
+    return token_json
+
+
+def descartar_credenciais(gmail_token: str = None):
+    with _entradas_lock:
+        _entradas.pop(chave_conta(gmail_token), None)
@@ -0,0 +1,260 @@
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+
+# Estado que precisa ser visto por todas as réplicas do dashboard: sessões de
+# login, verificadores PKCE pendentes e os dados já calculados de cada conta.
+# Sem configuração fica num SQLite local; com ESTADO_URL=redis://... (variável
+# de ambiente ou segredo do Streamlit) passa a ser compartilhado pela rede.
+ARQUIVO_ESTADO = "estado.db"
+
+TTL_SESSAO = 30 * 24 * 3600
+TTL_PKCE = 10 * 60
+TTL_DADOS = 7 * 24 * 3600
+
+# Arquivos usados antes do backend; importados uma vez e renomeados
+SESSIONS_FILE = "sessions.json"
+PENDING_AUTH_FILE = "pending_auth.json"
+
+
+# ==========================
+# BACKENDS
+# ==========================
+class BackendSQLite:
+    """Chave-valor num SQLite local: serve uma réplica só (ou várias na mesma máquina)."""
+    # Os dados calculados já estão no condominio.db desta máquina; aqui vai só a versão
+    guarda_dados = False
+
+    def __init__(self, arquivo: str = ARQUIVO_ESTADO):
+        self.arquivo = arquivo
+        with self._conectar() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS estado (chave TEXT PRIMARY KEY, valor BLOB, expira REAL)")
+
+    def _conectar(self):
+        return sqlite3.connect(self.arquivo, timeout=10)
+
+    def obter(self, chave: str):
+        with self._conectar() as con:
+            linha = con.execute(
+                "SELECT valor FROM estado WHERE chave = ? AND (expira IS NULL OR expira > ?)",
+                (chave, time.time()),
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def gravar(self, chave: str, valor: bytes, ttl: int = None):
+        expira = time.time() + ttl if ttl else None
+        with self._conectar() as con:
+            con.execute("INSERT OR REPLACE INTO estado VALUES (?, ?, ?)", (chave, valor, expira))
+
+    def remover(self, chave: str):
+        with self._conectar() as con:
+            con.execute("DELETE FROM estado WHERE chave = ?", (chave,))
+
+    def chaves(self, prefixo: str) -> list:
+        with self._conectar() as con:
+            con.execute("DELETE FROM estado WHERE expira <= ?", (time.time(),))
+            return [linha[0] for linha in con.execute(
+                "SELECT chave FROM estado WHERE substr(chave, 1, ?) = ?", (len(prefixo), prefixo)
+            )]
+
+
+class BackendRedis:
+    """
+    Chave-valor em rede, compartilhado por todas as réplicas. Aceita qualquer
+    cliente com a interface do redis-py (get, set com ex=, delete, scan_iter),
+    o que permite trocar por um substituto local nos testes.
+    """
+    guarda_dados = True
+
+    def __init__(self, url: str = None, cliente=None, prefixo: str = "condominio:"):
+        if cliente is None:
+            import redis
+            cliente = redis.Redis.from_url(url)
+        self.cliente = cliente
+        self.prefixo = prefixo
+
+    def obter(self, chave: str):
+        return self.cliente.get(self.prefixo + chave)
+
+    def gravar(self, chave: str, valor: bytes, ttl: int = None):
+        self.cliente.set(self.prefixo + chave, valor, ex=ttl)
+
+    def remover(self, chave: str):
+        self.cliente.delete(self.prefixo + chave)
+
+    def chaves(self, prefixo: str) -> list:
+        inicio = len(self.prefixo)
+        return [
+            (chave.decode() if isinstance(chave, bytes) else chave)[inicio:]
+            for chave in self.cliente.scan_iter(match=f"{self.prefixo}{prefixo}*")
+        ]
+
+
+class BackendMemoria:
+    """Substituto em memória do backend de rede, para testes e scripts de carga."""
+    guarda_dados = True
+
+    def __init__(self):
+        self.valores = {}
+        self.lock = threading.Lock()
+
+    def obter(self, chave: str):
+        with self.lock:
+            valor, expira = self.valores.get(chave, (None, None))
+            if expira is not None and expira <= time.time():
+                self.valores.pop(chave, None)
+                return None
+            return valor
+
+    def gravar(self, chave: str, valor: bytes, ttl: int = None):
+        with self.lock:
+            self.valores[chave] = (valor, time.time() + ttl if ttl else None)
+
+    def remover(self, chave: str):
+        with self.lock:
+            self.valores.pop(chave, None)
+
+    def chaves(self, prefixo: str) -> list:
+        with self.lock:
+            candidatas = [chave for chave in self.valores if chave.startswith(prefixo)]
+        return [chave for chave in candidatas if self.obter(chave) is not None]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _url_configurada() -> str:
+    url = os.environ.get("ESTADO_URL")
+    if url:
+        return url
+    try:
+        import streamlit as st
+        return st.secrets.get("ESTADO_URL")
+    except Exception:
+        return None
+
+
+def backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            url = _url_configurada()
+            _backend = BackendRedis(url) if url else BackendSQLite()
+            _migrar_arquivos(_backend)
+        return _backend
+
+
+def configurar_backend(novo):
+    """Troca o backend do processo (ex: BackendMemoria() nos testes de carga)."""
+    global _backend
+    with _backend_lock:
+        _backend = novo
+
+
+def _migrar_arquivos(destino):
+    if os.path.exists(SESSIONS_FILE):
+        try:
+            with open(SESSIONS_FILE) as f:
+                for sid, sessao in json.load(f).items():
+                    destino.gravar(f"sessao:{sid}", json.dumps(sessao).encode(), TTL_SESSAO)
+            os.replace(SESSIONS_FILE, SESSIONS_FILE + ".migrado")
+        except Exception:
+            pass
+    # Verificadores PKCE pendentes valem poucos minutos: não vale importar
+    if os.path.exists(PENDING_AUTH_FILE):
+        os.replace(PENDING_AUTH_FILE, PENDING_AUTH_FILE + ".migrado")
+
+
+# ==========================
+# SESSÕES DE LOGIN
+# ==========================
+def obter_sessao(sid: str):
+    valor = backend().obter(f"sessao:{sid}")
+    return json.loads(valor) if valor else None
+
+
+def salvar_sessao(sid: str, sessao: dict):
+    backend().gravar(f"sessao:{sid}", json.dumps(sessao).encode(), TTL_SESSAO)
+
+
+def remover_sessao(sid: str):
+    backend().remover(f"sessao:{sid}")
+
+
+def sessoes() -> dict:
+    """{sid: sessão} de todas as sessões ativas."""
+    resultado = {}
+    for chave in backend().chaves("sessao:"):
+        sid = chave[len("sessao:"):]
+        sessao = obter_sessao(sid)
+        if sessao is not None:
+            resultado[sid] = sessao
+    return resultado
+
+
+# ==========================
+# PKCE
+# ==========================
+def guardar_verificador(state: str, code_verifier: str):
+    backend().gravar(f"pkce:{state}", code_verifier.encode(), TTL_PKCE)
+
+
+def retirar_verificador(state: str) -> str:
+    if not state:
+        return None
+    valor = backend().obter(f"pkce:{state}")
+    backend().remover(f"pkce:{state}")
+    return valor.decode() if isinstance(valor, bytes) else valor
+
+
+# ==========================
+# DADOS CALCULADOS POR CONTA
+# ==========================
+# As tabelas vão num ZIP com um Parquet por tabela (tipos preservados, inclusive
+# categoria e Int64) e a versão em JSON: nada lido do backend é executado
+def _empacotar(versao: str, tabelas: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as pacote:
+        pacote.writestr("versao.json", json.dumps({"versao": versao, "tabelas": list(tabelas)}))
+        for nome, df in tabelas.items():
+            pacote.writestr(f"{nome}.parquet", df.to_parquet(index=False))
+    return buffer.getvalue()
+
+
+def _desempacotar(valor: bytes, versao: str):
+    import pandas as pd
+    buffer = io.BytesIO(valor)
+    # Valores gravados em outro formato (versões anteriores) contam como ausentes
+    if not zipfile.is_zipfile(buffer):
+        return None
+    with zipfile.ZipFile(buffer) as pacote:
+        indice = json.loads(pacote.read("versao.json"))
+        if indice["versao"] != versao:
+            return None
+        return {nome: pd.read_parquet(io.BytesIO(pacote.read(f"{nome}.parquet"))) for nome in indice["tabelas"]}
+
+
+def publicar_resultado(conta: str, versao: str, resultado: dict):
+    """Grava a versão dos dados da conta e, em backend de rede, as próprias tabelas."""
+    atual = backend()
+    if atual.guarda_dados:
+        atual.gravar(f"dados:{conta}", _empacotar(versao, resultado), TTL_DADOS)
+    atual.gravar(f"versao:{conta}", versao.encode())
+
+
+def versao_publicada(conta: str) -> str:
+    valor = backend().obter(f"versao:{conta}")
+    return valor.decode() if isinstance(valor, bytes) else valor
+
+
+def resultado_publicado(conta: str, versao: str):
+    """Tabelas da conta na versão pedida, ou None se o backend não as tem."""
+    valor = backend().obter(f"dados:{conta}")
+    if not valor:
+        return None
+    return _desempacotar(valor, versao)
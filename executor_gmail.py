@@ -0,0 +1,221 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Cota por usuário do Gmail: 250 unidades/s; messages.list/get e attachments.get custam 5
+UNIDADES_POR_SEGUNDO = 250
+CUSTO_PADRAO = 5
+
+MAX_TENTATIVAS = 6
+ESPERA_BASE = 1.0
+ESPERA_MAXIMA = 64.0
+MAX_CONCORRENCIA = 8
+
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
+MOTIVOS_COTA = {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded", "backendError"}
+
+# Um log por conta, apagado quando a sincronização termina
+DIRETORIO_CHECKPOINT = "checkpoint_sync"
+
+
+# ==========================
+# CLASSIFICAÇÃO DE ERROS
+# ==========================
+def _status(erro) -> int:
+    resp = getattr(erro, "resp", None)
+    return int(getattr(resp, "status", 0) or 0)
+
+
+def _retry_after(erro):
+    resp = getattr(erro, "resp", None)
+    if resp is None:
+        return None
+    try:
+        return float(resp.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def limite_de_taxa(status: int, conteudo) -> bool:
+    """429, ou 403 cujo corpo aponta cota (o Gmail usa 403 para rateLimitExceeded)."""
+    if status == 429:
+        return True
+    if status == 403:
+        if isinstance(conteudo, bytes):
+            conteudo = conteudo.decode("utf-8", "ignore")
+        return any(motivo in (conteudo or "") for motivo in MOTIVOS_COTA)
+    return False
+
+
+def retentavel(status: int, conteudo) -> bool:
+    return status in STATUS_RETENTAVEIS or limite_de_taxa(status, conteudo)
+
+
+def espera_backoff(tentativa: int, retry_after: float = None) -> float:
+    """Backoff exponencial com jitter completo; o Retry-After do servidor é o mínimo."""
+    espera = random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+    return max(espera, retry_after) if retry_after is not None else espera
+
+
+def _e_limite_de_taxa(erro) -> bool:
+    return limite_de_taxa(_status(erro), getattr(erro, "content", b""))
+
+
+def _e_retentavel(erro) -> bool:
+    if isinstance(erro, (ConnectionError, TimeoutError)):
+        return True
+    return retentavel(_status(erro), getattr(erro, "content", b""))
+
+
+# ==========================
+# CONTROLE DE VAZÃO
+# ==========================
+class BaldeDeCota:
+    """Token bucket em unidades de cota do Gmail."""
+
+    def __init__(self, unidades_por_segundo: float = UNIDADES_POR_SEGUNDO):
+        self.taxa = unidades_por_segundo
+        self.disponivel = unidades_por_segundo
+        self.atualizado = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consumir(self, unidades: float):
+        while True:
+            with self.lock:
+                agora = time.monotonic()
+                self.disponivel = min(self.taxa, self.disponivel + (agora - self.atualizado) * self.taxa)
+                self.atualizado = agora
+                if self.disponivel >= unidades:
+                    self.disponivel -= unidades
+                    return
+                espera = (unidades - self.disponivel) / self.taxa
+            time.sleep(espera)
+
+
+class LimiteAdaptativo:
+    """
+    Limite de requisições simultâneas com AIMD: cresce 1 a cada "janela" de
+    sucessos e cai pela metade quando o Gmail sinaliza limite de taxa.
+    """
+
+    def __init__(self, maximo: int = MAX_CONCORRENCIA, inicial: float = 2.0):
+        self.maximo = maximo
+        self.limite = min(inicial, maximo)
+        self.em_uso = 0
+        self.condicao = threading.Condition()
+
+    def adquirir(self):
+        with self.condicao:
+            while self.em_uso >= int(self.limite):
+                self.condicao.wait()
+            self.em_uso += 1
+
+    def liberar(self, limitado: bool = False):
+        with self.condicao:
+            self.em_uso -= 1
+            if limitado:
+                self.limite = max(1.0, self.limite / 2)
+            else:
+                self.limite = min(self.maximo, self.limite + 1 / self.limite)
+            self.condicao.notify_all()
+
+
+# ==========================
+# EXECUTOR
+# ==========================
+class ExecutorGmail:
+    """
+    Executa requisições do googleapiclient com backoff exponencial + jitter,
+    respeitando Retry-After, a cota por usuário e um limite adaptativo de
+    concorrência. Qualquer objeto com .execute(http=...) serve como requisição.
+    conexao empresta o Http de cada chamada (ex: gmail_cliente.conexao da
+    conta); sem ela, a requisição usa o Http com que foi montada.
+    """
+
+    def __init__(self, conexao=None, max_concorrencia: int = MAX_CONCORRENCIA,
+                 unidades_por_segundo: float = UNIDADES_POR_SEGUNDO, dormir=time.sleep):
+        self.conexao = conexao
+        self.max_concorrencia = max_concorrencia
+        self.limite = LimiteAdaptativo(max_concorrencia)
+        self.cota = BaldeDeCota(unidades_por_segundo)
+        self.dormir = dormir
+
+    def executar(self, requisicao, custo: int = CUSTO_PADRAO):
+        for tentativa in range(MAX_TENTATIVAS):
+            self.cota.consumir(custo)
+            self.limite.adquirir()
+            limitado = False
+            try:
+                if self.conexao is None:
+                    return requisicao.execute()
+                with self.conexao() as http:
+                    return requisicao.execute(http=http)
+            except Exception as erro:
+                if not _e_retentavel(erro) or tentativa == MAX_TENTATIVAS - 1:
+                    raise
+                limitado = _e_limite_de_taxa(erro)
+                espera = espera_backoff(tentativa, _retry_after(erro))
+                print(f"  ⏳ Gmail respondeu {_status(erro) or type(erro).__name__}; nova tentativa em {espera:.1f}s")
+            finally:
+                self.limite.liberar(limitado)
+            self.dormir(espera)
+
+    def mapear(self, funcao, itens):
+        """Aplica funcao a cada item em paralelo; o limite adaptativo regula as chamadas ao Gmail."""
+        with ThreadPoolExecutor(max_workers=self.max_concorrencia) as pool:
+            return list(pool.map(funcao, itens))
+
+
+# ==========================
+# CHECKPOINT DA SINCRONIZAÇÃO
+# ==========================
+class Checkpoint:
+    """
+    Guarda os itens já extraídos de cada mensagem enquanto a sincronização
+    roda. Se ela falhar no meio, a próxima tentativa reaproveita o que já foi
+    feito e só busca as mensagens que faltam. Cada conta tem seu arquivo, e
+    cada mensagem é uma linha acrescentada ao fim: registrar não relê nem
+    regrava o que já estava lá.
+    """
+
+    def __init__(self, conta: str, diretorio: str = DIRETORIO_CHECKPOINT):
+        self.arquivo = os.path.join(diretorio, f"{conta}.jsonl")
+        self.lock = threading.Lock()
+        self.mensagens = self._ler()
+
+    def _ler(self) -> dict:
+        mensagens = {}
+        if not os.path.exists(self.arquivo):
+            return mensagens
+        with open(self.arquivo) as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    # Linha cortada pela queda do processo: a mensagem é buscada de novo
+                    continue
+                mensagens[registro["id"]] = registro["itens"]
+        return mensagens
+
+    def __contains__(self, msg_id: str) -> bool:
+        return msg_id in self.mensagens
+
+    def registrar(self, msg_id: str, itens: list):
+        linha = json.dumps({"id": msg_id, "itens": itens}) + "\n"
+        with self.lock:
+            self.mensagens[msg_id] = itens
+            os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+            with open(self.arquivo, "a") as f:
+                f.write(linha)
+
+    def itens(self, ids: list) -> list:
+        return [item for msg_id in ids for item in self.mensagens.get(msg_id, [])]
+
+    def concluir(self):
+        with self.lock:
+            if os.path.exists(self.arquivo):
+                os.remove(self.arquivo)
+            self.mensagens = {}
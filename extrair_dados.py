@@ -1,162 +1,328 @@
+import hashlib
 import io
-import re
 import base64
-import pandas as pd
-import pdfplumber
-from datetime import datetime
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-
-PALAVRAS_IGNORAR = [
-    "Referente", "Unidade", "Rua", "CEP", "CNPJ",
-    "Vencimento", "Total", "Boleto", "Detalhe:"
-]
-
-padrao = r'(.+?)\s*\.+\s*([\d]+\,[\d]{2})$|(.+?)\s+([\d]+\,[\d]{2})$'
-
-
-def get_service(gmail_token: str = None):
-    import json as _json
-    from google.auth.transport.requests import Request as GRequest
-    if gmail_token:
-        info = _json.loads(gmail_token)
-        creds = Credentials.from_authorized_user_info(info, SCOPES)
-    else:
-        try:
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-        except FileNotFoundError:
-            import streamlit as st
-            creds = Credentials.from_authorized_user_info(
-                _json.loads(st.secrets["GOOGLE_TOKEN"]), SCOPES
-            )
-    # Renovar token se expirado
-    if not creds.valid and creds.refresh_token:
-        creds.refresh(GRequest())
-    return build('gmail', 'v1', credentials=creds)
-
-
-def extrair_texto_pdf(pdf_bytes: bytes) -> str:
-    texto = ""
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for pagina in pdf.pages:
-            texto += pagina.extract_text() + "\n"
-    return texto
-
-
-def extrair_itens(texto: str, ano_mes: str) -> list:
-    dados = []
-    linhas = texto.split("\n")
-    dentro_detalhamento = False
-    processar_linha = False
-
-    for linha in linhas:
-        linha_original = linha.strip()
-
-        if "Detalhamento da Fatura" in linha_original:
-            dentro_detalhamento = True
-            processar_linha = True
-            continue
-
-        if dentro_detalhamento or processar_linha:
-            if (
-                "SICOOB" in linha_original or
-                "Não Receber" in linha_original or
-                linha_original.startswith("Endereço:") or
-                ("CNPJ" in linha_original and len(linha_original) > 50) or
-                "Referente à Unidade" in linha_original
-            ):
-                processar_linha = False
-                dentro_detalhamento = False
-                continue
-
-        if len(linha_original) == 0 or linha_original.startswith("---") or linha_original.startswith("==="):
-            continue
-
-        if not (dentro_detalhamento or processar_linha):
+import binascii
+import mmap
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from modelos_boleto import MODELO_PADRAO, MODELOS, assuntos_conhecidos, modelo_do_remetente, remetentes_conhecidos
+
+# Assuntos e remetentes de todas as administradoras com modelo registrado
+ASSUNTOS = assuntos_conhecidos()
+REMETENTES = remetentes_conhecidos()
+
+# Anexos maiores que isso são decodificados direto para um arquivo temporário mapeado em memória
+LIMITE_PDF_EM_MEMORIA = 8 * 1024 * 1024
+# Guarda uma cópia de cada PDF baixado no arquivo local (pdfs/), para reprocessamento offline
+ARQUIVAR_PDFS = True
+# Páginas digitalizadas (sem texto embutido) passam por OCR com o Tesseract; ver ocr.py
+OCR_HABILITADO = True
+MIN_CARACTERES_TEXTO = 10
+# Modo preciso (reprocessamento de documentos que não batem com o total): remove
+# caracteres sobrepostos e separa palavras com tolerância menor que o padrão (3)
+TOLERANCIA_X_PRECISA = 1.5
+# Tamanho do bloco de base64 decodificado por vez (múltiplo de 4)
+BLOCO_BASE64 = 4 * 256 * 1024
+_BASE64_URLSAFE = str.maketrans("-_", "+/")
+
+# Níveis de multipart pedidos ao Gmail (mixed → alternative → related já dá 3)
+PROFUNDIDADE_MIME = 6
+
+
+# ==========================
+# CONSULTA NO GMAIL
+# ==========================
+def _epoch(dia: date) -> int:
+    # after:/before: com segundos epoch usam o mesmo fuso local de mes_da_mensagem
+    return int(datetime(dia.year, dia.month, dia.day).timestamp())
+
+
+def _alternativas(operador: str, valores) -> str:
+    if isinstance(valores, str):
+        valores = [valores]
+    termos = [f"{operador}:{valor}" for valor in valores]
+    # {a b} é OU na busca do Gmail
+    return termos[0] if len(termos) == 1 else "{" + " ".join(termos) + "}"
+
+
+def montar_query(assunto=ASSUNTOS, remetente=REMETENTES, com_anexo: bool = True,
+                 apenas_pdf: bool = True, inicio: date = None, fim: date = None) -> str:
+    """
+    Monta a expressão q do Gmail para que o filtro aconteça no servidor.
+    assunto e remetente aceitam um valor ou uma lista (qualquer um serve).
+    inicio e fim são inclusivos (datas); qualquer critério pode ser omitido.
+    """
+    termos = []
+    if assunto:
+        termos.append(_alternativas("subject", assunto))
+    if remetente:
+        termos.append(_alternativas("from", remetente))
+    if com_anexo:
+        termos.append("has:attachment")
+    if apenas_pdf:
+        termos.append("filename:pdf")
+    if inicio:
+        termos.append(f"after:{_epoch(inicio)}")
+    if fim:
+        termos.append(f"before:{_epoch(fim + timedelta(days=1))}")
+    return " ".join(termos)
+
+
+def _campos_partes(profundidade: int) -> str:
+    campos = "partId,mimeType,filename,body/attachmentId"
+    if profundidade > 1:
+        campos += f",parts({_campos_partes(profundidade - 1)})"
+    return campos
+
+
+# Resposta parcial do messages.get: só data, cabeçalhos e a árvore de partes,
+# sem os corpos inline (texto/HTML do e-mail). metadataHeaders só vale com
+# format=metadata, que não traz as partes, então o corte é todo pelo fields.
+CAMPOS_MENSAGEM = f"id,internalDate,payload(headers(name,value),{_campos_partes(PROFUNDIDADE_MIME)})"
+CAMPOS_LISTA = "messages/id,nextPageToken"
+CAMPOS_ANEXO = "data"
+
+
+# ==========================
+# ANEXOS E TEXTO DO PDF
+# ==========================
+@contextmanager
+def abrir_anexo(dados_base64: str):
+    """
+    Decodifica o campo data de um anexo do Gmail. PDFs pequenos viram bytes;
+    os grandes são decodificados em blocos para um arquivo temporário e
+    entregues como mmap, sem nunca ter o PDF inteiro no heap.
+    """
+    if len(dados_base64) * 3 // 4 <= LIMITE_PDF_EM_MEMORIA:
+        yield base64.urlsafe_b64decode(dados_base64)
+        return
+
+    with tempfile.TemporaryFile() as arquivo:
+        for inicio in range(0, len(dados_base64), BLOCO_BASE64):
+            bloco = dados_base64[inicio:inicio + BLOCO_BASE64].translate(_BASE64_URLSAFE)
+            arquivo.write(binascii.a2b_base64(bloco + "=" * (-len(bloco) % 4)))
+        dados_base64 = None
+        arquivo.flush()
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            yield mapa
+
+
+def extrair_texto_pdf(pdf, preciso: bool = False) -> str:
+    """
+    Aceita bytes ou um objeto de arquivo (ex: mmap) com o PDF. Páginas sem
+    texto embutido (boletos digitalizados) passam pelo OCR; as demais seguem
+    o caminho rápido do pdfplumber, ou o preciso (mais lento) se pedido.
+    """
+    import pdfplumber
+    # BytesIO sobre bytes não copia o buffer enquanto ele não for alterado
+    fonte = io.BytesIO(pdf) if isinstance(pdf, (bytes, bytearray)) else pdf
+    paginas = []
+    fila_ocr = None
+    with pdfplumber.open(fonte) as documento:
+        for indice, pagina in enumerate(documento.pages):
+            # extract_text devolve None em páginas só com imagem
+            if preciso:
+                # Texto em negrito simulado (glifo impresso duas vezes) duplica dígitos no modo rápido
+                texto = pagina.dedupe_chars().extract_text(x_tolerance=TOLERANCIA_X_PRECISA) or ""
+            else:
+                texto = pagina.extract_text() or ""
+            if OCR_HABILITADO and len(texto.strip()) < MIN_CARACTERES_TEXTO:
+                if fila_ocr is None:
+                    from ocr import FilaOCR
+                    fila_ocr = FilaOCR()
+                fila_ocr.adicionar(indice, pagina)
+            paginas.append(texto + "\n")
+            # Libera os objetos de layout da página antes de seguir para a próxima
+            pagina.flush_cache()
+            if hasattr(pagina, "close"):
+                pagina.close()
+    if fila_ocr is not None:
+        for indice, texto in fila_ocr.resultados().items():
+            paginas[indice] = texto + "\n"
+    return "".join(paginas)
+
+
+def extrair_itens(texto: str, ano_mes: str, modelo: str = MODELO_PADRAO) -> list:
+    return MODELOS[modelo].extrair_itens(texto, ano_mes)
+
+
+def buscar_e_extrair(gmail_token: str = None, inicio: date = None, fim: date = None, conta: str = "local"):
+    """conta é a do banco (o e-mail do usuário); os PDFs arquivados ficam registrados nela."""
+    from gmail_cliente import cliente_gmail, conexao, chave_conta
+    from executor_gmail import ExecutorGmail, Checkpoint
+    with cliente_gmail(gmail_token) as service:
+        executor = ExecutorGmail(partial(conexao, gmail_token))
+        q = montar_query(inicio=inicio, fim=fim)
+        return _buscar_e_extrair(service, executor, Checkpoint(chave_conta(gmail_token)), q, conta)
+
+
+def listar_mensagens(service, executor, q: str) -> list:
+    mensagens = []
+    page_token = None
+    while True:
+        results = executor.executar(service.users().messages().list(
+            userId='me',
+            q=q,
+            pageToken=page_token,
+            fields=CAMPOS_LISTA
+        ))
+        mensagens.extend(results.get('messages', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return mensagens
+
+
+def remetente(detalhe: dict) -> str:
+    headers = detalhe['payload']['headers']
+    return next((h['value'] for h in headers if h['name'] == 'From'), "")
+
+
+def modelo_da_mensagem(detalhe: dict):
+    return modelo_do_remetente(remetente(detalhe))
+
+
+def remetente_valido(detalhe: dict) -> bool:
+    return modelo_da_mensagem(detalhe) is not None
+
+
+def data_da_mensagem(detalhe: dict) -> datetime:
+    return datetime.fromtimestamp(int(detalhe['internalDate']) / 1000)
+
+
+def mes_da_mensagem(detalhe: dict) -> str:
+    return data_da_mensagem(detalhe).strftime("%Y_%m")
+
+
+def anexos_pdf(detalhe: dict):
+    """
+    Gera (filename, attachment_id) de cada PDF anexado à mensagem, em qualquer
+    nível da árvore MIME (ex: multipart/mixed → multipart/alternative → PDF).
+    Percorre com uma pilha, na ordem do documento, sem recursão.
+    """
+    pilha = [detalhe['payload']]
+    while pilha:
+        part = pilha.pop()
+        pilha.extend(reversed(part.get('parts', [])))
+
+        filename = part.get('filename', '')
+        if not (filename.lower().endswith('.pdf') or part.get('mimeType') == 'application/pdf'):
             continue
 
-        if any(palavra in linha_original for palavra in PALAVRAS_IGNORAR):
+        attachment_id = part.get('body', {}).get('attachmentId')
+        if not attachment_id:
             continue
+        yield filename or f"anexo_{part.get('partId', '')}.pdf", attachment_id
+
+
+def processar_documento(pdf, ano_mes: str = None, modelo: str = MODELO_PADRAO, preciso: bool = False,
+                        documento: str = None):
+    """
+    (hash do PDF, itens, conciliação com o total declarado). Cada item leva o
+    hash em "documento", para que um reprocessamento troque só os seus itens;
+    quem já o calculou passa em `documento`. Sem ano_mes (PDF importado sem
+    e-mail), o mês vem do vencimento impresso.
+    """
+    from conciliacao import conciliar
+    from memoria import descrever_pico, medir_pico_rss
+    documento = documento or hashlib.sha256(pdf).hexdigest()
+    with medir_pico_rss() as medida:
+        texto = extrair_texto_pdf(pdf, preciso)
+        ano_mes = ano_mes or MODELOS[modelo].mes_referencia(texto)
+        if ano_mes is None:
+            raise ValueError("mês de referência não encontrado (use YYYY_MM no nome do arquivo)")
+        itens = extrair_itens(texto, ano_mes, modelo)
+        total = MODELOS[modelo].total_declarado(texto)
+        del texto
+    for item in itens:
+        item["documento"] = documento
+    conciliacao = conciliar(itens, total)
+    print(f"  → {len(itens)} itens extraídos, total {conciliacao['status']} ({descrever_pico(medida)})")
+    return documento, itens, conciliacao
+
+
+def itens_reaproveitados(hash_pdf: str, precisos: dict):
+    """Itens gravados do PDF se a conta já o conciliou no modo preciso (ver conciliacao.itens_precisos), senão None."""
+    if not precisos:
+        return None
+    itens = precisos.get(hash_pdf)
+    if itens is not None:
+        print(f"  → conciliado no modo preciso: {len(itens)} itens gravados reaproveitados")
+    return itens
+
+
+def _processar_mensagem(service, executor, msg_id: str, conta: str = "local", precisos: dict = None,
+                        arquivados: dict = None) -> list:
+    from arquivo_pdf import mes_do_documento
+    from conciliacao import MODO_RAPIDO, registrar_documento
+    detalhe = executor.executar(service.users().messages().get(
+        userId='me', id=msg_id, fields=CAMPOS_MENSAGEM
+    ))
+    modelo = modelo_da_mensagem(detalhe)
+    if modelo is None:
+        return []
 
-        match = re.search(padrao, linha_original)
-        if match:
-            if match.group(1):
-                item = match.group(1).strip()
-                valor_str = match.group(2)
-            else:
-                item = match.group(3).strip()
-                valor_str = match.group(4)
-
-            item = re.sub(r'\.+', '', item)
-            item = " ".join(item.split())
-
-            if re.match(r'^[\d\s/]+[A-Z]*[\d\s/]*$', item) or len(item) > 50:
-                continue
-            if len(item) < 3 or not re.search(r'[a-zA-ZÀ-ÿ]{3,}', item):
+    mes_recebido = mes_da_mensagem(detalhe)
+    arquivados = {} if arquivados is None else arquivados
+    dados = []
+    for filename, attachment_id in anexos_pdf(detalhe):
+        # 🔑 Busca o PDF direto em memória, sem salvar no disco
+        attachment = executor.executar(service.users().messages().attachments().get(
+            userId='me',
+            messageId=msg_id,
+            id=attachment_id,
+            fields=CAMPOS_ANEXO
+        ))
+
+        # O dict da resposta sai de escopo aqui; só a string base64 segue viva até ser decodificada
+        dados_base64 = attachment.pop('data')
+        del attachment
+        print(f"Processando {mes_recebido} - {filename} ({len(dados_base64) * 3 // 4 // 1024}KB)...")
+        with abrir_anexo(dados_base64) as pdf:
+            del dados_base64
+            # Calculado uma vez: arquivo, reaproveitamento e parse usam o mesmo hash
+            hash_pdf = hashlib.sha256(pdf).hexdigest()
+            ano_mes = mes_do_documento(hash_pdf, mes_recebido, arquivados)
+            if ARQUIVAR_PDFS:
+                from arquivo_pdf import arquivar
+                arquivar(pdf, msg_id, filename, data_da_mensagem(detalhe).isoformat(), ano_mes, remetente(detalhe), conta,
+                         hash_pdf=hash_pdf)
+            reaproveitados = itens_reaproveitados(hash_pdf, precisos or {})
+            if reaproveitados is not None:
+                dados.extend(reaproveitados)
                 continue
-
-            valor = float(valor_str.replace(",", "."))
-            dados.append({"mes": ano_mes, "item": item, "valor": valor})
-
+            documento, itens, conciliacao = processar_documento(pdf, ano_mes, modelo.nome, documento=hash_pdf)
+        # Gravado aqui, fora do parse: quem chama processar_documento decide o que vai para o banco
+        registrar_documento(conta, documento, ano_mes, modelo.nome, MODO_RAPIDO, conciliacao)
+        dados.extend(itens)
     return dados
 
 
-def buscar_e_extrair(gmail_token: str = None):
-    service = get_service(gmail_token)
-
-    results = service.users().messages().list(
-        userId='me',
-        q='subject:Boleto'
-    ).execute()
-
-    mensagens = results.get('messages', [])
+def _buscar_e_extrair(service, executor, checkpoint, q: str, conta: str = "local"):
+    mensagens = listar_mensagens(service, executor, q)
     if not mensagens:
         print("Nenhum email encontrado.")
         return []
 
-    todos_dados = []
-
-    for msg in mensagens:
-        detalhe = service.users().messages().get(userId='me', id=msg['id']).execute()
-
-        headers = detalhe['payload']['headers']
-        remetente_valido = any(
-            h['name'] == 'From' and "mettacondominios" in h['value']
-            for h in headers
-        )
-        if not remetente_valido:
-            continue
-
-        data_email = datetime.fromtimestamp(int(detalhe['internalDate']) / 1000)
-        ano_mes = data_email.strftime("%Y_%m")
-
-        parts = detalhe['payload'].get('parts', [])
-        for part in parts:
-            filename = part.get('filename', '')
-            if not filename.lower().endswith('.pdf'):
-                continue
-
-            attachment_id = part['body'].get('attachmentId')
-            if not attachment_id:
-                continue
+    ids = [msg['id'] for msg in mensagens]
+    pendentes = [msg_id for msg_id in ids if msg_id not in checkpoint]
+    if len(pendentes) < len(ids):
+        print(f"Retomando sincronização: {len(ids) - len(pendentes)} mensagens já processadas")
 
-            # 🔑 Busca o PDF direto em memória, sem salvar no disco
-            attachment = service.users().messages().attachments().get(
-                userId='me',
-                messageId=msg['id'],
-                id=attachment_id
-            ).execute()
+    from arquivo_pdf import meses_arquivados
+    from conciliacao import itens_precisos
+    precisos = itens_precisos(conta)
+    arquivados = meses_arquivados()
 
-            pdf_bytes = base64.urlsafe_b64decode(attachment['data'])
-            print(f"Processando {ano_mes} - {filename} ({len(pdf_bytes)//1024}KB) em memória...")
+    def processar(msg_id):
+        checkpoint.registrar(msg_id, _processar_mensagem(service, executor, msg_id, conta, precisos, arquivados))
 
-            texto = extrair_texto_pdf(pdf_bytes)
-            itens = extrair_itens(texto, ano_mes)
-            todos_dados.extend(itens)
-            print(f"  → {len(itens)} itens extraídos")
+    executor.mapear(processar, pendentes)
 
+    todos_dados = checkpoint.itens(ids)
+    checkpoint.concluir()
     return todos_dados
 
 
@@ -164,10 +330,12 @@ if __name__ == "__main__":
     dados = buscar_e_extrair()
 
     if dados:
-        df = pd.DataFrame(dados)
-        df = df[df["item"].str.len() < 100]
-        df = df[~df["item"].str.match(r'^[\d\s/R$]+$')]
+        from ingestao import processar_ingestao
+        resultado = processar_ingestao("local", dados)
+        df = resultado["dados"]
         df.to_csv("dados_condominio.csv", index=False)
         print(f"\n✅ {len(df)} registros salvos em dados_condominio.csv")
+        print(f"⚠️  {len(resultado['anomalias'])} anomalias registradas")
+        print(f"💳 {len(resultado['parcelas'])} séries de parcelas")
     else:
         print("Nenhum dado extraído.")
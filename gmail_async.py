@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from executor_gmail import MAX_TENTATIVAS, espera_backoff, limite_de_taxa, retentavel
+from extrair_dados import (ARQUIVAR_PDFS, CAMPOS_ANEXO, CAMPOS_LISTA, CAMPOS_MENSAGEM, anexos_pdf,
+                           data_da_mensagem, itens_reaproveitados, mes_da_mensagem, modelo_da_mensagem,
+                           montar_query, processar_documento, remetente)
+
+URL_BASE = "https://gmail.googleapis.com/gmail/v1/users/me"
+# Requisições simultâneas por caixa postal
+CONCORRENCIA = 16
+TIMEOUT_HTTP = 60
+
+
+# ==========================
+# HTTP COM RETRY
+# ==========================
+class _Sessao:
+    """Cliente HTTP de uma caixa postal e o access token em uso, trocado quando o Gmail recusa."""
+
+    def __init__(self, cliente, gmail_token: str, creds):
+        self.cliente = cliente
+        self.gmail_token = gmail_token
+        self.creds = creds
+        self._renovacao = asyncio.Lock()
+
+    def cabecalhos(self) -> dict:
+        return {"Authorization": f"Bearer {self.creds.token}"}
+
+    async def renovar(self, token_rejeitado: str):
+        from gmail_cliente import renovar_rejeitadas
+        # Várias requisições recebem 401 juntas: só a primeira renova
+        async with self._renovacao:
+            self.creds = await asyncio.to_thread(renovar_rejeitadas, self.gmail_token, token_rejeitado)
+
+
+def _retry_after(resposta):
+    try:
+        return float(resposta.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+async def _get_json(sessao, caminho: str, params: dict = None) -> dict:
+    """
+    GET com a mesma classificação de erros do executor síncrono (5xx, 429,
+    403 de cota, rede). A renovação do token após um 401 não conta como
+    tentativa: a requisição sempre termina com o JSON ou com uma exceção.
+    """
+    import httpx
+    renovado = False
+    tentativa = 0
+    while True:
+        ultima = tentativa == MAX_TENTATIVAS - 1
+        token = sessao.creds.token
+        try:
+            resposta = await sessao.cliente.get(f"{URL_BASE}{caminho}", params=params, headers=sessao.cabecalhos())
+        except httpx.TransportError as erro:
+            if ultima:
+                raise
+            espera = espera_backoff(tentativa)
+            print(f"  ⏳ Gmail inacessível ({type(erro).__name__}); nova tentativa em {espera:.1f}s")
+            await asyncio.sleep(espera)
+            tentativa += 1
+            continue
+        if resposta.status_code == 401 and not renovado:
+            # Token revogado ou expirado antes da hora: renova uma vez e repete na hora
+            renovado = True
+            await sessao.renovar(token)
+            continue
+        if ultima or not retentavel(resposta.status_code, resposta.text):
+            resposta.raise_for_status()
+            return resposta.json()
+        espera = espera_backoff(tentativa, _retry_after(resposta))
+        motivo = "limite de taxa" if limite_de_taxa(resposta.status_code, resposta.text) else resposta.status_code
+        print(f"  ⏳ Gmail respondeu {motivo}; nova tentativa em {espera:.1f}s")
+        await asyncio.sleep(espera)
+        tentativa += 1
+
+
+async def _listar(sessao, q: str) -> list:
+    mensagens = []
+    params = {"q": q, "fields": CAMPOS_LISTA}
+    while True:
+        resultado = await _get_json(sessao, "/messages", params)
+        mensagens.extend(resultado.get("messages", []))
+        if not resultado.get("nextPageToken"):
+            return mensagens
+        params = {"q": q, "fields": CAMPOS_LISTA, "pageToken": resultado["nextPageToken"]}
+
+
+# ==========================
+# MENSAGENS E ANEXOS
+# ==========================
+async def _processar_mensagem(sessao, limite, pool, msg_id: str, conta: str, precisos: dict,
+                             arquivados: dict) -> list:
+    from arquivo_pdf import arquivar, mes_do_documento
+    from conciliacao import MODO_RAPIDO, registrar_documento
+    async with limite:
+        detalhe = await _get_json(sessao, f"/messages/{msg_id}", {"fields": CAMPOS_MENSAGEM})
+    modelo = modelo_da_mensagem(detalhe)
+    if modelo is None:
+        return []
+
+    mes_recebido = mes_da_mensagem(detalhe)
+    loop = asyncio.get_running_loop()
+    dados = []
+    for filename, attachment_id in anexos_pdf(detalhe):
+        async with limite:
+            anexo = await _get_json(sessao, f"/messages/{msg_id}/attachments/{attachment_id}", {"fields": CAMPOS_ANEXO})
+        pdf_bytes = base64.urlsafe_b64decode(anexo["data"])
+        del anexo
+        hash_pdf = hashlib.sha256(pdf_bytes).hexdigest()
+        ano_mes = mes_do_documento(hash_pdf, mes_recebido, arquivados)
+        print(f"Processando {ano_mes} - {filename} ({len(pdf_bytes)//1024}KB) em memória...")
+        if ARQUIVAR_PDFS:
+            await asyncio.to_thread(arquivar, pdf_bytes, msg_id, filename, data_da_mensagem(detalhe).isoformat(),
+                                    ano_mes, remetente(detalhe), conta, hash_pdf)
+        reaproveitados = itens_reaproveitados(hash_pdf, precisos)
+        if reaproveitados is not None:
+            dados.extend(reaproveitados)
+            continue
+        # O parsing do PDF é CPU: roda fora do event loop; a gravação fica neste processo
+        documento, itens, conciliacao = await loop.run_in_executor(
+            pool, partial(processar_documento, pdf_bytes, ano_mes, modelo.nome, documento=hash_pdf)
+        )
+        await asyncio.to_thread(registrar_documento, conta, documento, ano_mes, modelo.nome, MODO_RAPIDO, conciliacao)
+        dados.extend(itens)
+    return dados
+
+
+async def buscar_e_extrair_async(gmail_token: str = None, pool=None, q: str = None, conta: str = "local") -> list:
+    """
+    Mesmo contrato de extrair_dados.buscar_e_extrair, mas com as chamadas ao
+    Gmail feitas de forma concorrente em um único event loop.
+    """
+    import httpx
+    from arquivo_pdf import meses_arquivados
+    from conciliacao import itens_precisos
+    from gmail_cliente import credenciais_validas
+
+    creds = await asyncio.to_thread(credenciais_validas, gmail_token)
+    precisos = await asyncio.to_thread(itens_precisos, conta)
+    arquivados = await asyncio.to_thread(meses_arquivados)
+    limite = asyncio.Semaphore(CONCORRENCIA)
+    async with httpx.AsyncClient(timeout=TIMEOUT_HTTP) as cliente:
+        sessao = _Sessao(cliente, gmail_token, creds)
+        mensagens = await _listar(sessao, q or montar_query())
+        if not mensagens:
+            print("Nenhum email encontrado.")
+            return []
+        resultados = await asyncio.gather(*(
+            _processar_mensagem(sessao, limite, pool, msg["id"], conta, precisos, arquivados) for msg in mensagens
+        ))
+    return [item for itens in resultados for item in itens]
+
+
+async def buscar_e_extrair_contas(gmail_tokens: dict, max_processos: int = None) -> dict:
+    """
+    Sincroniza várias caixas postais ao mesmo tempo ({conta: gmail_token}).
+    Todas compartilham o event loop e o mesmo pool de processos para os PDFs.
+    Retorna {conta: lista de itens}; contas com erro ficam com a exceção.
+    """
+    with ProcessPoolExecutor(max_workers=max_processos) as pool:
+        resultados = await asyncio.gather(
+            *(buscar_e_extrair_async(token, pool, conta=conta) for conta, token in gmail_tokens.items()),
+            return_exceptions=True,
+        )
+    return dict(zip(gmail_tokens, resultados))
+
+
+def buscar_e_extrair(gmail_token: str = None, conta: str = "local") -> list:
+    with ProcessPoolExecutor() as pool:
+        return asyncio.run(buscar_e_extrair_async(gmail_token, pool, conta=conta))
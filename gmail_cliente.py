@@ -0,0 +1,135 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from corretor_credenciais import SCOPES, chave_conta, descartar_credenciais, obter_credenciais, renovar_rejeitadas
+
+# Documento de discovery local opcional; sem ele usa o que vem empacotado na biblioteca
+ARQUIVO_DISCOVERY = "gmail_v1_discovery.json"
+TIMEOUT_HTTP = 60
+
+
+# ==========================
+# POOL DE CLIENTES POR CONTA
+# ==========================
+class _HttpDaConta:
+    """
+    httplib2.Http que assina cada requisição com o access token da conta.
+    Não renova sozinho, como o AuthorizedHttp (que chamaria creds.refresh
+    por fora do corretor, sem lock e sem gravar o token novo): o token vem do
+    corretor, que o renova antes de expirar, e um 401 vai para
+    renovar_rejeitadas. Toda renovação passa pelo corretor.
+    """
+
+    def __init__(self, gmail_token: str = None):
+        import httplib2
+        self.gmail_token = gmail_token
+        self.http = httplib2.Http(timeout=TIMEOUT_HTTP)
+
+    def _enviar(self, token: str, uri, method, body, headers, **kwargs):
+        headers = dict(headers or {})
+        headers["authorization"] = f"Bearer {token}"
+        return self.http.request(uri, method, body=body, headers=headers, **kwargs)
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        token = obter_credenciais(self.gmail_token).token
+        resp, conteudo = self._enviar(token, uri, method, body, headers, **kwargs)
+        if resp.status == 401:
+            # Recusado antes da hora: renova uma vez (ou pega o que outra thread já renovou)
+            token = renovar_rejeitadas(self.gmail_token, token).token
+            resp, conteudo = self._enviar(token, uri, method, body, headers, **kwargs)
+        return resp, conteudo
+
+    def close(self):
+        self.http.close()
+
+
+class _Cliente:
+    def __init__(self, gmail_token: str, creds, service):
+        self.gmail_token = gmail_token
+        self.creds = creds
+        self.service = service
+        self.lock = threading.Lock()
+        # Http livres da conta, emprestados às threads do executor (ver conexao)
+        self.conexoes = []
+        self.conexoes_lock = threading.Lock()
+
+
+_clientes: dict = {}
+_clientes_lock = threading.Lock()
+
+
+def _novo_http(gmail_token: str = None):
+    return _HttpDaConta(gmail_token)
+
+
+def _construir_servico(gmail_token: str = None):
+    from googleapiclient.discovery import build, build_from_document
+
+    # Os Http ficam no pool da conta, que vive no processo: as conexões HTTPS
+    # ficam abertas (keep-alive) entre as chamadas e entre as sincronizações
+    http = _novo_http(gmail_token)
+    if os.path.exists(ARQUIVO_DISCOVERY):
+        with open(ARQUIVO_DISCOVERY) as f:
+            return build_from_document(f.read(), http=http)
+    return build('gmail', 'v1', http=http, static_discovery=True, cache_discovery=False)
+
+
+def _obter_cliente(gmail_token: str = None) -> _Cliente:
+    chave = chave_conta(gmail_token)
+    with _clientes_lock:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            # O corretor entrega sempre o mesmo objeto de credenciais da conta
+            creds = obter_credenciais(gmail_token)
+            cliente = _Cliente(gmail_token, creds, _construir_servico(gmail_token))
+            _clientes[chave] = cliente
+    return cliente
+
+
+@contextmanager
+def cliente_gmail(gmail_token: str = None):
+    """
+    Entrega o serviço do Gmail da conta, reaproveitando o objeto já montado
+    (sem reler o token nem reconstruir o discovery). O uso é exclusivo por
+    conta enquanto o bloco estiver aberto, porque o httplib2 não é thread-safe.
+    """
+    cliente = _obter_cliente(gmail_token)
+    with cliente.lock:
+        obter_credenciais(gmail_token)
+        yield cliente.service
+
+
+@contextmanager
+def conexao(gmail_token: str = None):
+    """
+    Empresta um Http autenticado da conta, exclusivo de quem o pegou enquanto
+    o bloco estiver aberto (o httplib2 não é thread-safe). Na devolução ele
+    volta para o pool da conta com a conexão aberta, e a próxima requisição,
+    de qualquer thread ou sincronização, reaproveita o keep-alive.
+    """
+    cliente = _obter_cliente(gmail_token)
+    with cliente.conexoes_lock:
+        http = cliente.conexoes.pop() if cliente.conexoes else None
+    if http is None:
+        http = _novo_http(cliente.gmail_token)
+    try:
+        yield http
+    finally:
+        with cliente.conexoes_lock:
+            cliente.conexoes.append(http)
+
+
+def credenciais(gmail_token: str = None):
+    return _obter_cliente(gmail_token).creds
+
+
+def credenciais_validas(gmail_token: str = None):
+    """Credenciais da conta já renovadas, para clientes HTTP que não usam o googleapiclient."""
+    return obter_credenciais(gmail_token)
+
+
+def descartar_cliente(gmail_token: str = None):
+    with _clientes_lock:
+        _clientes.pop(chave_conta(gmail_token), None)
+    descartar_credenciais(gmail_token)
@@ -1,84 +1,59 @@
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
 import base64
-import os
+import hashlib
 from datetime import datetime
+from gmail_cliente import cliente_gmail, conexao
+from executor_gmail import ExecutorGmail
+from extrair_dados import CAMPOS_ANEXO, CAMPOS_MENSAGEM, anexos_pdf, listar_mensagens, mes_da_mensagem, montar_query, remetente, remetente_valido
+from arquivo_pdf import arquivar, mes_do_documento, meses_arquivados
 
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
+def baixar_pdfs(conta: str = "local"):
+    # Usa o token.json local, que pertence à conta "local" do banco
+    with cliente_gmail() as service:
+        _baixar_pdfs(service, ExecutorGmail(conexao), conta)
 
-def get_service():
-    creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    return build('gmail', 'v1', credentials=creds)
 
+def _baixar_pdfs(service, executor, conta: str = "local"):
+    query = montar_query()
 
-def baixar_pdfs():
-    service = get_service()
-
-    query = 'subject:Boleto'
-
-    results = service.users().messages().list(
-        userId='me',
-        q=query
-    ).execute()
-
-    mensagens = results.get('messages', [])
+    mensagens = listar_mensagens(service, executor, query)
+    arquivados = meses_arquivados()
 
     if not mensagens:
         print("Nenhum email encontrado.")
         return
 
-    if not os.path.exists('pdfs'):
-        os.makedirs('pdfs')
-
     for msg in mensagens:
-        detalhe = service.users().messages().get(
+        detalhe = executor.executar(service.users().messages().get(
             userId='me',
-            id=msg['id']
-        ).execute()
-
-        headers = detalhe['payload']['headers']
-
-        remetente_valido = False
-        for header in headers:
-            if header['name'] == 'From' and "mettacondominios" in header['value']:
-                remetente_valido = True
-                break
+            id=msg['id'],
+            fields=CAMPOS_MENSAGEM
+        ))
 
-        if not remetente_valido:
+        if not remetente_valido(detalhe):
             continue
 
         # 📅 Pega data do email
         data_email = datetime.fromtimestamp(int(detalhe['internalDate']) / 1000)
-        ano_mes = data_email.strftime("%Y_%m")
-
-        parts = detalhe['payload'].get('parts', [])
-        if not parts:
-            continue
-
-        for part in parts:
-            filename = part.get('filename')
-
-            if filename and filename.lower().endswith('.pdf'):
-                attachment_id = part['body'].get('attachmentId')
-                if not attachment_id:
-                    continue
-
-                attachment = service.users().messages().attachments().get(
-                    userId='me',
-                    messageId=msg['id'],
-                    id=attachment_id
-                ).execute()
+        mes_recebido = mes_da_mensagem(detalhe)
 
-                file_data = base64.urlsafe_b64decode(attachment['data'])
+        for filename, attachment_id in anexos_pdf(detalhe):
+            attachment = executor.executar(service.users().messages().attachments().get(
+                userId='me',
+                messageId=msg['id'],
+                id=attachment_id,
+                fields=CAMPOS_ANEXO
+            ))
 
-                novo_nome = f"{ano_mes}_Boleto.pdf"
-                path = os.path.join('pdfs', novo_nome)
+            file_data = base64.urlsafe_b64decode(attachment['data'])
+            hash_pdf = hashlib.sha256(file_data).hexdigest()
+            ano_mes = mes_do_documento(hash_pdf, mes_recebido, arquivados)
 
-                with open(path, 'wb') as f:
-                    f.write(file_data)
+            # Arquivo endereçado pelo conteúdo: dois boletos no mesmo mês não se sobrescrevem
+            arquivar(file_data, msg['id'], filename, data_email.isoformat(), ano_mes, remetente(detalhe), conta,
+                     hash_pdf=hash_pdf)
 
-                print("PDF salvo:", novo_nome)
+            print(f"PDF salvo: {ano_mes} {filename} ({hash_pdf[:12]})")
 
 
 if __name__ == "__main__":
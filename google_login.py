@@ -1,12 +1,8 @@
 import json
 import os
 import uuid
-import requests
 import streamlit as st
 import streamlit.components.v1 as components
-from google_auth_oauthlib.flow import Flow
-
-SESSIONS_FILE = "sessions.json"
 
 def _get_redirect_uri() -> str:
     try:
@@ -26,62 +22,14 @@ SCOPES = [
 
 
 # ==========================
-# PKCE CODE VERIFIER (persiste entre os dois Flow criados em get_auth_url / handle_callback)
-# ==========================
-_PENDING_AUTH_FILE = "pending_auth.json"
-
-def _save_code_verifier(state: str, code_verifier: str):
-    pending = {}
-    if os.path.exists(_PENDING_AUTH_FILE):
-        try:
-            with open(_PENDING_AUTH_FILE) as f:
-                pending = json.load(f)
-        except Exception:
-            pass
-    pending[state] = code_verifier
-    try:
-        with open(_PENDING_AUTH_FILE, "w") as f:
-            json.dump(pending, f)
-    except Exception:
-        pass
-
-def _pop_code_verifier(state: str) -> str:
-    if not state or not os.path.exists(_PENDING_AUTH_FILE):
-        return None
-    try:
-        with open(_PENDING_AUTH_FILE) as f:
-            pending = json.load(f)
-        code_verifier = pending.pop(state, None)
-        with open(_PENDING_AUTH_FILE, "w") as f:
-            json.dump(pending, f)
-        return code_verifier
-    except Exception:
-        return None
-
-
-# ==========================
-# SESSÕES NO SERVIDOR
+# PKCE E SESSÕES NO SERVIDOR
 # ==========================
-_sessions_memory: dict = {}
-
-def _load_sessions():
-    if os.path.exists(SESSIONS_FILE):
-        try:
-            with open(SESSIONS_FILE) as f:
-                data = json.load(f)
-                _sessions_memory.update(data)
-        except Exception:
-            pass
-    return _sessions_memory
-
-def _save_sessions(sessions: dict):
-    _sessions_memory.clear()
-    _sessions_memory.update(sessions)
-    try:
-        with open(SESSIONS_FILE, "w") as f:
-            json.dump(sessions, f)
-    except Exception:
-        pass
+# Ficam no backend de estado compartilhado (estado_compartilhado.py), e não na
+# memória do processo, para que qualquer réplica do dashboard atenda o callback
+# do OAuth e reconheça o sid de uma sessão criada em outra.
+from estado_compartilhado import (
+    guardar_verificador, obter_sessao, remover_sessao, retirar_verificador, salvar_sessao,
+)
 
 
 # ==========================
@@ -144,7 +92,10 @@ def _delete_cookie_js():
     components.html(js, height=0, scrolling=False)
 
 
-def _get_flow() -> Flow:
+def _get_flow():
+    # Importado sob demanda: só é usado ao montar a URL de login e no callback
+    from google_auth_oauthlib.flow import Flow
+
     redirect_uri = _get_redirect_uri()
 
     # Permite HTTP apenas em desenvolvimento local
@@ -184,7 +135,7 @@ def get_auth_url() -> str:
     # Salva o code_verifier PKCE — necessário porque handle_callback cria uma nova
     # instância de Flow e o verifier precisa ser o mesmo da URL de autorização.
     if flow.code_verifier:
-        _save_code_verifier(state, flow.code_verifier)
+        guardar_verificador(state, flow.code_verifier)
     return auth_url
 
 
@@ -199,7 +150,7 @@ def handle_callback() -> bool:
         flow = _get_flow()
         # Restaura o code_verifier PKCE salvo em get_auth_url()
         state = st.query_params.get("state", "")
-        code_verifier = _pop_code_verifier(state)
+        code_verifier = retirar_verificador(state)
         if code_verifier:
             flow.code_verifier = code_verifier
         flow.fetch_token(code=st.query_params["code"])
@@ -210,6 +161,7 @@ def handle_callback() -> bool:
             from google.auth.transport.requests import Request as GRequest
             creds.refresh(GRequest())
 
+        import requests
         user_resp = requests.get(
             "https://www.googleapis.com/oauth2/v2/userinfo",
             headers={"Authorization": f"Bearer {creds.token}"},
@@ -217,16 +169,16 @@ def handle_callback() -> bool:
         )
         user_info = user_resp.json()
 
-        gmail_token = creds.to_json()
+        # A credencial recém-emitida já fica no corretor: a primeira sync não relê nem renova
+        from corretor_credenciais import registrar_credenciais
+        gmail_token = registrar_credenciais(creds)
 
         # Criar sessão no servidor
         token = str(uuid.uuid4())
-        sessions = _load_sessions()
-        sessions[token] = {
+        salvar_sessao(token, {
             "user_info": user_info,
             "gmail_token": gmail_token,
-        }
-        _save_sessions(sessions)
+        })
 
         st.session_state["user"] = user_info
         st.session_state["gmail_token"] = gmail_token
@@ -248,9 +200,8 @@ def is_authenticated() -> bool:
         return True
     sid = st.query_params.get(SESSION_PARAM, "")
     if sid:
-        sessions = _load_sessions()
-        if sid in sessions:
-            session_data = sessions[sid]
+        session_data = obter_sessao(sid)
+        if session_data is not None:
             if isinstance(session_data, dict) and "user_info" in session_data:
                 st.session_state["user"] = session_data["user_info"]
                 st.session_state["gmail_token"] = session_data.get("gmail_token")
@@ -267,9 +218,7 @@ def is_authenticated() -> bool:
 def logout():
     sid = st.query_params.get(SESSION_PARAM, "") or st.session_state.get("_sid", "")
     if sid:
-        sessions = _load_sessions()
-        sessions.pop(sid, None)
-        _save_sessions(sessions)
+        remover_sessao(sid)
     st.session_state.clear()
     _delete_cookie_js()
     st.query_params.clear()
@@ -0,0 +1,92 @@
+import pandas as pd
+import armazenamento
+from agregados import calcular_cubo, com_unidade
+from anomalias import detectar_anomalias
+from canonicalizacao import canonizar
+from estado_compartilhado import publicar_resultado, resultado_publicado
+from parcelas import detectar_parcelas, marcar_parcelas
+
+
+def preparar_dataframe(dados: list) -> pd.DataFrame:
+    if not dados:
+        df = pd.DataFrame(columns=["mes", "unidade", "item", "valor"])
+    else:
+        df = pd.DataFrame(dados)
+        df = df[df["item"].str.len() < 100]
+        df = df[~df["item"].str.match(r'^[\d\s/R$]+$')]
+    return com_unidade(marcar_parcelas(canonizar(df)))
+
+
+def periodo_em_meses(inicio, fim):
+    """
+    Amplia o período para meses inteiros: (primeiro dia do mês de inicio,
+    último dia do mês de fim, lista YYYY_MM). A re-sincronização troca meses
+    inteiros, então a busca no Gmail precisa cobrir os mesmos meses inteiros.
+    """
+    meses = pd.period_range(inicio, fim, freq="M")
+    return meses[0].start_time.date(), meses[-1].end_time.date(), meses.strftime("%Y_%m").tolist()
+
+
+def mesclar_periodo(df_existente: pd.DataFrame, dados_novos: list, meses: list) -> list:
+    """
+    Substitui apenas os meses re-sincronizados: mantém as linhas existentes
+    fora de `meses` e acrescenta os itens recém-extraídos.
+    """
+    colunas = [c for c in ["mes", "unidade", "item", "valor", "documento"] if c in df_existente.columns]
+    mantidos = df_existente.loc[~df_existente["mes"].isin(meses), colunas]
+    return mantidos.to_dict("records") + [d for d in dados_novos if d["mes"] in meses]
+
+
+def processar_ingestao(conta: str, dados: list) -> dict:
+    """
+    Etapa única executada a cada ingestão: limpa os itens extraídos, associa
+    cada nome a um item canônico, detecta anomalias e séries de parcelas sobre
+    o histórico completo, agrega o cubo mês × item e grava tudo no banco
+    local junto com a nova versão dos dados. Dashboard, CLI e API só leem os
+    resultados prontos.
+
+    Retorna {"dados": ..., "anomalias": ..., "parcelas": ..., "cubo": ...}.
+    """
+    df = preparar_dataframe(dados)
+    resultado = {
+        "dados": df,
+        "anomalias": detectar_anomalias(df),
+        "parcelas": detectar_parcelas(df),
+        "cubo": calcular_cubo(df),
+    }
+    armazenamento.salvar_tabela(conta, "itens", df)
+    for tabela in ["anomalias", "parcelas", "cubo"]:
+        armazenamento.salvar_tabela(conta, tabela, resultado[tabela])
+    versao = armazenamento.versao_dados(df)
+    armazenamento.registrar_versao(conta, versao)
+    # Outras réplicas do dashboard veem a versão nova (e, em backend de rede, as tabelas)
+    publicar_resultado(conta, versao, resultado)
+    return resultado
+
+
+def carregar_resultado(conta: str) -> dict:
+    """Lê do banco o mesmo dicionário que processar_ingestao devolve."""
+    df = com_unidade(armazenamento.carregar_tabela(conta, "itens"))
+    # SQLite não guarda bool, categoria nem inteiros anuláveis
+    df["fixo"] = df["fixo"].astype(bool)
+    for coluna in ["parcela", "total_parcelas"]:
+        df[coluna] = pd.to_numeric(df[coluna]).astype("Int64")
+    cubo = com_unidade(armazenamento.carregar_tabela(conta, "cubo"))
+    cubo["fixo"] = cubo["fixo"].astype(bool)
+    return {
+        "dados": df,
+        "anomalias": armazenamento.carregar_tabela(conta, "anomalias"),
+        "parcelas": armazenamento.carregar_tabela(conta, "parcelas"),
+        "cubo": cubo,
+    }
+
+
+def carregar_versao(conta: str, versao: str):
+    """
+    Resultado da conta na versão publicada: do backend compartilhado quando ele
+    guarda as tabelas, senão do banco local se ele estiver nessa mesma versão.
+    """
+    resultado = resultado_publicado(conta, versao)
+    if resultado is None and armazenamento.versao_atual(conta)[0] == versao:
+        resultado = carregar_resultado(conta)
+    return resultado
@@ -0,0 +1,246 @@
+import argparse
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from arquivo_pdf import (DIRETORIO_ARQUIVO, abrir_mmap, gravar_atomico, guardar_objeto, mes_do_documento,
+                         meses_arquivados, registrar_entrada)
+from modelos_boleto import MODELO_PADRAO, MODELOS
+
+# ==========================
+# INGESTÃO LOCAL (SEM GMAIL)
+# ==========================
+# PDFs enviados pelo dashboard ou deixados na pasta vigiada passam pelo mesmo
+# parse em paralelo do reprocessamento do arquivo e vão para o mesmo banco.
+# Serve para importar anos de boletos guardados sem gastar cota do Gmail e
+# para instalações sem acesso à internet.
+
+# Pasta vigiada: só o primeiro nível (objetos/ e ocr/ são do arquivo local)
+PASTA_ENTRADA = DIRETORIO_ARQUIVO
+ARQUIVO_IMPORTADOS = os.path.join(DIRETORIO_ARQUIVO, "importados.json")
+INTERVALO_VIGIA = 30
+# Arquivo alterado há menos que isso ainda pode estar sendo copiado
+ESPERA_ESTABILIDADE = 10
+# Membros de ZIP maiores que isso são ignorados (nenhum boleto chega perto)
+LIMITE_MEMBRO_ZIP = 50 * 1024 * 1024
+# PDFs em parse ao mesmo tempo na importação; o próximo só é lido quando um termina
+LOTE_IMPORTACAO = 32
+
+_MES_NO_NOME = re.compile(r'(20\d{2})[_-]?(0[1-9]|1[0-2])')
+
+
+def mes_do_nome(nome: str):
+    """YYYY_MM escrito no nome do arquivo (ex: boleto_2024_03.pdf), ou None."""
+    achado = _MES_NO_NOME.search(os.path.basename(nome))
+    return f"{achado.group(1)}_{achado.group(2)}" if achado else None
+
+
+def _ler(fonte) -> bytes:
+    if isinstance(fonte, (bytes, bytearray)):
+        return fonte
+    if isinstance(fonte, str):
+        with open(fonte, "rb") as f:
+            return f.read()
+    fonte.seek(0)
+    return fonte.read()
+
+
+def expandir_zips(arquivos):
+    """
+    Gera (nome, bytes) de cada PDF, abrindo os ZIPs (inclusive subpastas).
+    Cada arquivo vem como bytes, caminho ou objeto de arquivo; ZIPs em caminho
+    ou objeto de arquivo são lidos membro a membro, sem carregar o pacote.
+    """
+    for nome, fonte in arquivos:
+        if not nome.lower().endswith(".zip"):
+            yield nome, _ler(fonte)
+            continue
+        with zipfile.ZipFile(io.BytesIO(fonte) if isinstance(fonte, (bytes, bytearray)) else fonte) as pacote:
+            for membro in pacote.infolist():
+                if (membro.is_dir() or not membro.filename.lower().endswith(".pdf")
+                        or membro.filename.startswith("__MACOSX/")):
+                    continue
+                if membro.file_size > LIMITE_MEMBRO_ZIP:
+                    print(f"  ⚠️  {membro.filename}: ignorado ({membro.file_size // (1024 * 1024)}MB)")
+                    continue
+                yield f"{nome}/{membro.filename}", pacote.read(membro)
+
+
+# ==========================
+# PARSE EM PARALELO E GRAVAÇÃO
+# ==========================
+def _processar_arquivo(nome: str, hash_pdf: str, ano_mes: str, modelo: str):
+    # O trabalhador lê o PDF já arquivado (mmap): os bytes não passam pelo pool
+    from extrair_dados import processar_documento
+    with abrir_mmap(hash_pdf) as pdf:
+        print(f"Processando {nome} ({len(pdf) // 1024}KB)...")
+        return processar_documento(pdf, ano_mes, modelo, documento=hash_pdf)
+
+
+def importar(conta: str, arquivos, modelo: str = MODELO_PADRAO, max_processos: int = None):
+    """
+    Importa (nome, PDF ou ZIP) para a conta; o arquivo pode vir como bytes,
+    caminho ou objeto de arquivo. Cada PDF é arquivado pelo hash assim que
+    lido e parseado num processo do pool, com no máximo LOTE_IMPORTACAO em
+    andamento: um lote de anos de boletos não fica inteiro na memória. Os
+    itens substituem os do mesmo documento já gravados (reimportar não
+    duplica) e a ingestão roda uma vez no fim. Devolve o resultado da
+    ingestão, ou None se nenhum item foi extraído.
+    """
+    import armazenamento
+    from conciliacao import MODO_RAPIDO, itens_precisos, registrar_documento
+    from extrair_dados import itens_reaproveitados
+    from ingestao import processar_ingestao
+
+    precisos = itens_precisos(conta)
+    arquivados = meses_arquivados()
+    novos, documentos = [], set()
+    lidos = falhas = 0
+
+    def concluir(nome, hash_pdf, futuro):
+        nonlocal falhas
+        try:
+            documento, itens, conciliacao = futuro.result()
+        except Exception as e:
+            # Um PDF ilegível não impede os demais
+            print(f"  ❌ {nome}: {e}")
+            falhas += 1
+            return
+        if not itens:
+            print(f"  ⚠️  {nome}: nenhum item reconhecido")
+            return
+        ano_mes = arquivados.setdefault(documento, itens[0]["mes"])
+        registrar_entrada(hash_pdf, f"local-{documento[:12]}", os.path.basename(nome),
+                          datetime.now().isoformat(timespec="seconds"), ano_mes, "", conta)
+        registrar_documento(conta, documento, ano_mes, modelo, MODO_RAPIDO, conciliacao)
+        documentos.add(documento)
+        novos.extend(itens)
+
+    with ProcessPoolExecutor(max_workers=max_processos) as pool:
+        pendentes = deque()
+        for nome, pdf in expandir_zips(arquivos):
+            lidos += 1
+            hash_pdf = guardar_objeto(pdf)
+            reaproveitados = itens_reaproveitados(hash_pdf, precisos)
+            del pdf
+            if reaproveitados is not None:
+                # Já conciliado no modo preciso nesta conta: mantém os itens e a conciliação gravados
+                documentos.add(hash_pdf)
+                novos.extend(reaproveitados)
+                continue
+            # Mesma regra de mês da sincronização do Gmail (ver arquivo_pdf.mes_do_documento)
+            ano_mes = mes_do_documento(hash_pdf, mes_do_nome(nome), arquivados)
+            pendentes.append((nome, hash_pdf, pool.submit(_processar_arquivo, nome, hash_pdf, ano_mes, modelo)))
+            if len(pendentes) >= LOTE_IMPORTACAO:
+                concluir(*pendentes.popleft())
+        while pendentes:
+            concluir(*pendentes.popleft())
+
+    if not lidos:
+        return None
+    print(f"📄 {len(documentos)} documento(s) com itens, {falhas} com erro, de {lidos} PDF(s)")
+    if not novos:
+        return None
+    existentes = armazenamento.carregar_tabela(conta, "itens", ["mes", "unidade", "item", "valor", "documento"])
+    if "documento" in existentes.columns:
+        existentes = existentes[~existentes["documento"].isin(documentos)]
+    return processar_ingestao(conta, existentes.to_dict("records") + novos)
+
+
+def importar_caminhos(conta: str, caminhos: list, modelo: str = MODELO_PADRAO, max_processos: int = None):
+    return importar(conta, ((caminho, caminho) for caminho in caminhos), modelo, max_processos)
+
+
+# ==========================
+# PASTA VIGIADA
+# ==========================
+def _carregar_importados() -> dict:
+    try:
+        with open(ARQUIVO_IMPORTADOS) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _assinatura(caminho: str) -> list:
+    estado = os.stat(caminho)
+    return [estado.st_mtime, estado.st_size]
+
+
+def arquivos_novos(pasta: str = PASTA_ENTRADA) -> list:
+    """PDFs e ZIPs do primeiro nível da pasta ainda não importados (ou alterados desde então)."""
+    if not os.path.isdir(pasta):
+        return []
+    importados = _carregar_importados()
+    agora = time.time()
+    novos = []
+    for nome in sorted(os.listdir(pasta)):
+        caminho = os.path.join(pasta, nome)
+        if not nome.lower().endswith((".pdf", ".zip")) or not os.path.isfile(caminho):
+            continue
+        assinatura = _assinatura(caminho)
+        if importados.get(caminho) != assinatura and agora - assinatura[0] >= ESPERA_ESTABILIDADE:
+            novos.append(caminho)
+    return novos
+
+
+def _marcar_importados(caminhos: list):
+    importados = _carregar_importados()
+    for caminho in caminhos:
+        if os.path.exists(caminho):
+            importados[caminho] = _assinatura(caminho)
+    conteudo = json.dumps(importados, indent=1, ensure_ascii=False).encode()
+    gravar_atomico(ARQUIVO_IMPORTADOS, lambda f: f.write(conteudo))
+
+
+def vigiar(conta: str, pasta: str = PASTA_ENTRADA, intervalo: int = INTERVALO_VIGIA,
+           uma_vez: bool = False, modelo: str = MODELO_PADRAO, max_processos: int = None):
+    """Varre a pasta a cada `intervalo` segundos e importa o que apareceu, em lote."""
+    print(f"👀 Vigiando {pasta}/ para a conta {conta}")
+    while True:
+        novos = arquivos_novos(pasta)
+        if novos:
+            print(f"\n[{datetime.now():%Y-%m-%d %H:%M:%S}] {len(novos)} arquivo(s) novo(s)")
+            inicio = time.perf_counter()
+            resultado = importar_caminhos(conta, novos, modelo, max_processos)
+            # Marcados mesmo com erro: só voltam a ser lidos se o arquivo mudar
+            _marcar_importados(novos)
+            if resultado is not None:
+                print(f"  ✅ {len(resultado['dados'])} registros na conta {conta} "
+                      f"({time.perf_counter() - inicio:.1f}s)")
+        if uma_vez:
+            break
+        time.sleep(intervalo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação de boletos em PDF sem o Gmail")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_imp = sub.add_parser("importar", help="Importa PDFs ou ZIPs informados")
+    p_imp.add_argument("arquivos", nargs="+")
+    p_vig = sub.add_parser("vigiar", help="Importa o que for deixado na pasta vigiada")
+    p_vig.add_argument("--pasta", default=PASTA_ENTRADA)
+    p_vig.add_argument("--intervalo", type=int, default=INTERVALO_VIGIA, help="Segundos entre varreduras")
+    p_vig.add_argument("--uma-vez", action="store_true", help="Uma varredura só (para cron)")
+    for p in (p_imp, p_vig):
+        p.add_argument("--conta", default="local")
+        p.add_argument("--modelo", default=MODELO_PADRAO, choices=sorted(MODELOS))
+        p.add_argument("--processos", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.comando == "importar":
+        resultado = importar_caminhos(args.conta, args.arquivos, args.modelo, args.processos)
+        if resultado is not None:
+            print(f"\n✅ {len(resultado['dados'])} registros na conta {args.conta}")
+    else:
+        vigiar(args.conta, args.pasta, args.intervalo, args.uma_vez, args.modelo, args.processos)
+
+
+if __name__ == "__main__":
+    main()
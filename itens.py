@@ -0,0 +1,22 @@
+import re
+
+# ==========================
+# DEFINIÇÃO DE ITENS FIXOS
+# ==========================
+ITENS_FIXOS = [
+    "Taxa Fundo de Reserva",
+    "Energia Elétrica",
+    "Elevador",
+    "Taxa de Cobrança CREA",
+    "Limpeza e Conservação",
+    "Limpeza Jardim /Calçada",
+    "Limpeza Jardim",
+    "Administração/Síndico",
+    "Tarifa Bancária",
+    "Taxa Básica Corsan"
+]
+
+
+# Normalizar nome removendo padrão de parcelas (ex: "2/2", "04/06", "3/3")
+def normalizar_parcela(item):
+    return re.sub(r'\s*\d+/\d+\s*$', '', item).strip()
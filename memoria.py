@@ -0,0 +1,76 @@
+import os
+import threading
+from contextlib import contextmanager
+
+# Medições em andamento no processo e quantas já começaram (para detectar sobreposição)
+_ativas = 0
+_iniciadas = 0
+_lock = threading.Lock()
+
+
+def pico_rss_mb() -> float:
+    """Pico de memória residente do processo (VmHWM no Linux, ru_maxrss como alternativa)."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    import sys
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa em bytes, Linux em KB
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def rss_atual_mb() -> float:
+    """Memória residente atual do processo (VmRSS); 0 onde /proc não existe."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _reiniciar_pico():
+    # Escrever "5" em clear_refs zera o VmHWM (Linux >= 4.0); sem isso o pico é o do processo todo
+    try:
+        with open(f"/proc/{os.getpid()}/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+@contextmanager
+def medir_pico_rss():
+    """
+    Mede o pico de RSS durante o bloco; ao sair, medida["pico_mb"] tem o valor
+    e medida["exclusiva"] diz se o bloco rodou sozinho. O VmHWM é do processo
+    inteiro: com outros blocos em paralelo (threads), o pico não é zerado no
+    meio deles e o número é o pico do processo, não o deste bloco.
+    """
+    global _ativas, _iniciadas
+    with _lock:
+        sozinha = _ativas == 0
+        if sozinha:
+            _reiniciar_pico()
+        _ativas += 1
+        _iniciadas += 1
+        ordem = _iniciadas
+    medida = {}
+    try:
+        yield medida
+    finally:
+        with _lock:
+            _ativas -= 1
+            medida["exclusiva"] = sozinha and _iniciadas == ordem
+        medida["pico_mb"] = pico_rss_mb()
+
+
+def descrever_pico(medida: dict) -> str:
+    rotulo = "pico de memória" if medida["exclusiva"] else "pico do processo (paralelo)"
+    return f"{rotulo} {medida['pico_mb']:.0f} MB"
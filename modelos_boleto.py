@@ -0,0 +1,184 @@
+import re
+
+# ==========================
+# MODELOS DE BOLETO POR ADMINISTRADORA
+# ==========================
+# Cada administradora formata o detalhamento do boleto de um jeito. Um modelo
+# reúne os marcadores da seção de itens, o padrão das linhas e o que ignorar,
+# tudo pré-compilado; a mensagem é despachada para o modelo pelo domínio do
+# remetente, consultando um dicionário (sem testar modelo por modelo).
+
+
+class ModeloBoleto:
+    def __init__(self, nome: str, remetentes: list, assunto: str, inicio_secao: list,
+                 fim_contem: list, fim_regex: list, padrao_linha: str, ignorar: list,
+                 padrao_unidade: str = None, padrao_total: str = None, padrao_vencimento: str = None,
+                 max_tamanho_item: int = 50):
+        self.nome = nome
+        # Rótulo do domínio do e-mail (ex: "mettacondominios" em boletos@mettacondominios.com.br)
+        self.remetentes = remetentes
+        self.assunto = assunto
+        self.inicio_secao = re.compile("|".join(map(re.escape, inicio_secao)))
+        self.fim_secao = re.compile("|".join([re.escape(m) for m in fim_contem] + fim_regex))
+        self.padrao_linha = re.compile(padrao_linha)
+        self.ignorar = re.compile("|".join(map(re.escape, ignorar)))
+        # Linha com a unidade cobrada (o grupo 1 é a unidade); também encerra a seção de itens
+        self.padrao_unidade = re.compile(padrao_unidade) if padrao_unidade else None
+        # Linha do total declarado de cada boleto (o grupo 1 é o valor)
+        self.padrao_total = re.compile(padrao_total, re.MULTILINE) if padrao_total else None
+        # Data de vencimento (grupos dia, mês, ano): dá o mês de PDFs importados sem e-mail
+        self.padrao_vencimento = re.compile(padrao_vencimento) if padrao_vencimento else None
+        self.max_tamanho_item = max_tamanho_item
+
+    def extrair_itens(self, texto: str, ano_mes: str) -> list:
+        """
+        Itens {"mes", "unidade", "item", "valor"} do texto do boleto. Cada seção
+        de itens fica com a unidade da linha que a encerra ou, se a unidade vem
+        antes do detalhamento, com a última vista antes da seção.
+        """
+        dados = []
+        dentro_detalhamento = False
+        unidade_secao = None
+        unidade_livre = None
+        primeira_unidade = None
+        sem_unidade = []
+
+        for linha in texto.split("\n"):
+            linha_original = linha.strip()
+
+            if self.inicio_secao.search(linha_original):
+                dentro_detalhamento = True
+                unidade_secao, unidade_livre = unidade_livre, None
+                continue
+
+            if self.padrao_unidade is not None:
+                achada = self.padrao_unidade.search(linha_original)
+                if achada:
+                    unidade = _normalizar_unidade(achada.group(1))
+                    primeira_unidade = primeira_unidade or unidade
+                    if sem_unidade:
+                        for linha_item in sem_unidade:
+                            linha_item["unidade"] = unidade
+                        sem_unidade = []
+                    elif not dentro_detalhamento:
+                        unidade_livre = unidade
+                    dentro_detalhamento = False
+                    continue
+
+            if dentro_detalhamento and self.fim_secao.search(linha_original):
+                dentro_detalhamento = False
+                continue
+
+            if not dentro_detalhamento:
+                continue
+
+            if len(linha_original) == 0 or linha_original.startswith("---") or linha_original.startswith("==="):
+                continue
+
+            if self.ignorar.search(linha_original):
+                continue
+
+            match = self.padrao_linha.search(linha_original)
+            if match:
+                if match.group(1):
+                    item = match.group(1).strip()
+                    valor_str = match.group(2)
+                else:
+                    item = match.group(3).strip()
+                    valor_str = match.group(4)
+
+                item = _PONTOS.sub('', item)
+                item = " ".join(item.split())
+
+                if _SO_NUMEROS.match(item) or len(item) > self.max_tamanho_item:
+                    continue
+                if len(item) < 3 or not _PALAVRA.search(item):
+                    continue
+
+                valor = _valor(valor_str)
+                registro = {"mes": ano_mes, "unidade": unidade_secao, "item": item, "valor": valor}
+                if unidade_secao is None:
+                    sem_unidade.append(registro)
+                dados.append(registro)
+
+        for registro in sem_unidade:
+            registro["unidade"] = primeira_unidade or ""
+        return dados
+
+    def total_declarado(self, texto: str):
+        """Soma dos totais impressos no documento (um por boleto), ou None se não houver."""
+        if self.padrao_total is None:
+            return None
+        totais = self.padrao_total.findall(texto)
+        if not totais:
+            return None
+        return round(sum(_valor(total) for total in totais), 2)
+
+    def mes_referencia(self, texto: str):
+        """YYYY_MM do primeiro vencimento impresso, ou None."""
+        if self.padrao_vencimento is None:
+            return None
+        achado = self.padrao_vencimento.search(texto)
+        if not achado:
+            return None
+        _, mes, ano = achado.groups()
+        return f"{ano}_{mes}"
+
+
+# Valor em reais, com ou sem separador de milhar (1.197,95 ou 1197,95)
+_VALOR = r"\d{1,3}(?:\.\d{3})+,\d{2}|\d+,\d{2}"
+_PONTOS = re.compile(r'\.+')
+_SO_NUMEROS = re.compile(r'^[\d\s/]+[A-Z]*[\d\s/]*$')
+_PALAVRA = re.compile(r'[a-zA-ZÀ-ÿ]{3,}')
+
+
+def _valor(texto: str) -> float:
+    return float(texto.replace(".", "").replace(",", "."))
+
+
+def _normalizar_unidade(texto: str) -> str:
+    return " ".join(texto.strip(" :-–").split())[:40]
+
+
+METTA = ModeloBoleto(
+    nome="metta",
+    remetentes=["mettacondominios"],
+    assunto="Boleto",
+    inicio_secao=["Detalhamento da Fatura"],
+    fim_contem=["SICOOB", "Não Receber", "Referente à Unidade"],
+    fim_regex=[r"^Endereço:", r"^(?=.*CNPJ).{51,}$"],
+    # Pontilhado não pode vir colado a um dígito: ali o ponto é separador de milhar do valor
+    padrao_linha=rf"(.+?)\s*(?<!\d)\.+\s*(?:R\$\s*)?({_VALOR})$|(.+?)\s+(?:R\$\s*)?({_VALOR})$",
+    ignorar=["Referente", "Unidade", "Rua", "CEP", "CNPJ", "Vencimento", "Total", "Boleto", "Detalhe:"],
+    padrao_unidade=r"Referente à Unidade\s*:?\s*(.+)$",
+    padrao_total=rf"^\s*Total[\s.:]*(?:R\$\s*)?({_VALOR})\s*$",
+    padrao_vencimento=r"Vencimento:?\s*(\d{2})/(\d{2})/(\d{4})",
+)
+
+MODELOS = {modelo.nome: modelo for modelo in [METTA]}
+MODELO_PADRAO = METTA.nome
+
+_POR_REMETENTE = {remetente: modelo for modelo in MODELOS.values() for remetente in modelo.remetentes}
+_DOMINIO = re.compile(r'@([\w.-]+)')
+
+
+def modelo_do_remetente(remetente: str):
+    """Modelo da administradora pelo cabeçalho From, ou None se não for de nenhuma conhecida."""
+    remetente = (remetente or "").lower()
+    encontrado = _DOMINIO.search(remetente)
+    if encontrado:
+        # Subdomínios (ex: mail.mettacondominios.com.br) também contam
+        for rotulo in encontrado.group(1).split("."):
+            modelo = _POR_REMETENTE.get(rotulo)
+            if modelo is not None:
+                return modelo
+    # Envio por serviço de terceiros: o nome da administradora só aparece no nome de exibição
+    return next((modelo for chave, modelo in _POR_REMETENTE.items() if chave in remetente), None)
+
+
+def remetentes_conhecidos() -> list:
+    return list(_POR_REMETENTE)
+
+
+def assuntos_conhecidos() -> list:
+    return sorted({modelo.assunto for modelo in MODELOS.values()})
@@ -0,0 +1,161 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from arquivo_pdf import DIRETORIO_ARQUIVO, gravar_atomico
+
+RESOLUCAO_OCR = 300
+IDIOMA_OCR = "por"
+# Um pool por máquina: None usa um processo por núcleo
+MAX_PROCESSOS_OCR = None
+# Texto reconhecido por página, endereçado pelo hash das imagens da página
+DIRETORIO_CACHE_OCR = os.path.join(DIRETORIO_ARQUIVO, "ocr")
+
+_pool = None
+_pool_lock = threading.Lock()
+_disponivel = None
+
+
+# ==========================
+# MOTOR (TESSERACT)
+# ==========================
+def disponivel() -> bool:
+    """
+    pytesseract instalado, o binário do Tesseract no PATH e o idioma
+    IDIOMA_OCR instalado nele; avisa uma vez se não.
+    """
+    global _disponivel
+    if _disponivel is None:
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            idiomas = pytesseract.get_languages(config="")
+        except Exception:
+            print("⚠️  OCR indisponível (instale pytesseract e o Tesseract): páginas digitalizadas ficam sem texto")
+            _disponivel = False
+            return _disponivel
+        _disponivel = IDIOMA_OCR in idiomas
+        if not _disponivel:
+            print(f"⚠️  OCR indisponível: o Tesseract não tem o idioma '{IDIOMA_OCR}' "
+                  f"(instalados: {', '.join(idiomas) or 'nenhum'}); páginas digitalizadas ficam sem texto")
+    return _disponivel
+
+
+def _reconhecer_png(png: bytes, idioma: str) -> str:
+    # Roda no pool de OCR (ou no trabalhador, ver _submeter): cada página é CPU pura do Tesseract
+    import pytesseract
+    from PIL import Image
+    return pytesseract.image_to_string(Image.open(io.BytesIO(png)), lang=idioma)
+
+
+class _Imediato:
+    """Mesma interface do futuro do pool, com o resultado já calculado (ou a exceção)."""
+
+    def __init__(self, funcao, *args):
+        try:
+            self._resultado, self._erro = funcao(*args), None
+        except Exception as e:
+            self._resultado, self._erro = None, e
+
+    def result(self):
+        if self._erro is not None:
+            raise self._erro
+        return self._resultado
+
+
+def _submeter(funcao, *args):
+    """
+    Processo principal: a página vai para o pool de OCR da máquina, criado
+    na primeira página digitalizada e reaproveitado depois. Dentro de um
+    trabalhador de outro pool (reprocessamento, importação em lote) o OCR
+    roda ali mesmo: esses pools já ocupam os núcleos, e um pool de OCR em
+    cada trabalhador multiplicaria os processos.
+    """
+    global _pool
+    if multiprocessing.parent_process() is not None:
+        return _Imediato(funcao, *args)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESSOS_OCR)
+    return _pool.submit(funcao, *args)
+
+
+# ==========================
+# CACHE POR PÁGINA
+# ==========================
+def chave_pagina(pagina) -> str:
+    """
+    Hash dos dados brutos das imagens da página (o conteúdo de uma página
+    digitalizada), sem renderizar nada. None se a página não tem imagem.
+    """
+    imagens = pagina.images
+    if not imagens:
+        return None
+    h = hashlib.sha256(f"{IDIOMA_OCR}:{pagina.width}x{pagina.height}".encode())
+    for imagem in imagens:
+        h.update(imagem["stream"].get_rawdata() or b"")
+    return h.hexdigest()
+
+
+def _caminho_cache(chave: str) -> str:
+    return os.path.join(DIRETORIO_CACHE_OCR, chave[:2], f"{chave}.txt")
+
+
+def texto_em_cache(chave: str) -> str:
+    try:
+        with open(_caminho_cache(chave), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _gravar_cache(chave: str, texto: str):
+    dados = texto.encode("utf-8")
+    gravar_atomico(_caminho_cache(chave), lambda f: f.write(dados))
+
+
+# ==========================
+# FILA DE PÁGINAS DE UM DOCUMENTO
+# ==========================
+class FilaOCR:
+    """
+    Junta as páginas sem texto de um PDF: as que já estão no cache saem
+    direto, as demais são renderizadas e reconhecidas em paralelo no pool.
+    """
+
+    def __init__(self):
+        self.textos = {}
+        self.pendentes = {}
+
+    def adicionar(self, indice: int, pagina):
+        """Deve ser chamado com a página ainda aberta (antes de flush_cache/close)."""
+        chave = chave_pagina(pagina)
+        if chave is None:
+            return
+        texto = texto_em_cache(chave)
+        if texto is not None:
+            self.textos[indice] = texto
+        elif disponivel():
+            png = io.BytesIO()
+            pagina.to_image(resolution=RESOLUCAO_OCR).original.save(png, format="PNG")
+            # Enviada já: o Tesseract desta página roda enquanto a próxima é renderizada
+            self.pendentes[indice] = (chave, _submeter(_reconhecer_png, png.getvalue(), IDIOMA_OCR))
+
+    def resultados(self) -> dict:
+        """
+        {índice da página: texto reconhecido}. Uma página que o Tesseract não
+        consegue ler fica vazia (e fora do cache) sem derrubar o documento.
+        """
+        for indice, (chave, futuro) in self.pendentes.items():
+            try:
+                texto = futuro.result()
+            except Exception as e:
+                print(f"  ⚠️  OCR falhou na página {indice + 1}: {e}")
+                continue
+            _gravar_cache(chave, texto)
+            self.textos[indice] = texto
+        self.pendentes = {}
+        return self.textos
@@ -0,0 +1,84 @@
+import pandas as pd
+
+# Sufixo de parcela no fim do nome (ex: "Pintura Fachada 2/6", "Seguro 04/12")
+PADRAO_PARCELA = r'^(?P<base>.*?)\s*(?P<parcela>\d+)/(?P<total>\d+)\s*$'
+
+COLUNAS_PARCELAS = [
+    "unidade", "item_id", "item", "inicio", "total_parcelas", "ultima_parcela", "ultimo_mes",
+    "valor_parcela", "restantes", "saldo_projetado", "status",
+]
+
+
+# ==========================
+# ARITMÉTICA DE MESES (YYYY_MM)
+# ==========================
+def indice_mes(meses: pd.Series) -> pd.Series:
+    partes = meses.astype(str).str.replace("-", "_").str.split("_", expand=True)
+    return partes[0].astype(int) * 12 + partes[1].astype(int) - 1
+
+
+def mes_do_indice(indices) -> pd.Series:
+    indices = pd.Series(indices, dtype="int64")
+    return (indices // 12).astype(str) + "_" + (indices % 12 + 1).astype(str).str.zfill(2)
+
+
+# ==========================
+# SÉRIES DE PARCELAS
+# ==========================
+def marcar_parcelas(df: pd.DataFrame) -> pd.DataFrame:
+    """Extrai n/m de todos os itens em uma única passada vetorizada."""
+    partes = df["item"].str.extract(PADRAO_PARCELA)
+    df = df.copy()
+    df["parcela"] = pd.to_numeric(partes["parcela"]).astype("Int64")
+    df["total_parcelas"] = pd.to_numeric(partes["total"]).astype("Int64")
+    return df
+
+
+def detectar_parcelas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrupa as linhas "X n/m" em séries. Uma série é identificada pelo item
+    canônico, pelo número de parcelas e pelo mês da primeira parcela, para que
+    duas compras parceladas do mesmo item não se misturem. Cada unidade tem
+    as suas próprias séries.
+    """
+    parcelados = df[df["parcela"].notna() & (df["total_parcelas"] > 0)]
+    if parcelados.empty:
+        return pd.DataFrame(columns=COLUNAS_PARCELAS)
+
+    unidades = parcelados["unidade"].astype(str) if "unidade" in parcelados.columns else ""
+    parcelados = parcelados.assign(indice=indice_mes(parcelados["mes"]), unidade=unidades)
+    parcelados["inicio"] = parcelados["indice"] - (parcelados["parcela"].astype("int64") - 1)
+    ultimo_indice = indice_mes(df["mes"]).max()
+
+    series = (
+        parcelados
+        .sort_values(["indice", "parcela"])
+        .groupby(["unidade", "item_id", "total_parcelas", "inicio"], as_index=False)
+        .agg(
+            item=("item_canonico", "last"),
+            ultima_parcela=("parcela", "last"),
+            ultimo_indice=("indice", "last"),
+            valor_parcela=("valor", "last"),
+        )
+    )
+    series["restantes"] = (series["total_parcelas"] - series["ultima_parcela"]).clip(lower=0).astype("int64")
+    series["saldo_projetado"] = series["restantes"] * series["valor_parcela"]
+    series["status"] = "ativa"
+    series.loc[series["restantes"] == 0, "status"] = "quitada"
+    series.loc[(series["restantes"] > 0) & (series["ultimo_indice"] < ultimo_indice), "status"] = "interrompida"
+    series["ultimo_mes"] = mes_do_indice(series["ultimo_indice"]).to_numpy()
+    series["inicio"] = mes_do_indice(series["inicio"]).to_numpy()
+    series["total_parcelas"] = series["total_parcelas"].astype("int64")
+    series["ultima_parcela"] = series["ultima_parcela"].astype("int64")
+    return series[COLUNAS_PARCELAS].sort_values(["status", "item", "unidade"], ignore_index=True)
+
+
+def cronograma(series: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por parcela ainda a vencer das séries ativas (mes, item_id, item, valor)."""
+    ativas = series[series["status"] == "ativa"]
+    if ativas.empty:
+        return pd.DataFrame(columns=["mes", "item_id", "item", "valor"])
+    futuras = ativas.loc[ativas.index.repeat(ativas["restantes"])].copy()
+    futuras["passo"] = futuras.groupby(level=0).cumcount() + 1
+    futuras["mes"] = mes_do_indice(indice_mes(futuras["ultimo_mes"]) + futuras["passo"]).to_numpy()
+    return futuras.rename(columns={"valor_parcela": "valor"})[["mes", "item_id", "item", "valor"]].reset_index(drop=True)
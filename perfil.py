@@ -0,0 +1,202 @@
+import hmac
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from memoria import rss_atual_mb
+
+# Uma linha JSON por execução perfilada do dashboard, para análise offline
+ARQUIVO_LOG = "perfil_dashboard.log"
+# Dumps do cProfile (abrir com pstats ou snakeviz)
+DIRETORIO_PROFILES = "perfis"
+# Funções mostradas no resumo do cProfile
+TOP_FUNCOES = 25
+
+
+# ==========================
+# PERFIL DE UMA EXECUÇÃO
+# ==========================
+class PerfilExecucao:
+    """
+    Cronometra as seções de uma execução do script. Cada marcar(nome) fecha a
+    seção anterior e abre a próxima, o que encaixa no fluxo linear do
+    dashboard sem reindentar blocos. Desativado, marcar() não faz nada.
+    """
+
+    def __init__(self, ativo: bool = False, cprofile: bool = False, memoria: bool = False):
+        self.ativo = ativo
+        self.secoes = []
+        self._atual = None
+        self._profiler = None
+        self._tracemalloc = False
+        if not ativo:
+            return
+        if memoria:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc = True
+        if cprofile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Só um profiler por vez no processo (Python 3.12+): outra sessão já está perfilando
+                self._profiler = None
+        self.inicio = time.perf_counter()
+
+    def _memoria_mb(self) -> float:
+        if self._tracemalloc:
+            import tracemalloc
+            return tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+        return rss_atual_mb()
+
+    def _fechar(self):
+        if self._atual is None:
+            return
+        nome, inicio, memoria = self._atual
+        agora = time.perf_counter()
+        self.secoes.append({
+            "secao": nome,
+            "inicio_ms": (inicio - self.inicio) * 1000,
+            "duracao_ms": (agora - inicio) * 1000,
+            "memoria_mb": self._memoria_mb() - memoria,
+        })
+        self._atual = None
+
+    def marcar(self, nome: str):
+        if not self.ativo:
+            return
+        self._fechar()
+        self._atual = (nome, time.perf_counter(), self._memoria_mb())
+
+    def finalizar(self, contexto: dict = None) -> dict:
+        """Fecha a última seção, grava a linha de log e devolve o registro da execução."""
+        if not self.ativo:
+            return None
+        self._fechar()
+        registro = {
+            "quando": datetime.now().isoformat(timespec="seconds"),
+            "total_ms": (time.perf_counter() - self.inicio) * 1000,
+            "medida_memoria": "tracemalloc" if self._tracemalloc else "rss",
+            "secoes": self.secoes,
+            **(contexto or {}),
+        }
+        if self._profiler is not None:
+            registro["cprofile"] = self._salvar_cprofile()
+        if self._tracemalloc:
+            import tracemalloc
+            registro["pico_tracemalloc_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        self.encerrar()
+        with open(ARQUIVO_LOG, "a") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        return registro
+
+    def encerrar(self):
+        """
+        Desliga o cProfile e o tracemalloc, que valem para o processo inteiro.
+        Chamado na saída de perfil_da_execucao: st.stop() e st.rerun()
+        interrompem o script antes de finalizar(). Pode ser chamado mais de uma vez.
+        """
+        self.ativo = False
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self._tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+            self._tracemalloc = False
+
+    def _salvar_cprofile(self) -> dict:
+        import io
+        import pstats
+        self._profiler.disable()
+        os.makedirs(DIRETORIO_PROFILES, exist_ok=True)
+        caminho = os.path.join(DIRETORIO_PROFILES, f"dashboard_{datetime.now():%Y%m%d_%H%M%S_%f}.prof")
+        self._profiler.dump_stats(caminho)
+        resumo = io.StringIO()
+        pstats.Stats(self._profiler, stream=resumo).sort_stats("cumulative").print_stats(TOP_FUNCOES)
+        return {"arquivo": caminho, "resumo": resumo.getvalue()}
+
+
+# ==========================
+# ATIVAÇÃO NO STREAMLIT
+# ==========================
+def _segredo(st, nome: str) -> str:
+    try:
+        return str(st.secrets.get(nome, ""))
+    except Exception:
+        return ""
+
+
+def opcoes_perfil(st) -> set:
+    """
+    Lê ?perfil=... da URL ou o segredo PERFIL. "1" liga só os tempos;
+    "cprofile" e "memoria" (separados por vírgula) ligam os extras. O perfil
+    afeta o processo inteiro, então pela URL ele só vale junto com
+    ?perfil_chave= igual ao segredo PERFIL_CHAVE (sem o segredo, nunca vale).
+    """
+    valor = ""
+    chave = _segredo(st, "PERFIL_CHAVE")
+    if chave and hmac.compare_digest(st.query_params.get("perfil_chave", "").encode(), chave.encode()):
+        valor = st.query_params.get("perfil", "")
+    if not valor:
+        valor = _segredo(st, "PERFIL")
+    opcoes = {opcao.strip().lower() for opcao in valor.split(",") if opcao.strip()}
+    return opcoes - {"0", "false"}
+
+
+def iniciar_perfil(st) -> PerfilExecucao:
+    """
+    Pode começar antes do login, para medir a autenticação: sem a
+    PERFIL_CHAVE na URL, um visitante anônimo não liga o perfil.
+    """
+    opcoes = opcoes_perfil(st)
+    return PerfilExecucao(
+        ativo=bool(opcoes),
+        cprofile="cprofile" in opcoes,
+        memoria="memoria" in opcoes,
+    )
+
+
+@contextmanager
+def perfil_da_execucao(st):
+    """Perfil de uma execução do script, encerrado na saída do bloco por qualquer caminho."""
+    perfil = iniciar_perfil(st)
+    try:
+        yield perfil
+    finally:
+        perfil.encerrar()
+
+
+def exibir_perfil(st, registro: dict):
+    """Cascata das seções (início, duração e variação de memória) num expander da sidebar."""
+    if not registro:
+        return
+    import pandas as pd
+    with st.sidebar.expander(f"⏱️ Perfil da execução ({registro['total_ms']:.0f} ms)"):
+        total = max(registro["total_ms"], 1)
+        linhas = []
+        for secao in registro["secoes"]:
+            deslocamento = secao["inicio_ms"] / total * 100
+            largura = max(secao["duracao_ms"] / total * 100, 0.5)
+            linhas.append(
+                f'<div style="font-size:0.75rem">{secao["secao"]} — '
+                f'{secao["duracao_ms"]:.1f} ms, {secao["memoria_mb"]:+.1f} MB</div>'
+                f'<div style="background:#333;height:6px;margin-bottom:4px">'
+                f'<div style="margin-left:{deslocamento:.1f}%;width:{largura:.1f}%;'
+                f'height:6px;background:#ff7f0e"></div></div>'
+            )
+        st.markdown("".join(linhas), unsafe_allow_html=True)
+        st.dataframe(
+            pd.DataFrame(registro["secoes"]).round(2),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.caption(f"Memória medida por {registro['medida_memoria']}; log em {ARQUIVO_LOG}")
+        if "cprofile" in registro:
+            st.caption(f"cProfile: {registro['cprofile']['arquivo']}")
+            st.code(registro["cprofile"]["resumo"], language=None)
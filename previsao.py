@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from parcelas import cronograma, detectar_parcelas, indice_mes, mes_do_indice
+
+# Meses mais recentes usados para ajustar a tendência de cada item
+JANELA_TENDENCIA = 12
+# Histórico mínimo (em meses) para estimar a sazonalidade de água/energia
+MIN_MESES_SAZONAL = 24
+# Itens com padrão sazonal conhecido (nomes canônicos)
+ITENS_SAZONAIS = ["Consumo Água", "Energia Elétrica"]
+
+ID_VARIAVEIS = -1
+NOME_VARIAVEIS = "Outros variáveis (média)"
+
+
+# ==========================
+# MATRIZ ITEM × MÊS
+# ==========================
+def _matriz(df: pd.DataFrame):
+    indices = indice_mes(df["mes"])
+    primeiro, ultimo = indices.min(), indices.max()
+    tabela = (
+        df.assign(indice=indices)
+        .pivot_table(index="item_id", columns="indice", values="valor", aggfunc="sum")
+        .reindex(columns=range(primeiro, ultimo + 1))
+    )
+    return tabela.to_numpy(dtype=float), tabela.index.to_numpy(), np.arange(primeiro, ultimo + 1)
+
+
+def _ajustar_tendencia(Y: np.ndarray, t: np.ndarray):
+    """Mínimos quadrados de uma reta por linha de Y, ignorando NaN, tudo de uma vez."""
+    M = ~np.isnan(Y)
+    Y0 = np.where(M, Y, 0.0)
+    n = M.sum(axis=1)
+    n_seguro = np.maximum(n, 1)
+    t_medio = (M * t).sum(axis=1) / n_seguro
+    y_medio = Y0.sum(axis=1) / n_seguro
+    dt = np.where(M, t - t_medio[:, None], 0.0)
+    variancia = (dt ** 2).sum(axis=1)
+    inclinacao = np.where(variancia > 0, (dt * (Y0 - y_medio[:, None])).sum(axis=1) / np.where(variancia > 0, variancia, 1), 0.0)
+    intercepto = y_medio - inclinacao * t_medio
+    return intercepto, inclinacao
+
+
+def _sazonalidade(Y: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Desvio médio de cada mês do calendário em relação à média móvel centrada
+    de 12 meses (decomposição clássica). Retorna linhas × 12.
+    """
+    media_movel = (
+        pd.DataFrame(Y.T).rolling(12, min_periods=12).mean()
+        .rolling(2, min_periods=2).mean().shift(-6)
+        .to_numpy().T
+    )
+    residuo = Y - media_movel
+    M = ~np.isnan(residuo)
+    calendario = np.eye(12)[t % 12]
+    soma = np.where(M, residuo, 0.0) @ calendario
+    contagem = M.astype(float) @ calendario
+    efeito = np.divide(soma, contagem, out=np.zeros_like(soma), where=contagem > 0)
+    return efeito - efeito.mean(axis=1, keepdims=True)
+
+
+# ==========================
+# PREVISÃO
+# ==========================
+def prever(df: pd.DataFrame, parcelas: pd.DataFrame = None, meses_a_frente: int = 6) -> pd.DataFrame:
+    """
+    Prevê os próximos meses por item combinando três componentes:
+    tendência linear dos itens fixos (com sazonalidade para água/energia),
+    o cronograma conhecido das parcelas e a média recente dos demais variáveis.
+    Retorna (mes, item_id, item, valor, componente).
+    """
+    colunas = ["mes", "item_id", "item", "valor", "componente"]
+    if df.empty or meses_a_frente <= 0:
+        return pd.DataFrame(columns=colunas)
+    if parcelas is None:
+        parcelas = detectar_parcelas(df)
+
+    ultimo = indice_mes(df["mes"]).max()
+    horizonte = np.arange(ultimo + 1, ultimo + 1 + meses_a_frente)
+    meses_futuros = mes_do_indice(horizonte).tolist()
+    partes = []
+
+    # Itens fixos: tendência na janela recente + efeito sazonal
+    fixos = df[df["fixo"].astype(bool)]
+    if not fixos.empty:
+        Y, ids, t = _matriz(fixos)
+        nomes = fixos.drop_duplicates("item_id").set_index("item_id")["item_canonico"]
+        sazonais = np.isin(nomes.reindex(ids).to_numpy(), ITENS_SAZONAIS)
+        efeito = np.zeros((len(ids), 12))
+        if sazonais.any() and len(t) >= MIN_MESES_SAZONAL:
+            efeito[sazonais] = _sazonalidade(Y[sazonais], t)
+
+        # A tendência é ajustada sobre a série dessazonalizada
+        janela = t >= t[-1] - JANELA_TENDENCIA + 1
+        intercepto, inclinacao = _ajustar_tendencia((Y - efeito[:, t % 12])[:, janela], t[janela])
+        previsto = intercepto[:, None] + inclinacao[:, None] * horizonte + efeito[:, horizonte % 12]
+
+        # Item fixo que sumiu da janela recente não é projetado
+        ativos = ~np.isnan(Y[:, janela]).all(axis=1)
+        previsto = np.clip(previsto[ativos], 0, None)
+        partes.append(pd.DataFrame({
+            "mes": np.tile(meses_futuros, ativos.sum()),
+            "item_id": np.repeat(ids[ativos], meses_a_frente),
+            "item": np.repeat(nomes.reindex(ids[ativos]).to_numpy(), meses_a_frente),
+            "valor": previsto.ravel(),
+            "componente": np.where(np.repeat(sazonais[ativos], meses_a_frente), "sazonal", "tendencia"),
+        }))
+
+    # Parcelas: valores já conhecidos
+    futuras = cronograma(parcelas)
+    futuras = futuras[futuras["mes"].isin(meses_futuros)]
+    if not futuras.empty:
+        partes.append(futuras.assign(componente="parcelas"))
+
+    # Demais variáveis (sem parcela): média mensal da janela recente
+    variaveis = df[~df["fixo"].astype(bool) & df["parcela"].isna()]
+    if not variaveis.empty:
+        indices = indice_mes(variaveis["mes"])
+        recentes = variaveis[indices > ultimo - JANELA_TENDENCIA]
+        media = recentes["valor"].sum() / min(JANELA_TENDENCIA, ultimo - indice_mes(df["mes"]).min() + 1)
+        partes.append(pd.DataFrame({
+            "mes": meses_futuros,
+            "item_id": ID_VARIAVEIS,
+            "item": NOME_VARIAVEIS,
+            "valor": media,
+            "componente": "media_variaveis",
+        }))
+
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    return pd.concat(partes, ignore_index=True)[colunas]
+
+
+def total_previsto(previsao: pd.DataFrame) -> pd.DataFrame:
+    return previsao.groupby("mes", as_index=False)["valor"].sum()
+
+
+# ==========================
+# BACKTEST
+# ==========================
+def backtest(df: pd.DataFrame, meses_teste: int = 3) -> pd.DataFrame:
+    """
+    Ajusta o modelo sem os últimos meses_teste meses e compara o total previsto
+    com o total real de cada mês retido. Retorna (mes, real, previsto, erro_pct).
+    """
+    meses = sorted(df["mes"].unique())
+    if len(meses) <= meses_teste:
+        return pd.DataFrame(columns=["mes", "real", "previsto", "erro_pct"])
+    corte = meses[-meses_teste]
+    treino = df[df["mes"] < corte]
+    teste = df[df["mes"] >= corte]
+
+    previsto = total_previsto(prever(treino, meses_a_frente=meses_teste)).rename(columns={"valor": "previsto"})
+    real = teste.groupby("mes", as_index=False)["valor"].sum().rename(columns={"valor": "real"})
+    resultado = real.merge(previsto, on="mes", how="left").fillna({"previsto": 0.0})
+    resultado["erro_pct"] = (resultado["previsto"] - resultado["real"]) / resultado["real"] * 100
+    return resultado
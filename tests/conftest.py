@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def diretorio_temporario(tmp_path, monkeypatch):
+    """Banco, arquivo de PDFs e estado relativos ao diretório atual vão para um diretório vazio."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pandas as pd
+
+import agendador
+import armazenamento
+import extrair_dados
+import ingestao
+
+
+def _item(mes: str, valor: float) -> dict:
+    return {"mes": mes, "unidade": "101", "item": "Taxa Condominial", "valor": valor, "documento": f"doc-{mes}"}
+
+
+def _sincronizar(monkeypatch, novos: list):
+    """Roda sincronizar_conta com o Gmail e a ingestão falsos; devolve (buscas, dados ingeridos)."""
+    buscas, ingeridos = [], []
+
+    def buscar_e_extrair(gmail_token=None, inicio=None, fim=None, conta="local"):
+        buscas.append({"gmail_token": gmail_token, "inicio": inicio, "fim": fim, "conta": conta})
+        return novos
+
+    monkeypatch.setattr(extrair_dados, "buscar_e_extrair", buscar_e_extrair)
+    monkeypatch.setattr(ingestao, "processar_ingestao", lambda conta, dados: ingeridos.append(dados))
+    agendador.sincronizar_conta("ana@exemplo.com", "token-json")
+    return buscas, ingeridos[0]
+
+
+def test_primeira_sincronizacao_busca_todo_o_historico(diretorio_temporario, monkeypatch):
+    buscas, dados = _sincronizar(monkeypatch, [_item("2025_01", 500.0)])
+    assert buscas == [{"gmail_token": "token-json", "inicio": None, "fim": None, "conta": "ana@exemplo.com"}]
+    assert dados == [_item("2025_01", 500.0)]
+
+
+def test_sincronizacao_seguinte_parte_do_ultimo_mes_gravado(diretorio_temporario, monkeypatch):
+    armazenamento.salvar_tabela("ana@exemplo.com", "itens", pd.DataFrame([_item("2025_01", 500.0), _item("2025_03", 510.0)]))
+    # Outra conta com meses mais recentes não muda a janela desta
+    armazenamento.salvar_tabela("bia@exemplo.com", "itens", pd.DataFrame([_item("2025_06", 1.0)]))
+
+    buscas, dados = _sincronizar(monkeypatch, [_item("2025_03", 520.0), _item("2025_04", 530.0)])
+
+    assert [b["inicio"] for b in buscas] == [date(2025, 3, 1)]
+    # O último mês gravado é refeito com o que veio do Gmail; os anteriores ficam como estavam
+    assert sorted((d["mes"], d["valor"]) for d in dados) == [("2025_01", 500.0), ("2025_03", 520.0), ("2025_04", 530.0)]
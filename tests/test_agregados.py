@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import pytest
+
+import analise
+from agregados import meses_comparados
+
+MESES = ["2025_01", "2025_02", "2025_03"]
+
+
+def test_padrao_e_o_ultimo_contra_o_anterior():
+    assert meses_comparados(MESES) == ("2025_03", "2025_02")
+    assert meses_comparados(MESES, "2025_02") == ("2025_02", "2025_01")
+    assert meses_comparados(MESES, "2025_03", "2025_01") == ("2025_03", "2025_01")
+
+
+def test_primeiro_mes_nao_volta_para_o_ultimo():
+    with pytest.raises(ValueError, match="anterior a 2025_01"):
+        meses_comparados(MESES, "2025_01")
+
+
+@pytest.mark.parametrize("atual, anterior", [("2024_12", None), ("2025_02", "2024_12")])
+def test_mes_desconhecido(atual, anterior):
+    with pytest.raises(ValueError, match="2024_12 sem dados"):
+        meses_comparados(MESES, atual, anterior)
+
+
+def test_analise_sai_com_mensagem(capsys):
+    args = SimpleNamespace(atual="2025_13", anterior=None)
+    with pytest.raises(SystemExit) as saida:
+        analise._meses_comparados(args, MESES)
+    assert saida.value.code == 1
+    assert "2025_13 sem dados" in capsys.readouterr().out
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from anomalias import detectar_anomalias
+
+
+def _boletos(valores_101: list, valores_102: list, meses_102: list = None) -> pd.DataFrame:
+    linhas = []
+    meses = [f"2025_{i:02d}" for i in range(1, len(valores_101) + 1)]
+    for mes, valor in zip(meses, valores_101):
+        linhas.append({"mes": mes, "unidade": "101", "item_canonico": "Energia Elétrica", "item": "Energia Elétrica",
+                       "fixo": True, "valor": valor})
+    for mes, valor in zip(meses_102 or meses, valores_102):
+        linhas.append({"mes": mes, "unidade": "102", "item_canonico": "Energia Elétrica", "item": "Energia Elétrica",
+                       "fixo": True, "valor": valor})
+    return pd.DataFrame(linhas)
+
+
+def test_desvio_de_uma_unidade_nao_some_na_soma():
+    # 101 dobra no último mês e 102 cai na mesma medida: o total do prédio não muda
+    anomalias = detectar_anomalias(_boletos([100, 101, 99, 100, 200], [300, 301, 299, 300, 200]))
+    desvios = anomalias[anomalias["tipo"] == "desvio"]
+    assert sorted(zip(desvios["mes"], desvios["unidade"], desvios["descricao"])) == [
+        ("2025_05", "101", "Acima do histórico"),
+        ("2025_05", "102", "Abaixo do histórico"),
+    ]
+
+
+def test_unidade_que_entra_depois_nao_gera_itens_novos():
+    anomalias = detectar_anomalias(_boletos([100, 100, 100], [90, 90], meses_102=["2025_02", "2025_03"]))
+    assert anomalias[anomalias["tipo"] == "novo"].empty
+
+
+def test_mes_sem_boleto_da_unidade_nao_e_fixo_ausente():
+    anomalias = detectar_anomalias(_boletos([100, 100, 100], [90, 90], meses_102=["2025_01", "2025_03"]))
+    assert anomalias[anomalias["tipo"] == "fixo_ausente"].empty
@@ -0,0 +1,64 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pandas as pd
+import pytest
+
+import api
+import armazenamento
+
+
+@pytest.fixture
+def servidor(diretorio_temporario):
+    cubo = pd.DataFrame({
+        "mes": ["2025_01", "2025_02", "2025_03"],
+        "unidade": "101",
+        "item_id": 1,
+        "item_canonico": "Taxa Fundo de Reserva",
+        "fixo": True,
+        "valor": [100.0, 110.0, 120.0],
+    })
+    for conta in ("ana@exemplo.com", "bia@exemplo.com"):
+        armazenamento.salvar_tabela(conta, "cubo", cubo)
+        armazenamento.registrar_versao(conta, "v1")
+    api._cache.clear()
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), api.Handler)
+    threading.Thread(target=servidor.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _get(url: str, token: str = None):
+    requisicao = Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    try:
+        with urlopen(requisicao) as resposta:
+            return resposta.status, json.load(resposta)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_token_obrigatorio_e_restrito_a_conta(servidor):
+    token = api.criar_token("ana@exemplo.com")
+    assert _get(f"{servidor}/api/meses")[0] == 401
+    assert _get(f"{servidor}/api/meses", "outro")[0] == 401
+    assert _get(f"{servidor}/api/meses?conta=bia@exemplo.com", token)[0] == 403
+    status, meses = _get(f"{servidor}/api/meses", token)
+    assert status == 200 and meses
+
+
+@pytest.mark.parametrize("consulta", ["atual=2025_01", "atual=2024_12", "atual=2025_03&anterior=2030_01"])
+def test_comparacao_com_mes_invalido_e_400(servidor, consulta):
+    token = api.criar_token("ana@exemplo.com")
+    status, corpo = _get(f"{servidor}/api/comparacao?{consulta}", token)
+    assert status == 400 and corpo["erro"]
+
+
+def test_comparacao_usa_o_mes_anterior(servidor):
+    token = api.criar_token("ana@exemplo.com")
+    status, linhas = _get(f"{servidor}/api/comparacao?atual=2025_02", token)
+    assert status == 200
+    assert linhas[0]["valor_atual"] == 110.0 and linhas[0]["valor_anterior"] == 100.0
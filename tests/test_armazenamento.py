@@ -0,0 +1,91 @@
+import threading
+
+import pandas as pd
+
+import armazenamento
+
+
+def _itens(mes: str, valores: list) -> pd.DataFrame:
+    return pd.DataFrame([{"mes": mes, "unidade": "101", "item": f"Item {i}", "valor": v} for i, v in enumerate(valores)])
+
+
+def test_salvar_substitui_so_as_linhas_da_conta(diretorio_temporario):
+    armazenamento.salvar_tabela("ana@exemplo.com", "itens", _itens("2025_01", [1.0, 2.0]))
+    armazenamento.salvar_tabela("bia@exemplo.com", "itens", _itens("2025_01", [3.0]))
+    armazenamento.salvar_tabela("ana@exemplo.com", "itens", _itens("2025_02", [4.0]))
+
+    ana = armazenamento.carregar_tabela("ana@exemplo.com", "itens")
+    assert ana.to_dict("records") == [{"mes": "2025_02", "unidade": "101", "item": "Item 0", "valor": 4.0}]
+    assert list(armazenamento.carregar_tabela("bia@exemplo.com", "itens")["valor"]) == [3.0]
+
+
+def test_carregar_filtra_colunas_e_meses(diretorio_temporario):
+    df = pd.concat([_itens("2025_01", [1.0]), _itens("2025_02", [2.0]), _itens("2025_03", [3.0])])
+    armazenamento.salvar_tabela("ana@exemplo.com", "itens", df)
+
+    lidos = armazenamento.carregar_tabela("ana@exemplo.com", "itens", ["mes", "valor", "inexistente"],
+                                          ["2025_01", "2025_03"])
+    assert list(lidos.columns) == ["mes", "valor"]
+    assert lidos.to_dict("records") == [{"mes": "2025_01", "valor": 1.0}, {"mes": "2025_03", "valor": 3.0}]
+    assert armazenamento.meses_disponiveis("ana@exemplo.com") == ["2025_01", "2025_02", "2025_03"]
+
+
+def test_tabela_ausente_volta_vazia(diretorio_temporario):
+    assert armazenamento.carregar_tabela("ana@exemplo.com", "anomalias", ["mes", "tipo"]).columns.tolist() == ["mes", "tipo"]
+    assert armazenamento.meses_disponiveis("ana@exemplo.com") == []
+    assert armazenamento.versao_atual("ana@exemplo.com") == (None, None)
+
+
+def test_coluna_nova_entra_na_tabela_existente(diretorio_temporario):
+    armazenamento.salvar_tabela("ana@exemplo.com", "itens", _itens("2025_01", [1.0]))
+    # Versão nova grava uma coluna que a tabela antiga não tinha
+    armazenamento.salvar_tabela("bia@exemplo.com", "itens", _itens("2025_01", [2.0]).assign(documento="abc"))
+
+    assert armazenamento.carregar_tabela("bia@exemplo.com", "itens", ["valor", "documento"]).to_dict("records") == [
+        {"valor": 2.0, "documento": "abc"}
+    ]
+    assert armazenamento.carregar_tabela("ana@exemplo.com", "itens", ["documento"])["documento"].isna().all()
+
+
+def test_substituir_linhas_troca_so_as_chaves_da_conta(diretorio_temporario):
+    def documento(doc: str, status: str) -> pd.DataFrame:
+        return pd.DataFrame([{"documento": doc, "status": status}])
+
+    armazenamento.substituir_linhas("ana@exemplo.com", "documentos", documento("d1", "divergente"), "documento")
+    armazenamento.substituir_linhas("ana@exemplo.com", "documentos", documento("d2", "confere"), "documento")
+    armazenamento.substituir_linhas("bia@exemplo.com", "documentos", documento("d1", "divergente"), "documento")
+    armazenamento.substituir_linhas("ana@exemplo.com", "documentos", documento("d1", "confere"), "documento")
+
+    ana = armazenamento.carregar_tabela("ana@exemplo.com", "documentos").sort_values("documento")
+    assert ana.to_dict("records") == [{"documento": "d1", "status": "confere"}, {"documento": "d2", "status": "confere"}]
+    assert list(armazenamento.carregar_tabela("bia@exemplo.com", "documentos")["status"]) == ["divergente"]
+
+
+def test_versao_por_conta(diretorio_temporario):
+    df = _itens("2025_01", [1.0])
+    versao = armazenamento.versao_dados(df)
+    assert versao == armazenamento.versao_dados(df.copy())
+    assert versao != armazenamento.versao_dados(_itens("2025_01", [1.5]))
+
+    armazenamento.registrar_versao("ana@exemplo.com", versao)
+    assert armazenamento.versao_atual("ana@exemplo.com")[0] == versao
+    assert armazenamento.versao_atual("bia@exemplo.com") == (None, None)
+
+
+def test_contas_gravando_juntas_num_banco_novo(diretorio_temporario):
+    erros = []
+
+    def gravar(conta):
+        try:
+            armazenamento.salvar_tabela(conta, "anomalias", pd.DataFrame([{"mes": "2025_01", "tipo": "novo"}]))
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar, args=(f"conta{i}@exemplo.com",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert erros == []
+    assert all(len(armazenamento.carregar_tabela(f"conta{i}@exemplo.com", "anomalias")) == 1 for i in range(8))
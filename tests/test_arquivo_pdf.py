@@ -0,0 +1,86 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import arquivo_pdf
+from conciliacao import CONFERE, carregar_documentos, conciliar
+
+
+def _arquivar(conteudo: bytes, mensagem_id: str, ano_mes: str, conta: str) -> str:
+    return arquivo_pdf.arquivar(conteudo, mensagem_id, "boleto.pdf", "2024-03-05", ano_mes, "", conta)
+
+
+def test_manifesto_separa_as_contas(diretorio_temporario):
+    h1 = _arquivar(b"%PDF-a", "m1", "2024_03", "ana@exemplo.com")
+    h2 = _arquivar(b"%PDF-b", "m2", "2024_03", "bia@exemplo.com")
+    # O mesmo PDF recebido pelas duas contas ocupa um objeto, mas tem duas entradas
+    _arquivar(b"%PDF-a", "m3", "2024_03", "bia@exemplo.com")
+
+    assert {e["hash"] for e in arquivo_pdf.entradas_da_conta("ana@exemplo.com")} == {h1}
+    assert {e["mensagem_id"] for e in arquivo_pdf.entradas_da_conta("bia@exemplo.com")} == {"m2", "m3"}
+    objetos = [n for _, _, nomes in os.walk(os.path.join(arquivo_pdf.DIRETORIO_ARQUIVO, "objetos")) for n in nomes]
+    assert sorted(objetos) == sorted({f"{h1}.pdf", f"{h2}.pdf"})
+
+
+def test_manifesto_json_antigo_e_importado_para_o_banco(diretorio_temporario):
+    hash_pdf = arquivo_pdf.guardar_objeto(b"%PDF-antigo")
+    entrada = {"mensagem_id": "m1", "arquivo": "boleto.pdf", "data": "2024-01-05", "ano_mes": "2024_01",
+               "remetente": "", "hash": hash_pdf, "tamanho": 11}
+    # Entrada de antes de o manifesto guardar a conta, e outra de depois
+    with open(arquivo_pdf.ARQUIVO_MANIFESTO, "w") as f:
+        json.dump({"m1/boleto.pdf": entrada,
+                   "ana@exemplo.com/m2/boleto.pdf": {**entrada, "conta": "ana@exemplo.com", "mensagem_id": "m2"}}, f)
+
+    assert [e["hash"] for e in arquivo_pdf.entradas_da_conta("local")] == [hash_pdf]
+    assert [e["mensagem_id"] for e in arquivo_pdf.entradas_da_conta("ana@exemplo.com")] == ["m2"]
+    assert not os.path.exists(arquivo_pdf.ARQUIVO_MANIFESTO)
+
+    # Rearquivar a mesma mensagem não deixa a entrada antiga duplicada
+    _arquivar(b"%PDF-antigo", "m1", "2024_01", "local")
+    assert sorted(arquivo_pdf.carregar_manifesto()) == ["ana@exemplo.com/m2/boleto.pdf", "local/m1/boleto.pdf"]
+
+
+def test_registrar_entrada_concorrente_nao_perde_entradas(diretorio_temporario):
+    hash_pdf = arquivo_pdf.guardar_objeto(b"%PDF-a")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(
+            lambda i: arquivo_pdf.registrar_entrada(hash_pdf, f"m{i}", "boleto.pdf", "2024-03-05", "2024_03", "",
+                                                    "ana@exemplo.com"),
+            range(40),
+        ))
+    assert len(arquivo_pdf.entradas_da_conta("ana@exemplo.com")) == 40
+
+
+def test_reprocessar_so_le_os_pdfs_da_conta(diretorio_temporario, monkeypatch):
+    h_ana = _arquivar(b"%PDF-ana", "m1", "2024_03", "ana@exemplo.com")
+    _arquivar(b"%PDF-bia", "m2", "2024_03", "bia@exemplo.com")
+
+    lidos = []
+
+    def reprocessar_documento(hash_pdf, ano_mes, modelo, preciso):
+        lidos.append(hash_pdf)
+        itens = [{"mes": ano_mes, "item": "Taxa", "valor": 1.0, "documento": hash_pdf}]
+        return hash_pdf, itens, conciliar(itens, 1.0)
+
+    monkeypatch.setattr(arquivo_pdf, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(arquivo_pdf, "_reprocessar_documento", reprocessar_documento)
+
+    dados = arquivo_pdf.reprocessar("ana@exemplo.com")
+    assert lidos == [h_ana]
+    assert [d["documento"] for d in dados] == [h_ana]
+    assert arquivo_pdf.reprocessar("carla@exemplo.com") == []
+    # A conciliação fica na conta reprocessada, gravada pelo processo principal
+    assert list(carregar_documentos("ana@exemplo.com")["status"]) == [CONFERE]
+    assert carregar_documentos("bia@exemplo.com").empty
+
+
+def test_mes_do_documento_prefere_o_mes_arquivado(diretorio_temporario):
+    hash_pdf = _arquivar(b"%PDF-a", "m1", "2024_03", "ana@exemplo.com")
+    arquivados = arquivo_pdf.meses_arquivados()
+
+    # Recebido de novo em outro mês (ou importado com outro nome), continua no mês arquivado
+    assert arquivo_pdf.mes_do_documento(hash_pdf, "2024_04", arquivados) == "2024_03"
+    assert arquivo_pdf.mes_do_documento("outro", "2024_04", arquivados) == "2024_04"
+    # O mês escolhido vale para o mesmo PDF repetido no lote
+    assert arquivo_pdf.mes_do_documento("outro", None, arquivados) == "2024_04"
+    assert arquivo_pdf.mes_do_documento("sem_mes", None, arquivados) is None
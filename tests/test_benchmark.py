@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+import benchmark
+
+
+def test_pesado_que_o_streamlit_ja_carrega_nao_conta():
+    base = benchmark._pacotes([(100, "streamlit"), (120, "plotly.graph_objs"), (5, "pandas")])
+    login = [(10, "google_login"), (100, "streamlit"), (120, "plotly.graph_objs"), (30, "googleapiclient.discovery")]
+    assert benchmark.pesados_indevidos(login, base) == ["googleapiclient"]
+    # Sem streamlit instalado não há base: plotly volta a ser indevido
+    assert benchmark.pesados_indevidos(login, set()) == ["googleapiclient", "plotly"]
+
+
+@pytest.fixture
+def na_raiz(monkeypatch):
+    # O corpus é lido relativo à raiz do repositório, como na linha de comando
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert not os.path.exists(benchmark.ARQUIVO_BASELINE)
+
+
+def test_corpus_passa_no_piso_padrao(na_raiz):
+    assert benchmark.rodar_corpus(False, False, tempo_minimo=0.2) == 0
+
+
+def test_vazao_abaixo_do_piso_reprova(na_raiz, monkeypatch):
+    # Sem baseline registrada o piso padrão ainda vale
+    monkeypatch.setattr(benchmark, "MINIMO_DOCS_POR_SEGUNDO", 1e9)
+    assert benchmark.rodar_corpus(False, False, tempo_minimo=0.2) == 1
@@ -0,0 +1,61 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import armazenamento
+from canonicalizacao import IndiceCanonico
+
+
+def _resolver_em_outro_processo(diretorio: str, nomes: list) -> dict:
+    import os
+    os.chdir(diretorio)
+    nomes_banco, aliases = armazenamento.carregar_canonicos()
+    indice = IndiceCanonico(nomes_banco, aliases, persistente=True)
+    return {nome: indice.resolver(nome) for nome in nomes}
+
+
+def test_processos_concorrentes_recebem_os_mesmos_ids(diretorio_temporario):
+    nomes = ["Dedetização", "Pintura Fachada", "Reparo Hidráulico", "Troca de Lâmpadas",
+             "Seguro Predial", "Portaria Remota", "Recarga Extintores", "Poda de Árvores"]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        resultados = list(pool.map(
+            _resolver_em_outro_processo,
+            [str(diretorio_temporario)] * 4,
+            [nomes, list(reversed(nomes)), nomes[::2] + nomes[1::2], nomes],
+        ))
+
+    # Todos os processos concordam, e nomes diferentes nunca dividem um ID
+    assert all(resultado == resultados[0] for resultado in resultados)
+    assert len(set(resultados[0].values())) == len(nomes)
+    gravados, _ = armazenamento.carregar_canonicos()
+    assert sorted(gravados.values()) == sorted(nomes)
+
+
+def test_indice_desatualizado_adota_o_alias_gravado(diretorio_temporario):
+    antigo = IndiceCanonico(persistente=True)
+    novo = IndiceCanonico(persistente=True)
+
+    item_id = novo.resolver("Manutenção Portão")
+    # O índice carregado antes da criação encontra o mesmo ID no banco, sem criar outro
+    assert antigo.resolver("Manutencao Portao") == item_id
+    assert antigo.nomes[item_id] == "Manutenção Portão"
+
+
+def test_numeros_e_letras_soltas_separam_itens_parecidos():
+    indice = IndiceCanonico()
+    pares = [
+        ("Energia Elétrica Bloco A", "Energia Elétrica Bloco B"),
+        ("Salão de Festas 101", "Salão de Festas 102"),
+        ("Multa Atraso Apto 101", "Multa Atraso Apto 102"),
+    ]
+    for primeiro, segundo in pares:
+        assert indice.resolver(primeiro) != indice.resolver(segundo)
+    # Grafias próximas do mesmo item, com os mesmos números e letras, continuam no mesmo ID
+    assert indice.resolver("Salao Festas 101") == indice.resolver("Salão de Festas 101")
+    assert indice.resolver("Multas Atraso Apto 102") == indice.resolver("Multa Atraso Apto 102")
+    assert indice.resolver("Energia Elétricas Bloco B") == indice.resolver("Energia Elétrica Bloco B")
+
+
+def test_ids_fixos_resolvidos_uma_vez(monkeypatch):
+    indice = IndiceCanonico()
+    fixos = indice.ids_fixos()
+    monkeypatch.setattr(indice, "resolver", lambda item: (_ for _ in ()).throw(AssertionError(item)))
+    assert indice.ids_fixos() == fixos
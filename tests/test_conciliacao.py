@@ -0,0 +1,42 @@
+import hashlib
+
+import pandas as pd
+
+import armazenamento
+from conciliacao import (
+    CONFERE, DIVERGENTE, MODO_PRECISO, MODO_RAPIDO,
+    carregar_documentos, conciliar, itens_precisos, registrar_documento, resumo,
+)
+from extrair_dados import itens_reaproveitados
+
+PDF = b"%PDF-boleto"
+DOCUMENTO = hashlib.sha256(PDF).hexdigest()
+
+
+def _itens(valores: list) -> list:
+    return [{"mes": "2024_03", "unidade": "", "item": f"Taxa {i}", "valor": v, "documento": DOCUMENTO}
+            for i, v in enumerate(valores)]
+
+
+def test_conciliacao_e_por_conta(diretorio_temporario):
+    registrar_documento("ana@exemplo.com", DOCUMENTO, "2024_03", "metta", MODO_RAPIDO, conciliar(_itens([10.0]), 12.0))
+    registrar_documento("bia@exemplo.com", DOCUMENTO, "2024_03", "metta", MODO_RAPIDO, conciliar(_itens([10.0]), 12.0))
+    # O reprocessamento preciso da ana não muda o status do mesmo PDF na conta da bia
+    registrar_documento("ana@exemplo.com", DOCUMENTO, "2024_03", "metta", MODO_PRECISO, conciliar(_itens([10.0, 2.0]), 12.0))
+
+    assert resumo("ana@exemplo.com") == {CONFERE: 1}
+    assert resumo("bia@exemplo.com") == {DIVERGENTE: 1}
+    assert list(carregar_documentos("ana@exemplo.com")["modo"]) == [MODO_PRECISO]
+
+
+def test_itens_precisos_sao_reaproveitados(diretorio_temporario):
+    armazenamento.salvar_tabela("ana@exemplo.com", "itens", pd.DataFrame(_itens([10.0, 2.0])))
+    armazenamento.salvar_tabela("bia@exemplo.com", "itens", pd.DataFrame(_itens([10.0])))
+    registrar_documento("ana@exemplo.com", DOCUMENTO, "2024_03", "metta", MODO_PRECISO, conciliar(_itens([10.0, 2.0]), 12.0))
+    registrar_documento("bia@exemplo.com", DOCUMENTO, "2024_03", "metta", MODO_RAPIDO, conciliar(_itens([10.0]), 12.0))
+
+    precisos = itens_precisos("ana@exemplo.com")
+    assert [i["valor"] for i in itens_reaproveitados(DOCUMENTO, precisos)] == [10.0, 2.0]
+    # Na conta em que o documento só passou pelo modo rápido, o parse é refeito
+    assert itens_precisos("bia@exemplo.com") == {}
+    assert itens_reaproveitados(DOCUMENTO, itens_precisos("bia@exemplo.com")) is None
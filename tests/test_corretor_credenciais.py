@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from google.oauth2.credentials import Credentials
+
+import corretor_credenciais
+import gmail_cliente
+
+
+def _token(token: str, expiry: datetime) -> dict:
+    return {
+        "token": token,
+        "refresh_token": "refresh-1",
+        "client_id": "cliente",
+        "client_secret": "segredo",
+        "scopes": corretor_credenciais.SCOPES,
+        "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+@pytest.fixture
+def token_expirado(diretorio_temporario, monkeypatch):
+    """token.json com o access token vencido; cada refresh gera "novo-N" e é contado."""
+    with open(corretor_credenciais.ARQUIVO_TOKEN, "w") as f:
+        json.dump(_token("antigo", datetime.utcnow() - timedelta(minutes=1)), f)
+    renovacoes = []
+
+    def refresh(self, request):
+        time.sleep(0.05)
+        renovacoes.append(self.token)
+        self.token = f"novo-{len(renovacoes)}"
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(Credentials, "refresh", refresh)
+    monkeypatch.setattr(corretor_credenciais, "_entradas", {})
+    return renovacoes
+
+
+def _gravado() -> dict:
+    with open(corretor_credenciais.ARQUIVO_TOKEN) as f:
+        return json.load(f)
+
+
+def test_chamadas_concorrentes_renovam_uma_vez(token_expirado):
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(corretor_credenciais.obter_credenciais().token))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert token_expirado == ["antigo"]
+    assert tokens == ["novo-1"] * 8
+    # O token renovado foi gravado: o próximo processo não renova de novo
+    assert _gravado()["token"] == "novo-1"
+
+
+def test_token_renovado_por_outro_processo_e_adotado(token_expirado):
+    creds = corretor_credenciais.obter_credenciais()
+    assert token_expirado == ["antigo"]
+
+    # Outro processo renovou e gravou depois; este ainda tem o token da hora anterior em memória
+    creds.expiry = datetime.utcnow() - timedelta(minutes=1)
+    with open(corretor_credenciais.ARQUIVO_TOKEN, "w") as f:
+        json.dump(_token("do-agendador", datetime.utcnow() + timedelta(hours=1)), f)
+
+    assert corretor_credenciais.obter_credenciais().token == "do-agendador"
+    assert token_expirado == ["antigo"]
+
+
+def test_401_no_http_da_conta_renova_pelo_corretor(token_expirado):
+    corretor_credenciais.obter_credenciais()
+    http = gmail_cliente._HttpDaConta()
+    enviados = []
+
+    def request(uri, method, body=None, headers=None, **kwargs):
+        enviados.append(headers["authorization"])
+        return SimpleNamespace(status=401 if len(enviados) == 1 else 200), b"{}"
+
+    http.http = SimpleNamespace(request=request)
+    resposta, _ = http.request("https://gmail.googleapis.com/gmail/v1/users/me/messages")
+
+    assert resposta.status == 200
+    assert enviados == ["Bearer novo-1", "Bearer novo-2"]
+    assert token_expirado == ["antigo", "novo-1"]
+    assert _gravado()["token"] == "novo-2"
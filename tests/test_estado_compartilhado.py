@@ -0,0 +1,44 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+import estado_compartilhado
+from estado_compartilhado import BackendMemoria, publicar_resultado, resultado_publicado
+from ingestao import processar_ingestao
+
+DADOS = [
+    {"mes": "2025_01", "unidade": "101", "item": "Taxa Fundo de Reserva", "valor": 120.5},
+    {"mes": "2025_01", "unidade": "101", "item": "Pintura Fachada 1/3", "valor": 210.0},
+    {"mes": "2025_02", "unidade": "101", "item": "Taxa Fundo de Reserva", "valor": 120.5},
+    {"mes": "2025_02", "unidade": "102", "item": "Pintura Fachada 2/3", "valor": 210.0},
+]
+
+
+@pytest.fixture
+def memoria(diretorio_temporario, monkeypatch):
+    backend = BackendMemoria()
+    monkeypatch.setattr(estado_compartilhado, "_backend", backend)
+    return backend
+
+
+def test_tabelas_voltam_com_os_mesmos_tipos(memoria):
+    resultado = processar_ingestao("ana@exemplo.com", DADOS)
+    versao = estado_compartilhado.versao_publicada("ana@exemplo.com")
+
+    publicado = resultado_publicado("ana@exemplo.com", versao)
+    assert set(publicado) == set(resultado)
+    for nome, df in resultado.items():
+        pd.testing.assert_frame_equal(publicado[nome].reset_index(drop=True), df.reset_index(drop=True))
+
+
+def test_outra_versao_nao_e_devolvida(memoria):
+    publicar_resultado("ana@exemplo.com", "v1", {"cubo": pd.DataFrame({"valor": [1.0]})})
+    assert resultado_publicado("ana@exemplo.com", "v2") is None
+    assert resultado_publicado("bia@exemplo.com", "v1") is None
+
+
+def test_valor_em_outro_formato_nao_e_desserializado(memoria):
+    # Um pickle no backend (formato antigo ou valor forjado) é ignorado, nunca carregado
+    memoria.gravar("dados:ana@exemplo.com", pickle.dumps({"versao": "v1", "tabelas": {}}))
+    assert resultado_publicado("ana@exemplo.com", "v1") is None
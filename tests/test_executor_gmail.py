@@ -0,0 +1,217 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+import executor_gmail
+import gmail_cliente
+from executor_gmail import Checkpoint, ExecutorGmail, LimiteAdaptativo
+
+CORPO_COTA = json.dumps({"error": {"code": 403, "errors": [{"reason": "rateLimitExceeded"}]}}).encode()
+CORPO_PERMISSAO = json.dumps({"error": {"code": 403, "errors": [{"reason": "insufficientPermissions"}]}}).encode()
+
+
+# ==========================
+# SERVIDOR FALSO DO GMAIL
+# ==========================
+class ServidorFalso:
+    """
+    Servidor HTTP local que responde cada caminho com uma sequência roteirizada
+    de status antes do 200 (ex: ["429", "503"]), contando as chamadas.
+    """
+
+    def __init__(self):
+        self.roteiros = {}
+        self.chamadas = {}
+        self.lock = threading.Lock()
+        servidor = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with servidor.lock:
+                    servidor.chamadas[self.path] = servidor.chamadas.get(self.path, 0) + 1
+                    roteiro = servidor.roteiros.get(self.path, [])
+                    passo = roteiro.pop(0) if roteiro else "200"
+                cabecalhos, corpo = {}, json.dumps({"id": self.path}).encode()
+                if passo == "429":
+                    cabecalhos["Retry-After"] = "3"
+                elif passo == "403-cota":
+                    corpo = CORPO_COTA
+                elif passo == "403":
+                    corpo = CORPO_PERMISSAO
+                self.send_response(int(passo.split("-")[0]))
+                self.send_header("Content-Type", "application/json")
+                for nome, valor in cabecalhos.items():
+                    self.send_header(nome, valor)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Tratador)
+        threading.Thread(target=self.http.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def requisicao(self, caminho: str) -> HttpRequest:
+        url = f"http://127.0.0.1:{self.http.server_port}{caminho}"
+        return HttpRequest(httplib2.Http(), lambda resp, conteudo: json.loads(conteudo), url)
+
+
+@pytest.fixture
+def servidor():
+    falso = ServidorFalso()
+    yield falso
+    falso.http.shutdown()
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    # Jitter determinístico: sempre o teto do intervalo de backoff
+    monkeypatch.setattr(executor_gmail.random, "uniform", lambda a, b: b)
+    return []
+
+
+def _executor(esperas) -> ExecutorGmail:
+    return ExecutorGmail(unidades_por_segundo=10_000, dormir=esperas.append)
+
+
+# ==========================
+# RETENTATIVAS E BACKOFF
+# ==========================
+def test_erros_transitorios_seguidos_de_sucesso(servidor, esperas):
+    servidor.roteiros["/msg"] = ["503", "500", "502"]
+    assert _executor(esperas).executar(servidor.requisicao("/msg")) == {"id": "/msg"}
+    assert servidor.chamadas["/msg"] == 4
+    # Backoff exponencial: 1, 2, 4 segundos
+    assert esperas == [1.0, 2.0, 4.0]
+
+
+def test_429_respeita_retry_after(servidor, esperas):
+    servidor.roteiros["/msg"] = ["429"]
+    assert _executor(esperas).executar(servidor.requisicao("/msg")) == {"id": "/msg"}
+    # O backoff da primeira tentativa (1s) é menor que o Retry-After do servidor
+    assert esperas == [3.0]
+
+
+def test_403_de_cota_e_retentado(servidor, esperas):
+    servidor.roteiros["/msg"] = ["403-cota", "403-cota"]
+    assert _executor(esperas).executar(servidor.requisicao("/msg")) == {"id": "/msg"}
+    assert servidor.chamadas["/msg"] == 3
+
+
+def test_403_de_permissao_falha_na_hora(servidor, esperas):
+    servidor.roteiros["/msg"] = ["403"]
+    with pytest.raises(HttpError):
+        _executor(esperas).executar(servidor.requisicao("/msg"))
+    assert servidor.chamadas["/msg"] == 1
+    assert esperas == []
+
+
+def test_desiste_depois_do_maximo_de_tentativas(servidor, esperas):
+    servidor.roteiros["/msg"] = ["503"] * executor_gmail.MAX_TENTATIVAS
+    with pytest.raises(HttpError):
+        _executor(esperas).executar(servidor.requisicao("/msg"))
+    assert servidor.chamadas["/msg"] == executor_gmail.MAX_TENTATIVAS
+
+
+# ==========================
+# CONCORRÊNCIA ADAPTATIVA (AIMD)
+# ==========================
+def test_limite_cai_pela_metade_no_limite_de_taxa(servidor, esperas):
+    executor = _executor(esperas)
+    executor.limite.limite = 8.0
+    servidor.roteiros["/msg"] = ["429"]
+    executor.executar(servidor.requisicao("/msg"))
+    # Metade no 429, depois +1/limite no sucesso
+    assert executor.limite.limite == pytest.approx(4.0 + 1 / 4.0)
+
+
+def test_limite_cresce_aditivamente_e_respeita_o_maximo():
+    limite = LimiteAdaptativo(maximo=4, inicial=1.0)
+    for _ in range(50):
+        limite.adquirir()
+        limite.liberar()
+    assert limite.limite == 4
+
+
+def test_mapear_sob_erros_nunca_passa_do_limite(servidor, esperas):
+    executor = ExecutorGmail(max_concorrencia=4, unidades_por_segundo=10_000, dormir=lambda s: None)
+    caminhos = [f"/msg{i}" for i in range(40)]
+    for caminho in caminhos[::3]:
+        servidor.roteiros[caminho] = ["429"]
+    pico = []
+    original = executor.limite.adquirir
+
+    def adquirir():
+        original()
+        pico.append(executor.limite.em_uso)
+
+    executor.limite.adquirir = adquirir
+    resultados = executor.mapear(lambda c: executor.executar(servidor.requisicao(c)), caminhos)
+    assert resultados == [{"id": c} for c in caminhos]
+    assert max(pico) <= 4
+
+
+# ==========================
+# CHECKPOINT
+# ==========================
+def test_checkpoint_retoma_de_onde_parou(diretorio_temporario):
+    checkpoint = Checkpoint("conta")
+    checkpoint.registrar("m1", [{"mes": "2025_01", "item": "Elevador", "valor": 95.0}])
+
+    # Nova sincronização depois de uma falha: m1 já está feita
+    retomado = Checkpoint("conta")
+    assert "m1" in retomado and "m2" not in retomado
+    retomado.registrar("m2", [])
+    assert retomado.itens(["m1", "m2"]) == [{"mes": "2025_01", "item": "Elevador", "valor": 95.0}]
+    retomado.concluir()
+    assert "m1" not in Checkpoint("conta")
+
+
+def test_checkpoint_acrescenta_uma_linha_por_mensagem(diretorio_temporario):
+    checkpoint = Checkpoint("conta")
+    for i in range(3):
+        checkpoint.registrar(f"m{i}", [{"mes": "2025_01", "item": "Elevador", "valor": float(i)}])
+    with open(checkpoint.arquivo) as f:
+        linhas = f.readlines()
+    assert [json.loads(linha)["id"] for linha in linhas] == ["m0", "m1", "m2"]
+
+    # Queda no meio da gravação: a linha cortada é descartada e o resto é retomado
+    with open(checkpoint.arquivo, "a") as f:
+        f.write('{"id": "m3", "itens": [')
+    retomado = Checkpoint("conta")
+    assert "m2" in retomado and "m3" not in retomado
+    # Contas diferentes não dividem o arquivo
+    assert "m0" not in Checkpoint("outra")
+
+
+# ==========================
+# CONEXÕES DA CONTA
+# ==========================
+def test_sincronizacoes_seguidas_reaproveitam_as_conexoes_da_conta(servidor, monkeypatch):
+    criados = []
+
+    def novo_http(gmail_token):
+        criados.append(httplib2.Http())
+        return criados[-1]
+
+    cliente = gmail_cliente._Cliente(None, None, None)
+    monkeypatch.setattr(gmail_cliente, "_obter_cliente", lambda gmail_token=None: cliente)
+    monkeypatch.setattr(gmail_cliente, "_novo_http", novo_http)
+
+    caminhos = [f"/msg{i}" for i in range(20)]
+    for _ in range(3):
+        # Um executor novo por sincronização, como em extrair_dados.buscar_e_extrair
+        executor = ExecutorGmail(gmail_cliente.conexao, max_concorrencia=4,
+                                 unidades_por_segundo=10_000, dormir=lambda s: None)
+        assert executor.mapear(lambda c: executor.executar(servidor.requisicao(c)), caminhos) == [
+            {"id": c} for c in caminhos]
+
+    # No máximo um Http por requisição simultânea, e todos voltam ao pool da conta
+    assert len(criados) <= 4
+    assert sorted(map(id, cliente.conexoes)) == sorted(map(id, criados))
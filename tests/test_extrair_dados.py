@@ -0,0 +1,171 @@
+import base64
+import hashlib
+
+import extrair_dados
+from conciliacao import conciliar
+from executor_gmail import Checkpoint, ExecutorGmail
+
+PDF_BOLETO = b"%PDF-boleto"
+PDF_SEGUNDA_VIA = b"%PDF-segunda-via"
+
+
+# ==========================
+# GMAIL FALSO COM RESPOSTA PARCIAL
+# ==========================
+def _item(texto: str, i: int):
+    j = i
+    while j < len(texto) and texto[j] not in ",()/":
+        j += 1
+    nome = texto[i:j]
+    if j < len(texto) and texto[j] == "/":
+        filho, sub, j = _item(texto, j + 1)
+        return nome, {filho: sub}, j
+    if j < len(texto) and texto[j] == "(":
+        sub, j = _lista(texto, j + 1)
+        return nome, sub, j + 1
+    return nome, None, j
+
+
+def _lista(texto: str, i: int):
+    arvore = {}
+    while True:
+        nome, sub, i = _item(texto, i)
+        arvore[nome] = {**(arvore.get(nome) or {}), **sub} if sub else sub
+        if i < len(texto) and texto[i] == ",":
+            i += 1
+            continue
+        return arvore, i
+
+
+def _campos(mascara: str) -> dict:
+    """Árvore do parâmetro fields do Gmail: "a/b,c(d,e)" → {"a": {"b": None}, "c": {"d": None, "e": None}}."""
+    return _lista(mascara, 0)[0]
+
+
+def _aplicar(valor, arvore):
+    if arvore is None:
+        return valor
+    if isinstance(valor, list):
+        return [_aplicar(v, arvore) for v in valor]
+    return {chave: _aplicar(valor[chave], sub) for chave, sub in arvore.items() if chave in valor}
+
+
+# multipart/mixed → (texto, multipart/alternative → (html, PDF), PDF, PDF embutido sem attachmentId)
+MENSAGEM = {
+    "id": "m1",
+    "threadId": "t1",
+    "snippet": "Segue o boleto",
+    "sizeEstimate": 123456,
+    "internalDate": "1709640000000",
+    "payload": {
+        "partId": "",
+        "mimeType": "multipart/mixed",
+        "filename": "",
+        "headers": [{"name": "From", "value": "Boletos <boleto@mettacondominios.com.br>"},
+                    {"name": "Subject", "value": "Boleto de março"}],
+        "body": {"size": 0},
+        "parts": [
+            {"partId": "0", "mimeType": "text/plain", "filename": "",
+             "body": {"size": 14, "data": "U2VndWUgbyBib2xldG8"}},
+            {"partId": "1", "mimeType": "multipart/alternative", "filename": "", "body": {"size": 0}, "parts": [
+                {"partId": "1.0", "mimeType": "text/html", "filename": "",
+                 "body": {"size": 20, "data": "PHA-U2VndWU8L3A-"}},
+                {"partId": "1.1", "mimeType": "application/pdf", "filename": "",
+                 "body": {"size": 16, "attachmentId": "a2"}},
+            ]},
+            {"partId": "2", "mimeType": "application/octet-stream", "filename": "Boleto.PDF",
+             "body": {"size": 11, "attachmentId": "a1"}},
+            {"partId": "3", "mimeType": "application/pdf", "filename": "embutido.pdf",
+             "body": {"size": 4, "data": "JVBERg"}},
+        ],
+    },
+}
+ANEXOS = {"a1": PDF_BOLETO, "a2": PDF_SEGUNDA_VIA}
+
+
+class _Requisicao:
+    def __init__(self, resposta: dict, fields: str, pedidos: list):
+        self.resposta, self.fields = resposta, fields
+        pedidos.append(fields)
+
+    def execute(self, http=None):
+        return _aplicar(self.resposta, _campos(self.fields))
+
+
+class _GmailFalso:
+    """Só o que a sincronização chama de users().messages(); cada resposta passa pela máscara fields."""
+
+    def __init__(self):
+        self.pedidos = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def attachments(self):
+        return self
+
+    def list(self, userId, q, pageToken=None, fields=None):
+        if pageToken is None:
+            return _Requisicao({"messages": [{"id": "m1", "threadId": "t1"}], "nextPageToken": "p2",
+                                "resultSizeEstimate": 2}, fields, self.pedidos)
+        return _Requisicao({"messages": [], "resultSizeEstimate": 2}, fields, self.pedidos)
+
+    def get(self, userId, id, fields=None, messageId=None):
+        if messageId is None:
+            return _Requisicao(MENSAGEM, fields, self.pedidos)
+        conteudo = ANEXOS[id]
+        return _Requisicao({"attachmentId": id, "size": len(conteudo),
+                            "data": base64.urlsafe_b64encode(conteudo).decode()}, fields, self.pedidos)
+
+
+def test_mascaras_cortam_a_resposta():
+    detalhe = _aplicar(MENSAGEM, _campos(extrair_dados.CAMPOS_MENSAGEM))
+    assert set(detalhe) == {"id", "internalDate", "payload"}
+    # Corpos inline (texto, HTML, PDF embutido) ficam de fora; attachmentId e a árvore de partes ficam
+    texto, alternativa, anexo, embutido = detalhe["payload"]["parts"]
+    assert texto["body"] == {} and embutido["body"] == {}
+    assert alternativa["parts"][1]["body"] == {"attachmentId": "a2"}
+    assert anexo == {"partId": "2", "mimeType": "application/octet-stream", "filename": "Boleto.PDF",
+                     "body": {"attachmentId": "a1"}}
+    assert _campos(extrair_dados.CAMPOS_LISTA) == {"messages": {"id": None}, "nextPageToken": None}
+
+
+def test_sincronizacao_acha_pdfs_aninhados_e_calcula_o_hash_uma_vez(diretorio_temporario, monkeypatch):
+    import arquivo_pdf
+
+    hashes = []
+    sha256 = hashlib.sha256
+
+    def contar_sha256(dados=b""):
+        hashes.append(bytes(dados))
+        return sha256(dados)
+
+    parseados = []
+
+    def processar_documento(pdf, ano_mes, modelo, preciso=False, documento=None):
+        parseados.append((bytes(pdf), documento))
+        itens = [{"mes": ano_mes, "unidade": "101", "item": "Taxa", "valor": 1.0, "documento": documento}]
+        return documento, itens, conciliar(itens, 1.0)
+
+    monkeypatch.setattr(hashlib, "sha256", contar_sha256)
+    monkeypatch.setattr(extrair_dados, "processar_documento", processar_documento)
+
+    service = _GmailFalso()
+    dados = extrair_dados._buscar_e_extrair(service, ExecutorGmail(dormir=lambda s: None),
+                                            Checkpoint("ana"), "q", "ana@exemplo.com")
+
+    # Na ordem do documento: o PDF dentro do multipart/alternative, depois o anexo do topo;
+    # o PDF embutido sem attachmentId não é baixado
+    esperados = [PDF_SEGUNDA_VIA, PDF_BOLETO]
+    assert [pdf for pdf, _ in parseados] == esperados
+    assert [documento for _, documento in parseados] == [sha256(pdf).hexdigest() for pdf in esperados]
+    assert [d["documento"] for d in dados] == [sha256(pdf).hexdigest() for pdf in esperados]
+    # Um hash por PDF, reaproveitado pelo arquivo, pelo reaproveitamento e pelo parse
+    assert hashes == esperados
+    entradas = arquivo_pdf.entradas_da_conta("ana@exemplo.com")
+    assert sorted(e["arquivo"] for e in entradas) == ["Boleto.PDF", "anexo_1.1.pdf"]
+    assert service.pedidos == [extrair_dados.CAMPOS_LISTA, extrair_dados.CAMPOS_LISTA, extrair_dados.CAMPOS_MENSAGEM,
+                               extrair_dados.CAMPOS_ANEXO, extrair_dados.CAMPOS_ANEXO]
@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import gmail_async
+import gmail_cliente
+from conciliacao import conciliar
+
+CORPO_COTA = json.dumps({"error": {"code": 403, "errors": [{"reason": "userRateLimitExceeded"}]}})
+
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    async def dormir(segundos):
+        pass
+    monkeypatch.setattr(gmail_async.asyncio, "sleep", dormir)
+
+
+def _rodar(respostas: list, renovar=None):
+    """Executa _get_json contra um transporte que devolve `respostas` em ordem; devolve (json, tokens usados)."""
+    tokens = []
+
+    def tratar(requisicao):
+        tokens.append(requisicao.headers["Authorization"])
+        resposta = respostas.pop(0)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta
+
+    async def executar():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(tratar)) as cliente:
+            sessao = gmail_async._Sessao(cliente, "token-json", SimpleNamespace(token="antigo"))
+            return await gmail_async._get_json(sessao, "/messages")
+
+    return asyncio.run(executar()), tokens
+
+
+def test_403_de_cota_e_retentado():
+    resultado, tokens = _rodar([httpx.Response(403, text=CORPO_COTA), httpx.Response(200, json={"ok": 1})])
+    assert resultado == {"ok": 1}
+    assert len(tokens) == 2
+
+
+def test_403_de_permissao_nao_e_retentado():
+    with pytest.raises(httpx.HTTPStatusError):
+        _rodar([httpx.Response(403, json={"error": {"errors": [{"reason": "forbidden"}]}})])
+
+
+def test_erro_de_transporte_e_retentado():
+    resultado, _ = _rodar([httpx.ConnectError("recusada"), httpx.ReadTimeout("lento"), httpx.Response(200, json={"ok": 1})])
+    assert resultado == {"ok": 1}
+
+
+def test_401_renova_o_token_uma_vez(monkeypatch):
+    renovacoes = []
+
+    def renovar(gmail_token, rejeitado):
+        renovacoes.append(rejeitado)
+        return SimpleNamespace(token="novo")
+
+    monkeypatch.setattr(gmail_cliente, "renovar_rejeitadas", renovar)
+    resultado, tokens = _rodar([httpx.Response(401), httpx.Response(200, json={"ok": 1})])
+    assert resultado == {"ok": 1}
+    assert renovacoes == ["antigo"]
+    assert tokens == ["Bearer antigo", "Bearer novo"]
+
+
+def test_401_repetido_nao_entra_em_laco(monkeypatch):
+    monkeypatch.setattr(gmail_cliente, "renovar_rejeitadas", lambda t, r: SimpleNamespace(token="novo"))
+    with pytest.raises(httpx.HTTPStatusError):
+        _rodar([httpx.Response(401), httpx.Response(401)])
+
+
+def test_401_na_ultima_tentativa_ainda_repete_com_o_token_novo(monkeypatch):
+    monkeypatch.setattr(gmail_async, "MAX_TENTATIVAS", 2)
+    monkeypatch.setattr(gmail_cliente, "renovar_rejeitadas", lambda t, r: SimpleNamespace(token="novo"))
+    resultado, tokens = _rodar([httpx.Response(503), httpx.Response(401), httpx.Response(200, json={"ok": 1})])
+    assert resultado == {"ok": 1}
+    assert tokens == ["Bearer antigo", "Bearer antigo", "Bearer novo"]
+
+
+def _detalhe(msg_id: str) -> dict:
+    return {
+        "id": msg_id,
+        "internalDate": "1709640000000",
+        "payload": {
+            "headers": [{"name": "From", "value": "Boletos <boleto@mettacondominios.com.br>"}],
+            "parts": [{"partId": "1", "filename": "boleto.pdf", "mimeType": "application/pdf",
+                       "body": {"attachmentId": "a1"}}],
+        },
+    }
+
+
+def test_processar_mensagem_arquiva_o_pdf_como_a_versao_sincrona(diretorio_temporario, monkeypatch):
+    import arquivo_pdf
+    pdf = b"%PDF-boleto"
+
+    def tratar(requisicao):
+        if requisicao.url.path.endswith("/attachments/a1"):
+            return httpx.Response(200, json={"data": base64.urlsafe_b64encode(pdf).decode()})
+        return httpx.Response(200, json=_detalhe("m1"))
+
+    def processar_documento(pdf_bytes, ano_mes, modelo, documento=None):
+        itens = [{"mes": ano_mes, "item": "Taxa", "valor": 1.0, "documento": "doc"}]
+        return "doc", itens, conciliar(itens, 1.0)
+
+    monkeypatch.setattr(gmail_async, "processar_documento", processar_documento)
+
+    async def executar():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(tratar)) as cliente:
+            sessao = gmail_async._Sessao(cliente, "token-json", SimpleNamespace(token="antigo"))
+            return await gmail_async._processar_mensagem(
+                sessao, asyncio.Semaphore(1), None, "m1", "ana@exemplo.com", {}, {}
+            )
+
+    itens = asyncio.run(executar())
+    assert [i["mes"] for i in itens] == ["2024_03"]
+    entradas = arquivo_pdf.entradas_da_conta("ana@exemplo.com")
+    assert [(e["mensagem_id"], e["arquivo"], e["ano_mes"]) for e in entradas] == [("m1", "boleto.pdf", "2024_03")]
+    with open(arquivo_pdf.caminho_objeto(entradas[0]["hash"]), "rb") as f:
+        assert f.read() == pdf
+
+    # Desligado, como em extrair_dados, nada vai para o arquivo local
+    monkeypatch.setattr(gmail_async, "ARQUIVAR_PDFS", False)
+    monkeypatch.setattr(arquivo_pdf, "arquivar", lambda *a, **k: pytest.fail("arquivou com ARQUIVAR_PDFS desligado"))
+    asyncio.run(executar())
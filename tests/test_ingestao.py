@@ -0,0 +1,42 @@
+from datetime import date
+
+import pandas as pd
+
+import extrair_dados
+from ingestao import mesclar_periodo, periodo_em_meses
+
+
+def _linha(mes: str, item: str, valor: float) -> dict:
+    return {"mes": mes, "unidade": "", "item": item, "valor": valor}
+
+
+def test_periodo_parcial_e_ampliado_para_meses_inteiros():
+    inicio, fim, meses = periodo_em_meses(date(2025, 3, 15), date(2025, 5, 10))
+    assert (inicio, fim) == (date(2025, 3, 1), date(2025, 5, 31))
+    assert meses == ["2025_03", "2025_04", "2025_05"]
+
+
+def test_busca_no_gmail_cobre_os_meses_substituidos():
+    inicio, fim, _ = periodo_em_meses(date(2025, 3, 15), date(2025, 5, 10))
+    q = extrair_dados.montar_query(inicio=inicio, fim=fim)
+    # Mensagens de 01/03 e de 31/05 caem dentro de after:/before:
+    depois = int(q.split("after:")[1].split()[0])
+    antes = int(q.split("before:")[1].split()[0])
+    assert depois <= extrair_dados._epoch(date(2025, 3, 1))
+    assert antes > extrair_dados._epoch(date(2025, 5, 31))
+
+
+def test_resync_parcial_nao_perde_linhas():
+    existente = pd.DataFrame([
+        _linha("2025_02", "Elevador", 95.0),
+        _linha("2025_03", "Elevador", 95.0),
+        _linha("2025_05", "Elevador", 95.0),
+        _linha("2025_06", "Elevador", 95.0),
+    ])
+    inicio, fim, meses = periodo_em_meses(date(2025, 3, 15), date(2025, 5, 10))
+    # A busca ampliada traz de novo os boletos de março e maio, inclusive os de antes de 15/03
+    novos = [_linha("2025_03", "Elevador", 96.0), _linha("2025_04", "Elevador", 96.0), _linha("2025_05", "Elevador", 96.0)]
+
+    mesclado = pd.DataFrame(mesclar_periodo(existente, novos, meses))
+    assert sorted(mesclado["mes"]) == ["2025_02", "2025_03", "2025_04", "2025_05", "2025_06"]
+    assert mesclado.set_index("mes").loc["2025_03", "valor"] == 96.0
@@ -0,0 +1,72 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import arquivo_pdf
+import conciliacao
+import ingestao
+import ingestao_local
+
+PDF_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "corpus", "pdf_basico_2025_01.pdf")
+
+
+@pytest.fixture
+def pdf_boleto(monkeypatch):
+    pytest.importorskip("pdfplumber")
+    monkeypatch.setattr(ingestao_local, "ProcessPoolExecutor", ThreadPoolExecutor)
+    # Só interessa o que a importação entrega para a ingestão
+    monkeypatch.setattr(ingestao, "processar_ingestao", lambda conta, dados: {"dados": dados})
+    with open(PDF_CORPUS, "rb") as f:
+        return f.read()
+
+
+def test_importacao_usa_o_vencimento_sem_mes_no_nome(diretorio_temporario, pdf_boleto):
+    resultado = ingestao_local.importar("local", [("boleto.pdf", pdf_boleto)])
+    assert {d["mes"] for d in resultado["dados"]} == {"2025_01"}
+
+
+def test_importacao_reusa_o_mes_do_pdf_ja_arquivado(diretorio_temporario, pdf_boleto):
+    # Chegou antes pelo Gmail, com o mês do e-mail
+    arquivo_pdf.arquivar(pdf_boleto, "m1", "boleto.pdf", "2024-12-28", "2024_12", "", "local")
+
+    resultado = ingestao_local.importar("local", [("boleto_2025_01.pdf", pdf_boleto)])
+    assert {d["mes"] for d in resultado["dados"]} == {"2024_12"}
+
+
+def test_zip_em_caminho_e_lido_membro_a_membro(diretorio_temporario, pdf_boleto):
+    with zipfile.ZipFile("boletos.zip", "w") as pacote:
+        pacote.writestr("2024/boleto.pdf", pdf_boleto)
+        pacote.writestr("__MACOSX/2024/._boleto.pdf", b"lixo")
+
+    resultado = ingestao_local.importar_caminhos("local", ["boletos.zip"])
+    assert {d["mes"] for d in resultado["dados"]} == {"2025_01"}
+    entrada, = arquivo_pdf.entradas_da_conta("local")
+    assert entrada["ano_mes"] == "2025_01"
+    assert os.path.exists(arquivo_pdf.caminho_objeto(entrada["hash"]))
+
+
+def test_importacao_limita_os_pdfs_em_andamento(diretorio_temporario, monkeypatch):
+    monkeypatch.setattr(ingestao_local, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingestao, "processar_ingestao", lambda conta, dados: {"dados": dados})
+    monkeypatch.setattr(ingestao_local, "LOTE_IMPORTACAO", 2)
+    concluidos = []
+    monkeypatch.setattr(conciliacao, "registrar_documento", lambda conta, documento, *args: concluidos.append(documento))
+
+    def processar_arquivo(nome, hash_pdf, ano_mes, modelo):
+        # O PDF já está arquivado quando o parse começa
+        assert os.path.exists(arquivo_pdf.caminho_objeto(hash_pdf))
+        return hash_pdf, [{"mes": ano_mes, "unidade": "", "item": "Taxa", "valor": 1.0, "documento": hash_pdf}], {
+            "total_declarado": None, "soma_itens": 1.0, "diferenca": None, "status": "sem_total"}
+
+    monkeypatch.setattr(ingestao_local, "_processar_arquivo", processar_arquivo)
+
+    def arquivos():
+        for i in range(6):
+            # Ao ler o próximo PDF, no máximo LOTE_IMPORTACAO ainda não foram concluídos
+            assert i - len(concluidos) <= 2
+            yield f"boleto_2024_0{i + 1}.pdf", f"%PDF-{i}".encode()
+
+    resultado = ingestao_local.importar("local", arquivos())
+    assert sorted(d["mes"] for d in resultado["dados"]) == [f"2024_0{i}" for i in range(1, 7)]
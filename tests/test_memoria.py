@@ -0,0 +1,32 @@
+import threading
+
+from memoria import medir_pico_rss
+
+
+def test_medicao_sozinha_e_exclusiva():
+    with medir_pico_rss() as medida:
+        bytearray(1024)
+    assert medida["exclusiva"]
+    assert medida["pico_mb"] > 0
+
+
+def test_medicoes_sobrepostas_sao_marcadas_como_do_processo():
+    dentro, liberar = threading.Event(), threading.Event()
+    medidas = {}
+
+    def longa():
+        with medir_pico_rss() as medida:
+            dentro.set()
+            liberar.wait(5)
+        medidas["longa"] = medida
+
+    thread = threading.Thread(target=longa)
+    thread.start()
+    dentro.wait(5)
+    with medir_pico_rss() as curta:
+        pass
+    liberar.set()
+    thread.join()
+
+    assert not curta["exclusiva"]
+    assert not medidas["longa"]["exclusiva"]
@@ -0,0 +1,44 @@
+from concurrent.futures import Future
+
+import pytest
+
+import ocr
+
+
+class FuturoPronto(Future):
+    def __init__(self, texto=None, erro=None):
+        super().__init__()
+        if erro is not None:
+            self.set_exception(erro)
+        else:
+            self.set_result(texto)
+
+
+def test_pagina_com_erro_fica_vazia_e_fora_do_cache(diretorio_temporario, capsys):
+    fila = ocr.FilaOCR()
+    fila.pendentes = {
+        0: ("a" * 64, FuturoPronto("Taxa Fundo de Reserva 120,50")),
+        1: ("b" * 64, FuturoPronto(erro=RuntimeError("tesseract morreu"))),
+    }
+    assert fila.resultados() == {0: "Taxa Fundo de Reserva 120,50"}
+    assert "página 2" in capsys.readouterr().out
+    assert ocr.texto_em_cache("a" * 64) == "Taxa Fundo de Reserva 120,50"
+    assert ocr.texto_em_cache("b" * 64) is None
+
+
+@pytest.mark.parametrize("idiomas, esperado", [(["eng", "osd"], False), (["eng", "por"], True)])
+def test_disponivel_exige_o_idioma(monkeypatch, idiomas, esperado):
+    pytesseract = pytest.importorskip("pytesseract")
+    monkeypatch.setattr(ocr, "_disponivel", None)
+    monkeypatch.setattr(pytesseract, "get_tesseract_version", lambda: "5.3.0")
+    monkeypatch.setattr(pytesseract, "get_languages", lambda config="": idiomas)
+    assert ocr.disponivel() is esperado
+
+
+def test_trabalhador_de_outro_pool_nao_cria_pool(monkeypatch):
+    monkeypatch.setattr(ocr.multiprocessing, "parent_process", lambda: object())
+    monkeypatch.setattr(ocr, "_pool", None)
+    assert ocr._submeter(str.upper, "abc").result() == "ABC"
+    with pytest.raises(ZeroDivisionError):
+        ocr._submeter(divmod, 1, 0).result()
+    assert ocr._pool is None
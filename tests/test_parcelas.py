@@ -0,0 +1,76 @@
+import pandas as pd
+
+from parcelas import cronograma, detectar_parcelas, marcar_parcelas
+
+
+def _linha(mes: str, item: str, valor: float, unidade: str = "101", item_id: int = 1,
+           canonico: str = "Pintura Fachada") -> dict:
+    return {"mes": mes, "unidade": unidade, "item_id": item_id, "item_canonico": canonico,
+            "item": item, "valor": valor}
+
+
+def _series(linhas: list) -> pd.DataFrame:
+    return detectar_parcelas(marcar_parcelas(pd.DataFrame(linhas)))
+
+
+def test_duas_compras_do_mesmo_item_sao_series_separadas():
+    linhas = [
+        _linha("2025_01", "Pintura Fachada 1/3", 100.0),
+        _linha("2025_02", "Pintura Fachada 2/3", 100.0),
+        # Segunda compra do mesmo item, começando antes de a primeira acabar
+        _linha("2025_02", "Pintura Fachada 1/4", 50.0),
+        _linha("2025_03", "Pintura Fachada 3/3", 100.0),
+        _linha("2025_03", "Pintura Fachada 2/4", 50.0),
+    ]
+    series = _series(linhas).set_index("inicio")
+
+    assert sorted(series.index) == ["2025_01", "2025_02"]
+    primeira, segunda = series.loc["2025_01"], series.loc["2025_02"]
+    assert (primeira["total_parcelas"], primeira["ultima_parcela"], primeira["status"]) == (3, 3, "quitada")
+    assert (segunda["total_parcelas"], segunda["ultima_parcela"], segunda["restantes"]) == (4, 2, 2)
+    assert segunda["saldo_projetado"] == 100.0
+    assert segunda["status"] == "ativa"
+
+
+def test_cada_unidade_tem_sua_serie():
+    linhas = [
+        _linha("2025_01", "Pintura Fachada 1/2", 100.0, unidade="101"),
+        _linha("2025_01", "Pintura Fachada 1/2", 80.0, unidade="102"),
+    ]
+    series = _series(linhas)
+    assert sorted(zip(series["unidade"], series["valor_parcela"])) == [("101", 100.0), ("102", 80.0)]
+
+
+def test_serie_que_some_antes_do_fim_fica_interrompida():
+    linhas = [
+        _linha("2025_01", "Seguro 01/12", 30.0, item_id=2, canonico="Seguro"),
+        _linha("2025_02", "Seguro 02/12", 30.0, item_id=2, canonico="Seguro"),
+        # O boleto de março não traz mais o seguro, mas traz outros itens
+        _linha("2025_03", "Taxa Condominial", 500.0, item_id=3, canonico="Taxa Condominial"),
+    ]
+    series = _series(linhas)
+
+    assert list(series["status"]) == ["interrompida"]
+    assert series.loc[0, "ultimo_mes"] == "2025_02"
+    assert series.loc[0, "restantes"] == 10
+    # Uma série interrompida não entra no cronograma do que ainda vai ser cobrado
+    assert cronograma(series).empty
+
+
+def test_cronograma_so_tem_as_parcelas_pendentes_das_series_ativas():
+    linhas = [
+        # Quitada: todas as parcelas pagas, nada pendente
+        _linha("2025_01", "Pintura Fachada 1/2", 100.0),
+        _linha("2025_02", "Pintura Fachada 2/2", 100.0),
+        # Ativa: 2 de 4 pagas, faltam março e abril
+        _linha("2025_01", "Elevador 1/4", 40.0, item_id=2, canonico="Elevador"),
+        _linha("2025_02", "Elevador 2/4", 40.0, item_id=2, canonico="Elevador"),
+    ]
+    series = _series(linhas)
+    assert dict(zip(series["item"], series["status"])) == {"Elevador": "ativa", "Pintura Fachada": "quitada"}
+
+    futuras = cronograma(series)
+    assert futuras.to_dict("records") == [
+        {"mes": "2025_03", "item_id": 2, "item": "Elevador", "valor": 40.0},
+        {"mes": "2025_04", "item_id": 2, "item": "Elevador", "valor": 40.0},
+    ]
@@ -0,0 +1,44 @@
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+
+from perfil import PerfilExecucao, opcoes_perfil, perfil_da_execucao
+
+
+def _st(query: dict, segredos: dict):
+    return SimpleNamespace(query_params=query, secrets=segredos)
+
+
+@pytest.mark.parametrize("query, segredos, esperado", [
+    ({"perfil": "cprofile"}, {}, set()),
+    ({"perfil": "cprofile"}, {"PERFIL_CHAVE": "s3gredo"}, set()),
+    ({"perfil": "cprofile", "perfil_chave": "errada"}, {"PERFIL_CHAVE": "s3gredo"}, set()),
+    ({"perfil": "cprofile,memoria", "perfil_chave": "s3gredo"}, {"PERFIL_CHAVE": "s3gredo"}, {"cprofile", "memoria"}),
+    ({}, {"PERFIL": "1"}, {"1"}),
+])
+def test_url_so_liga_o_perfil_com_a_chave(query, segredos, esperado):
+    assert opcoes_perfil(_st(query, segredos)) == esperado
+
+
+def test_encerrar_desliga_o_que_vale_para_o_processo(diretorio_temporario):
+    perfil = PerfilExecucao(ativo=True, memoria=True)
+    assert tracemalloc.is_tracing()
+    perfil.marcar("seção")
+    # Simula st.stop(): o script sai antes de finalizar()
+    perfil.encerrar()
+    assert not tracemalloc.is_tracing()
+    assert perfil.finalizar() is None
+    perfil.encerrar()
+
+
+def test_perfil_da_execucao_encerra_quando_o_script_sai_por_excecao(diretorio_temporario):
+    st = _st({}, {"PERFIL": "memoria"})
+    with pytest.raises(RuntimeError):
+        with perfil_da_execucao(st) as perfil:
+            perfil.marcar("autenticação")
+            assert tracemalloc.is_tracing()
+            # Simula st.stop() na tela de login
+            raise RuntimeError("stop")
+    assert not tracemalloc.is_tracing()
+    assert not perfil.ativo
@@ -0,0 +1,39 @@
+import numpy as np
+
+from ingestao import preparar_dataframe
+from previsao import backtest
+
+# Erro máximo aceito no total de cada mês retido (%)
+ERRO_MAXIMO_PCT = 2.0
+
+
+def _serie_sintetica(meses: int = 36, semente: int = 0) -> list:
+    """Fixos com reajuste linear, água com sazonalidade, uma obra parcelada e variáveis com ruído."""
+    aleatorio = np.random.default_rng(semente)
+    dados = []
+    for i in range(meses):
+        mes = f"{2022 + i // 12}_{i % 12 + 1:02d}"
+        dados += [
+            {"mes": mes, "item": "Taxa Fundo de Reserva", "valor": round(120 + 0.8 * i, 2)},
+            {"mes": mes, "item": "Limpeza e Conservação", "valor": round(450 + 2.5 * i, 2)},
+            {"mes": mes, "item": "Elevador", "valor": 95.0},
+            # Pico no verão, vale no inverno
+            {"mes": mes, "item": "Consumo Água", "valor": round(700 + 150 * np.cos(2 * np.pi * (i % 12) / 12), 2)},
+            {"mes": mes, "item": "Material de Limpeza", "valor": round(float(aleatorio.normal(80, 8)), 2)},
+        ]
+        if 24 <= i < 40:
+            dados.append({"mes": mes, "item": f"Pintura Fachada {i - 23}/16", "valor": 250.0})
+    return dados
+
+
+def test_backtest_fica_dentro_do_erro_maximo(diretorio_temporario):
+    df = preparar_dataframe(_serie_sintetica())
+    resultado = backtest(df, meses_teste=3)
+
+    assert len(resultado) == 3
+    assert resultado["erro_pct"].abs().max() < ERRO_MAXIMO_PCT
+
+
+def test_backtest_com_historico_curto_nao_preve(diretorio_temporario):
+    df = preparar_dataframe(_serie_sintetica(meses=3))
+    assert backtest(df, meses_teste=3).empty